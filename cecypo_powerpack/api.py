@@ -210,6 +210,9 @@ def fetch_item_prices(item_codes_str: str, buying_price_list: str, selling_price
     """
     Fetch item prices for bulk price editor.
 
+    Buying and selling rates for all codes come from one pivoted query over Item Price
+    (generic prices only, as created by the editor and the price importer).
+
     Args:
         item_codes_str: Pipe-delimited string of item codes (e.g., "ITEM001|||ITEM002|||ITEM003")
         buying_price_list: Name of the buying price list
@@ -221,44 +224,45 @@ def fetch_item_prices(item_codes_str: str, buying_price_list: str, selling_price
     if not item_codes_str or not buying_price_list or not selling_price_list:
         return []
 
-    # Split item codes
-    item_codes = item_codes_str.split('|||')
+    # Split item codes, keeping the caller's order and dropping blanks / repeats
+    item_codes = list(dict.fromkeys(code for code in item_codes_str.split('|||') if code))
+    if not item_codes:
+        return []
+
+    rows = frappe.db.sql("""
+        SELECT
+            i.item_code,
+            i.item_name,
+            MAX(CASE WHEN ip.price_list = %(buying)s THEN ip.price_list_rate END) AS cost_price,
+            MAX(CASE WHEN ip.price_list = %(selling)s THEN ip.price_list_rate END) AS sell_price
+        FROM `tabItem` i
+        LEFT JOIN `tabItem Price` ip
+            ON ip.item_code = i.name
+            AND ip.price_list IN (%(buying)s, %(selling)s)
+            AND IFNULL(ip.customer, '') = ''
+            AND IFNULL(ip.supplier, '') = ''
+            AND IFNULL(ip.batch_no, '') = ''
+        WHERE i.name IN %(item_codes)s
+        GROUP BY i.name, i.item_code, i.item_name
+    """, {
+        'buying': buying_price_list,
+        'selling': selling_price_list,
+        'item_codes': item_codes,
+    }, as_dict=True)
+
+    by_code = {row.item_code: row for row in rows}
 
     results = []
     for item_code in item_codes:
-        if not item_code:
+        row = by_code.get(item_code)
+        if not row:
             continue
 
-        # Get item details
-        item = frappe.get_cached_value('Item', item_code, ['item_code', 'item_name'], as_dict=True)
-        if not item:
-            continue
-
-        # Get buying price (cost)
-        cost_price = frappe.db.get_value(
-            'Item Price',
-            {
-                'item_code': item_code,
-                'price_list': buying_price_list
-            },
-            'price_list_rate'
-        ) or 0
-
-        # Get selling price
-        sell_price = frappe.db.get_value(
-            'Item Price',
-            {
-                'item_code': item_code,
-                'price_list': selling_price_list
-            },
-            'price_list_rate'
-        ) or 0
-
         results.append({
-            'item_code': item.get('item_code'),
-            'item_name': item.get('item_name'),
-            'cost_price': cost_price,
-            'sell_price': sell_price
+            'item_code': row.item_code,
+            'item_name': row.item_name,
+            'cost_price': row.cost_price or 0,
+            'sell_price': row.sell_price or 0
         })
 
     return results
@@ -269,69 +273,64 @@ def save_item_prices(items_str: str, selling_price_list: str) -> dict:
     """
     Save bulk updated item prices.
 
+    Rows are diffed and written set-based through the price importer (one UPDATE ... CASE
+    for changed prices, one bulk insert for new ones), under the same price list lock.
+
     Args:
         items_str: Pipe-delimited string of "item_code::price" pairs (e.g., "ITEM001::100.50|||ITEM002::200.00")
         selling_price_list: Name of the selling price list
 
     Returns:
-        dict: Contains updated_count
+        dict: Contains updated_count (rows saved, including ones already at that price)
+        and the updated / created / unchanged / skipped breakdown
     """
     if not items_str or not selling_price_list:
         frappe.throw(_("Missing required parameters"))
 
-    # Split items
-    items_data = items_str.split('|||')
-    updated_count = 0
+    frappe.has_permission('Item Price', 'write', throw=True)
+
+    from cecypo_powerpack.price_import import apply_rows, classify_rows, iter_chunks, price_list_locks
 
-    for item_data in items_data:
+    # Split items; the last price wins for a repeated item code
+    prices = {}
+    skipped = 0
+    for item_data in items_str.split('|||'):
         if not item_data or '::' not in item_data:
             continue
 
+        item_code, price = item_data.split('::', 1)
         try:
-            item_code, price = item_data.split('::', 1)
-            price = float(price)
-
-            # Check if Item Price exists
-            existing_price = frappe.db.exists(
-                'Item Price',
-                {
-                    'item_code': item_code,
-                    'price_list': selling_price_list
-                }
-            )
-
-            if existing_price:
-                # Update existing
-                doc = frappe.get_doc('Item Price', existing_price)
-                doc.price_list_rate = price
-                doc.save(ignore_permissions=False)
-            else:
-                # Create new
-                doc = frappe.get_doc({
-                    'doctype': 'Item Price',
-                    'item_code': item_code,
-                    'price_list': selling_price_list,
-                    'price_list_rate': price
-                })
-                doc.insert(ignore_permissions=False)
-
-            updated_count += 1
-
-        except Exception as e:
-            frappe.log_error(f"Error updating price for {item_code}: {str(e)}", "Bulk Price Update Error")
-            continue
+            prices[item_code] = float(price)
+        except ValueError:
+            skipped += 1
 
-    frappe.db.commit()
+    rows = [
+        {'item_code': item_code, 'price_list': selling_price_list, 'rate': rate}
+        for item_code, rate in prices.items()
+    ]
 
-    return {
-        'updated_count': updated_count
-    }
+    result = {'updated': 0, 'created': 0, 'unchanged': 0, 'skipped': skipped}
+    with price_list_locks([selling_price_list]):
+        for chunk in iter_chunks(rows):
+            classified = classify_rows(chunk)
+            if any(r['status'] == 'new' for r in classified):
+                frappe.has_permission('Item Price', 'create', throw=True)
+            for key, value in apply_rows(classified).items():
+                result[key] += value
+        # commit before the lock is released, so another update of the list cannot interleave
+        frappe.db.commit()
+
+    result['updated_count'] = result['updated'] + result['created'] + result['unchanged']
+    return result
 
 
 @frappe.whitelist()
 def check_duplicate_tax_id(doctype: str, tax_id: str, current_name: str = None) -> dict:
     """
-    Check if a tax ID exists more than twice in Customer or Supplier records.
+    Check if a tax ID is already used by other Customer or Supplier records.
+
+    Tax IDs are compared normalized (case, spaces and punctuation ignored) through the
+    PowerPack Tax ID Index, so this is one indexed lookup spanning both doctypes.
 
     Args:
         doctype: Either 'Customer' or 'Supplier'
@@ -339,46 +338,38 @@ def check_duplicate_tax_id(doctype: str, tax_id: str, current_name: str = None)
         current_name: Current document name (to exclude from duplicates)
 
     Returns:
-        dict: Contains 'has_duplicates' (bool) and 'duplicates' (list)
+        dict: Contains 'has_duplicates' (bool) and 'duplicates' (list) for the same
+        doctype, plus 'other_doctype_matches' (list) for parties of the other doctype
+        (e.g. "this PIN is already a Supplier")
     """
     if not tax_id or doctype not in ['Customer', 'Supplier']:
-        return {"has_duplicates": False, "duplicates": []}
-
-    # Build filters
-    filters = [
-        [doctype, 'tax_id', '=', tax_id]
-    ]
-
-    # Exclude current document if editing
-    if current_name:
-        filters.append([doctype, 'name', '!=', current_name])
-
-    # Get all records with the same tax_id
-    duplicates = frappe.get_all(
-        doctype,
-        filters=filters,
-        fields=['name', 'customer_name' if doctype == 'Customer' else 'supplier_name', 'creation'],
-        order_by='creation desc'
-    )
-
-    # Format the results
-    formatted_duplicates = []
-    for dup in duplicates:
-        formatted_duplicates.append({
-            'name': dup.get('name'),
-            'display_name': dup.get('customer_name') if doctype == 'Customer' else dup.get('supplier_name'),
-            'creation': dup.get('creation')
-        })
+        return {"has_duplicates": False, "duplicates": [], "other_doctype_matches": []}
+
+    from cecypo_powerpack.tax_id_index import find_matches
+
+    duplicates = []
+    other_doctype_matches = []
+    for match in find_matches(tax_id, exclude_party_type=doctype, exclude_party=current_name):
+        formatted = {
+            'name': match.party,
+            'display_name': match.party_name,
+            'tax_id': match.tax_id,
+            'creation': match.creation
+        }
+        if match.party_type == doctype:
+            duplicates.append(formatted)
+        else:
+            formatted['doctype'] = match.party_type
+            other_doctype_matches.append(formatted)
 
-    # Check if tax_id exists more than twice (including current document)
-    # If current_name is provided, duplicates count + 1 (current) > 2
-    # If new document, duplicates count >= 2
-    total_count = len(duplicates) + (1 if current_name else 1)
+    # Total including the current document
+    total_count = len(duplicates) + 1
     has_duplicates = total_count > 1
 
     return {
         "has_duplicates": has_duplicates,
-        "duplicates": formatted_duplicates,
+        "duplicates": duplicates,
+        "other_doctype_matches": other_doctype_matches,
         "total_count": total_count
     }
 
@@ -386,42 +377,38 @@ def check_duplicate_tax_id(doctype: str, tax_id: str, current_name: str = None)
 @frappe.whitelist()
 def get_customer_overdue_invoices(customer: str, company: str = None) -> dict:
     """
-    Get overdue Sales Invoices for a customer (docstatus=1, outstanding > 0, due_date < today).
+    Get the overdue summary for a customer (docstatus=1, outstanding > 0, due_date < today).
     Filtered to the given company when provided.
+
+    Reads the precomputed PowerPack Customer Overdue Summary (see overdue_summary.py):
+    totals and ageing cover every overdue invoice, while `invoices` holds only the
+    oldest ones (up to overdue_summary.TOP_N per company).
     """
     from cecypo_powerpack.utils import is_feature_enabled
     if not is_feature_enabled('enable_warnings') or not customer:
         return {"has_overdue": False, "invoices": [], "customer_name": ""}
 
-    today = frappe.utils.today()
-
-    if company:
-        overdue = frappe.db.sql("""
-            SELECT name, due_date, grand_total, outstanding_amount, currency, customer_name
-            FROM `tabSales Invoice`
-            WHERE customer = %s
-              AND company = %s
-              AND docstatus = 1
-              AND outstanding_amount > 0.001
-              AND due_date < %s
-            ORDER BY due_date ASC
-        """, (customer, company, today), as_dict=True)
-    else:
-        overdue = frappe.db.sql("""
-            SELECT name, due_date, grand_total, outstanding_amount, currency, customer_name
-            FROM `tabSales Invoice`
-            WHERE customer = %s
-              AND docstatus = 1
-              AND outstanding_amount > 0.001
-              AND due_date < %s
-            ORDER BY due_date ASC
-        """, (customer, today), as_dict=True)
-
-    customer_name = frappe.db.get_value("Customer", customer, "customer_name") or customer
+    from cecypo_powerpack.overdue_summary import get_summaries
+
+    summaries = get_summaries(customer, company)
+    if not summaries:
+        return {"has_overdue": False, "invoices": [], "customer_name": ""}
+
+    invoices = sorted(
+        (inv for s in summaries for inv in s.top_invoices),
+        key=lambda inv: (inv.get('due_date') or '', inv.get('name'))
+    )
+    buckets = ('ageing_0_30', 'ageing_31_60', 'ageing_61_90', 'ageing_90_plus')
+
     return {
-        "has_overdue": len(overdue) > 0,
-        "invoices": overdue,
-        "customer_name": customer_name
+        "has_overdue": True,
+        "invoices": invoices,
+        "customer_name": summaries[0].customer_name or customer,
+        "overdue_count": sum(s.overdue_count for s in summaries),
+        "total_outstanding": sum(frappe.utils.flt(s.total_outstanding) for s in summaries),
+        "oldest_due_date": summaries[0].oldest_due_date,
+        "currency": summaries[0].currency,
+        "ageing": {b: sum(frappe.utils.flt(s.get(b)) for s in summaries) for b in buckets},
     }
 
 
@@ -944,8 +931,11 @@ def get_bulk_stock_item_details(items, warehouse: str = None, doctype: str = 'St
     }
 
 
+ZERO_ALLOCATE_PAIRINGS = ("All", "FIFO", "Amount", "Order")
+
+
 @frappe.whitelist()
-def zero_allocate_entries(doc, payments, invoices):
+def zero_allocate_entries(doc, payments, invoices, pairing: str = "All"):
     """
     Create zero-amount allocation entries for selected payments and invoices.
 
@@ -957,6 +947,10 @@ def zero_allocate_entries(doc, payments, invoices):
         doc: Payment Reconciliation document (dict or JSON string)
         payments: Selected payment entries (list or JSON string)
         invoices: Selected invoice entries (list or JSON string)
+        pairing: "All" for every payment x invoice pair (default), or a smart
+            pairing that only emits the pairs needed to cover the invoices:
+            "FIFO" (oldest first), "Amount" (equal amounts first, then FIFO) or
+            "Order" (invoices in the order given, e.g. a pasted bill list)
 
     Returns:
         list: Allocation entries with allocated_amount = 0
@@ -987,6 +981,10 @@ def zero_allocate_entries(doc, payments, invoices):
         if not invoices or not isinstance(invoices, list) or len(invoices) == 0:
             frappe.throw(_("Please select at least one invoice"))
 
+        pairing = pairing or "All"
+        if pairing not in ZERO_ALLOCATE_PAIRINGS:
+            frappe.throw(_("Unknown pairing {0}").format(pairing))
+
     except Exception as e:
         frappe.log_error(
             message=f"Error in zero_allocate_entries validation: {str(e)}",
@@ -995,71 +993,33 @@ def zero_allocate_entries(doc, payments, invoices):
         frappe.throw(_("Error validating inputs: {0}").format(str(e)))
 
     try:
-        # Get exchange rate map for multi-currency support
-        invoice_exchange_map = get_invoice_exchange_map_for_zero_allocate(doc, invoices)
+        # Currency, exchange rate and accounting dimensions for every selected
+        # invoice, resolved with one query per invoice_type
+        invoice_details = get_invoice_details_for_zero_allocate(doc, invoices)
 
         # Get Accounts Settings for exchange gain/loss account
         accounts_settings = frappe.get_cached_doc("Accounts Settings")
+        gain_loss_account = accounts_settings.get("gain_loss_account")
+        posting_date = frappe.utils.nowdate()
 
         allocations = []
 
-        # Create allocation entries for each payment × invoice combination
-        for payment in payments:
-            for invoice in invoices:
-                # Note: invoices table uses invoice_type/invoice_number
-                # but allocation table also uses invoice_type/invoice_number
-                invoice_type = invoice.get("invoice_type")
-                invoice_number = invoice.get("invoice_number")
-
-                if not invoice_type or not invoice_number:
-                    continue
-
-                # Get exchange rate
-                exchange_rate = invoice_exchange_map.get(invoice_number, {}).get("exchange_rate", 1)
-
-                # Get accounting dimensions
-                dimensions = get_accounting_dimensions_for_doc(
-                    invoice_type,
-                    invoice_number
-                )
-
-                # Create allocation entry with zero amount
-                # Important: Copy tracking fields from payment and invoice to prevent
-                # "Payment Entry has been modified" errors during reconciliation
-                allocation = {
-                    # Payment fields
-                    "reference_type": payment.get("reference_type"),
-                    "reference_name": payment.get("reference_name"),
-                    "reference_row": payment.get("reference_row"),
-                    "is_advance": payment.get("is_advance"),
-                    "amount": payment.get("amount"),  # Original payment amount (for tracking)
-
-                    # Invoice fields
-                    "invoice_type": invoice_type,
-                    "invoice_number": invoice_number,
-                    "unreconciled_amount": invoice.get("outstanding_amount"),  # Track original outstanding
-
-                    # Allocation amount (zero - user will fill manually)
-                    "allocated_amount": 0,
-
-                    # Currency and exchange
-                    "currency": payment.get("currency") or invoice.get("currency"),
-                    "exchange_rate": exchange_rate,
-
-                    # Difference handling
-                    "difference_amount": 0,
-                    "difference_account": accounts_settings.get("gain_loss_account"),
-                    "gain_loss_posting_date": frappe.utils.nowdate(),
-
-                    # Cost center from payment (if available)
-                    "cost_center": payment.get("cost_center")
-                }
-
-                # Add accounting dimensions if present
-                for dimension_field, dimension_value in dimensions.items():
-                    allocation[dimension_field] = dimension_value
-
-                allocations.append(allocation)
+        # Create allocation entries for each payment x invoice combination,
+        # or only the pairs picked by the smart pairing
+        for payment, invoice in pair_zero_allocations(payments, invoices, pairing):
+            # Note: invoices table uses invoice_type/invoice_number
+            # but allocation table also uses invoice_type/invoice_number
+            invoice_type = invoice.get("invoice_type")
+            invoice_number = invoice.get("invoice_number")
+
+            if not invoice_type or not invoice_number:
+                continue
+
+            details = invoice_details.get((invoice_type, invoice_number), {})
+
+            # Create allocation entry with zero amount
+            allocation = make_zero_allocation(payment, invoice, details, gain_loss_account, posting_date)
+            allocations.append(allocation)
 
         if not allocations:
             # Log more details for debugging
@@ -1082,6 +1042,125 @@ def zero_allocate_entries(doc, payments, invoices):
         frappe.throw(_("Error creating allocations: {0}").format(str(e)))
 
 
+def make_zero_allocation(payment, invoice, details, gain_loss_account, posting_date):
+    """
+    Allocation row (allocated_amount = 0) for one payment / invoice pair.
+
+    Important: tracking fields are copied from the payment and invoice rows to prevent
+    "Payment Entry has been modified" errors during reconciliation.
+
+    Args:
+        payment: Payment row
+        invoice: Invoice row
+        details: Entry of get_invoice_details_for_zero_allocate for the invoice
+        gain_loss_account: Exchange gain/loss account
+        posting_date: Gain/loss posting date
+
+    Returns:
+        dict: Allocation entry
+    """
+    allocation = {
+        # Payment fields
+        "reference_type": payment.get("reference_type"),
+        "reference_name": payment.get("reference_name"),
+        "reference_row": payment.get("reference_row"),
+        "is_advance": payment.get("is_advance"),
+        "amount": payment.get("amount"),  # Original payment amount (for tracking)
+
+        # Invoice fields
+        "invoice_type": invoice.get("invoice_type"),
+        "invoice_number": invoice.get("invoice_number"),
+        "unreconciled_amount": invoice.get("outstanding_amount"),  # Track original outstanding
+
+        # Allocation amount (zero - user will fill manually)
+        "allocated_amount": 0,
+
+        # Currency and exchange
+        "currency": payment.get("currency") or invoice.get("currency"),
+        "exchange_rate": details.get("exchange_rate", 1),
+
+        # Difference handling
+        "difference_amount": 0,
+        "difference_account": gain_loss_account,
+        "gain_loss_posting_date": posting_date,
+
+        # Cost center from payment (if available)
+        "cost_center": payment.get("cost_center")
+    }
+
+    # Add accounting dimensions if present
+    allocation.update(details.get("dimensions", {}))
+
+    return allocation
+
+
+def pair_zero_allocations(payments, invoices, pairing="All"):
+    """
+    Pick the (payment, invoice) pairs that get a zero allocation row.
+
+    "All" keeps the full payments x invoices product. The smart pairings walk the
+    invoices in order and draw on payments in order, moving to the next payment
+    once the running balance of the current one is used up, so an invoice only
+    spans several payments where it has to. Invoices left once payments run out
+    get no row. The table stays proportional to the selection
+    (at most payments + invoices - 1 rows).
+
+    Payment balance is the payment row's `amount`; an invoice needs its
+    `pasted_amount` when given (Zero Allocate with Paste) or else its
+    outstanding_amount.
+    """
+    if pairing == "All":
+        return [(payment, invoice) for payment in payments for invoice in invoices]
+
+    from frappe.utils import flt, getdate
+
+    def by_date(rows, fieldname):
+        # stable: rows without a date keep their place after the dated ones
+        return sorted(rows, key=lambda r: (not r.get(fieldname), getdate(r.get(fieldname)) if r.get(fieldname) else None))
+
+    if pairing == "Order":
+        payment_queue, invoice_queue = list(payments), list(invoices)
+    else:
+        payment_queue = by_date(payments, "posting_date")
+        invoice_queue = by_date(invoices, "invoice_date")
+
+    balance = {id(p): flt(p.get("amount")) for p in payment_queue}
+    need = {id(i): flt(i.get("pasted_amount") or i.get("outstanding_amount")) for i in invoice_queue}
+    pairs = []
+
+    if pairing == "Amount":
+        # Exact amount matches first, each payment used at most once
+        unmatched = []
+        for invoice in invoice_queue:
+            payment = next(
+                (p for p in payment_queue
+                 if balance[id(p)] > 0.005 and abs(balance[id(p)] - need[id(invoice)]) <= 0.005),
+                None
+            )
+            if payment:
+                pairs.append((payment, invoice))
+                balance[id(payment)] = 0
+            else:
+                unmatched.append(invoice)
+        invoice_queue = unmatched
+
+    payment_queue = [p for p in payment_queue if balance[id(p)] > 0.005]
+    for invoice in invoice_queue:
+        remaining = need[id(invoice)]
+        while payment_queue and remaining > 0.005:
+            payment = payment_queue[0]
+            pairs.append((payment, invoice))
+            taken = min(balance[id(payment)], remaining)
+            balance[id(payment)] -= taken
+            remaining -= taken
+            if balance[id(payment)] <= 0.005:
+                payment_queue.pop(0)
+        if not payment_queue:
+            break
+
+    return pairs
+
+
 def get_invoice_exchange_map_for_zero_allocate(doc, invoices):
     """
     Get exchange rate mapping for invoices in multi-currency scenarios.
@@ -1093,34 +1172,71 @@ def get_invoice_exchange_map_for_zero_allocate(doc, invoices):
     Returns:
         dict: Map of invoice_number -> {exchange_rate, invoice_currency}
     """
-    invoice_exchange_map = {}
+    return {
+        invoice_number: {
+            "exchange_rate": details["exchange_rate"],
+            "invoice_currency": details["invoice_currency"]
+        }
+        for (invoice_type, invoice_number), details in get_invoice_details_for_zero_allocate(doc, invoices).items()
+    }
+
+
+def get_invoice_details_for_zero_allocate(doc, invoices):
+    """
+    Resolve currency, exchange rate and accounting dimensions for all invoices at once.
+
+    The enabled dimension list is read once and each invoice_type is fetched with a
+    single query, so the query count does not grow with the selection.
+
+    Args:
+        doc: Payment Reconciliation document
+        invoices: List of invoice entries
 
+    Returns:
+        dict: Map of (invoice_type, invoice_number) -> {exchange_rate, invoice_currency, dimensions}
+    """
     # Get company currency
     company_currency = frappe.get_cached_value("Company", doc.get("company"), "default_currency")
     party_account_currency = doc.get("party_account_currency") or company_currency
 
+    names_by_type = {}
     for invoice in invoices:
         invoice_type = invoice.get("invoice_type")
         invoice_number = invoice.get("invoice_number")
+        if invoice_type and invoice_number:
+            names_by_type.setdefault(invoice_type, set()).add(invoice_number)
+
+    dimension_fields = get_enabled_accounting_dimension_fields()
+
+    details = {}
+    for invoice_type, names in names_by_type.items():
+        # Journal Entries have neither currency nor conversion_rate
+        meta = frappe.get_meta(invoice_type)
+        fields = [f for f in ["currency", "conversion_rate", *dimension_fields] if meta.has_field(f)]
+
+        for row in frappe.get_all(
+            invoice_type,
+            filters={"name": ["in", list(names)]},
+            fields=["name", *fields]
+        ):
+            invoice_currency = row.get("currency")
+            if invoice_currency == party_account_currency:
+                exchange_rate = 1
+            else:
+                exchange_rate = row.get("conversion_rate") or 1
 
-        if not invoice_type or not invoice_number:
-            continue
-
-        # Get invoice currency and exchange rate
-        invoice_currency = frappe.db.get_value(invoice_type, invoice_number, "currency")
+            details[(invoice_type, row.name)] = {
+                "exchange_rate": exchange_rate,
+                "invoice_currency": invoice_currency,
+                "dimensions": {f: row.get(f) for f in dimension_fields if row.get(f)}
+            }
 
-        if invoice_currency == party_account_currency:
-            exchange_rate = 1
-        else:
-            # Get exchange rate from the invoice document
-            exchange_rate = frappe.db.get_value(invoice_type, invoice_number, "conversion_rate") or 1
+    return details
 
-        invoice_exchange_map[invoice_number] = {
-            "exchange_rate": exchange_rate,
-            "invoice_currency": invoice_currency
-        }
 
-    return invoice_exchange_map
+def get_enabled_accounting_dimension_fields():
+    """Fieldnames of the enabled Accounting Dimensions."""
+    return frappe.get_all("Accounting Dimension", filters={"disabled": 0}, pluck="fieldname")
 
 
 def get_accounting_dimensions_for_doc(doctype, docname):
@@ -1141,17 +1257,12 @@ def get_accounting_dimensions_for_doc(doctype, docname):
 
     try:
         # Get accounting dimensions from the system
-        accounting_dimensions = frappe.get_all(
-            "Accounting Dimension",
-            filters={"disabled": 0},
-            fields=["fieldname", "label"]
-        )
+        dimension_fields = get_enabled_accounting_dimension_fields()
 
-        if not accounting_dimensions:
+        if not dimension_fields:
             return dimensions
 
         # Get dimension values from the document
-        dimension_fields = [d["fieldname"] for d in accounting_dimensions]
         doc_data = frappe.db.get_value(doctype, docname, dimension_fields, as_dict=True)
 
         if doc_data:
@@ -1243,17 +1354,14 @@ def get_short_link_target(token):
 	if not token:
 		frappe.throw("Invalid token.", frappe.PageDoesNotExistError)
 
-	short_link = frappe.db.get_value(
-		"PowerPack Short Link",
-		token,
-		["target_url", "reference_doctype", "reference_docname", "expires_on"],
-		as_dict=True,
-	)
+	from cecypo_powerpack.short_link import get_link_context, is_expired
+
+	short_link = get_link_context(token)
 
 	if not short_link:
 		frappe.throw("This link does not exist.", frappe.PageDoesNotExistError)
 
-	if short_link.expires_on and str(short_link.expires_on) < frappe.utils.today():
+	if is_expired(short_link):
 		frappe.throw("This link has expired.")
 
 	return {
@@ -1282,6 +1390,9 @@ def custom_search_link(doctype, txt, query=None, filters=None, page_length=10,
 		and is_feature_enabled("enable_item_search_powerup")
 	):
 		query = "cecypo_powerpack.api.custom_item_query"
+	else:
+		# Any other query would treat the enrichment keys as Item columns and fail.
+		filters, _context = _pop_item_search_context(filters)
 
 	import inspect
 	kwargs = dict(
@@ -1302,16 +1413,19 @@ def custom_item_query(doctype, txt, searchfield, start, page_len, filters, as_di
 	When enable_item_search_powerup is enabled:
 	- Multi-word: split txt on whitespace; all tokens must match (AND logic)
 	- Wildcard: if % is present, each token is used as-is in LIKE
+	- Stock / price: when item_search_show_stock_price is enabled and the client passes
+	  pp_warehouse / pp_price_list in filters, the dropdown description gains the
+	  warehouse qty and price-list rate, joined into the same query
 	Falls back to the standard ERPNext item_query when the feature is disabled.
 	"""
-	import json as _json
-
 	from frappe import scrub
 	from frappe.desk.reportview import get_filters_cond, get_match_cond
 	from frappe.utils import nowdate
 
 	from cecypo_powerpack.utils import is_feature_enabled
 
+	filters, context = _pop_item_search_context(filters)
+
 	if not is_feature_enabled("enable_item_search_powerup"):
 		from erpnext.controllers.queries import item_query
 		return item_query(doctype, txt, searchfield, start, page_len, filters, as_dict)
@@ -1319,9 +1433,6 @@ def custom_item_query(doctype, txt, searchfield, start, page_len, filters, as_di
 	doctype = "Item"
 	conditions = []
 
-	if isinstance(filters, str):
-		filters = _json.loads(filters)
-
 	# Party Specific Item restrictions — identical to ERPNext original
 	if filters and isinstance(filters, dict):
 		if filters.get("customer") or filters.get("supplier"):
@@ -1360,14 +1471,16 @@ def custom_item_query(doctype, txt, searchfield, start, page_len, filters, as_di
 	searchfields = meta.get_search_fields()
 	extra_searchfields = [f for f in searchfields if f not in ["name", "description"]]
 
+	# Columns are qualified because the stock/price enrichment joins Bin, which has
+	# its own name/idx columns.
 	columns = ""
 	if extra_searchfields:
-		columns += ", " + ", ".join(extra_searchfields)
+		columns += ", " + ", ".join(f"tabItem.{f}" for f in extra_searchfields)
 
 	if "description" in searchfields:
 		columns += (
 			""", if(length(tabItem.description) > 40, """
-			"""concat(substr(tabItem.description, 1, 40), "..."), description) as description"""
+			"""concat(substr(tabItem.description, 1, 40), "..."), tabItem.description) as description"""
 		)
 
 	# Columns to search across
@@ -1378,16 +1491,7 @@ def custom_item_query(doctype, txt, searchfield, start, page_len, filters, as_di
 		)
 	)
 
-	# Parse tokens
 	txt = (txt or "").strip()
-	if not txt:
-		tokens = ["%"]
-	elif "%" in txt:
-		tokens = [txt]  # wildcard mode: use as-is
-	else:
-		tokens = txt.split() or [txt]  # multi-word mode
-
-	# Build per-token AND conditions
 	values = {
 		"today": nowdate(),
 		"start": start,
@@ -1395,6 +1499,57 @@ def custom_item_query(doctype, txt, searchfield, start, page_len, filters, as_di
 		"_txt": txt.replace("%", ""),
 	}
 
+	search_cond = _item_search_condition(txt, search_cols, values)
+
+	enrich = _item_search_enrichment(context, values)
+
+	rows = frappe.db.sql(
+		"""select tabItem.name {columns} {enrich_columns}
+		from tabItem
+		{enrich_joins}
+		where tabItem.docstatus < 2
+			and tabItem.disabled=0
+			and tabItem.has_variants=0
+			and (tabItem.end_of_life > %(today)s or ifnull(tabItem.end_of_life, '0000-00-00')='0000-00-00')
+			and ({scond})
+			{fcond} {mcond}
+		order by
+			if(locate(%(_txt)s, tabItem.name), locate(%(_txt)s, tabItem.name), 99999),
+			if(locate(%(_txt)s, tabItem.item_name), locate(%(_txt)s, tabItem.item_name), 99999),
+			tabItem.idx desc,
+			tabItem.name, tabItem.item_name
+		limit %(start)s, %(page_len)s""".format(
+			columns=columns,
+			enrich_columns=enrich["columns"],
+			enrich_joins=enrich["joins"],
+			scond=search_cond,
+			fcond=get_filters_cond(doctype, filters, conditions).replace("%", "%%"),
+			mcond=get_match_cond(doctype).replace("%", "%%"),
+		),
+		values,
+		as_dict=as_dict,
+	)
+
+	if enrich["labels"]:
+		rows = _format_item_search_enrichment(rows, enrich["labels"], as_dict)
+	return rows
+
+
+def _item_search_condition(txt, search_cols, values):
+	"""Build the PowerPack token condition against tabItem.
+
+	- Multi-word: split txt on whitespace; all tokens must match (AND logic)
+	- Wildcard: if % is present, the whole txt is one LIKE pattern, padded with %
+	Each token may match any of search_cols or an Item Barcode. Bind values are added
+	to values as tok0, tok1, ...
+	"""
+	if not txt:
+		tokens = ["%"]
+	elif "%" in txt:
+		tokens = [txt]  # wildcard mode: use as-is
+	else:
+		tokens = txt.split() or [txt]  # multi-word mode
+
 	token_clauses = []
 	for i, token in enumerate(tokens):
 		key = f"tok{i}"
@@ -1415,32 +1570,243 @@ def custom_item_query(doctype, txt, searchfield, start, page_len, filters, as_di
 		)
 		token_clauses.append("(" + " or ".join(col_parts) + ")")
 
-	search_cond = " and ".join(token_clauses)
+	return " and ".join(token_clauses)
 
-	return frappe.db.sql(
-		"""select tabItem.name {columns}
+
+# Filter keys the client adds to item_code link queries so custom_item_query can show
+# stock and price for the form's warehouse / price list. They are not Item columns.
+ITEM_SEARCH_CONTEXT_KEYS = ("pp_warehouse", "pp_price_list")
+
+
+def _pop_item_search_context(filters):
+	"""Split the PowerPack enrichment keys out of a link query's filters.
+
+	Returns (filters, context). filters may arrive as a JSON string; it is parsed so the
+	keys can be removed before the filters reach get_filters_cond.
+	"""
+	import json as _json
+
+	if isinstance(filters, str):
+		filters = _json.loads(filters) if filters else None
+
+	context = {}
+	if isinstance(filters, dict):
+		for key in ITEM_SEARCH_CONTEXT_KEYS:
+			value = filters.pop(key, None)
+			if value:
+				context[key] = value
+	return filters, context
+
+
+def _item_search_enrichment(context, values):
+	"""Extra SELECT columns and LEFT JOINs for stock / price in the item dropdown.
+
+	Both figures come from the same statement as the search itself: Bin is unique per
+	(item_code, warehouse), and Item Price is reduced to one generic rate per item in a
+	grouped derived table (party-, batch- and date-specific prices are excluded) so the
+	join never multiplies rows.
+	"""
+	from cecypo_powerpack.utils import is_feature_enabled
+
+	enrich = {"columns": "", "joins": "", "labels": []}
+	if not context or not is_feature_enabled("item_search_show_stock_price"):
+		return enrich
+
+	warehouse = context.get("pp_warehouse")
+	price_list = context.get("pp_price_list")
+
+	if warehouse:
+		values["pp_warehouse"] = warehouse
+		enrich["columns"] += ", ifnull(pp_bin.actual_qty, 0) as pp_stock_qty"
+		enrich["joins"] += """
+		left join `tabBin` pp_bin
+			on pp_bin.item_code = tabItem.name and pp_bin.warehouse = %(pp_warehouse)s"""
+		enrich["labels"].append(("pp_stock_qty", _("Stock")))
+
+	if price_list:
+		values["pp_price_list"] = price_list
+		enrich["columns"] += ", pp_ip.price_list_rate as pp_price_list_rate"
+		enrich["joins"] += """
+		left join (
+			select item_code, max(price_list_rate) as price_list_rate
+			from `tabItem Price`
+			where price_list = %(pp_price_list)s
+				and ifnull(customer, '') = '' and ifnull(supplier, '') = ''
+				and ifnull(batch_no, '') = ''
+				and (valid_from is null or valid_from <= %(today)s)
+				and (valid_upto is null or valid_upto >= %(today)s)
+			group by item_code
+		) pp_ip on pp_ip.item_code = tabItem.name"""
+		enrich["labels"].append(("pp_price_list_rate", _("Price")))
+
+	return enrich
+
+
+def _format_item_search_enrichment(rows, labels, as_dict):
+	"""Render the trailing stock/price columns as "Stock: 12" / "Price: 1,500.00".
+
+	search_widget joins every column after the first into the dropdown description, so
+	labelled strings are what the user ends up seeing. Items without a price keep an
+	empty column, which the description join skips.
+	"""
+	from frappe.utils import fmt_money
+
+	def fmt(label, value, is_qty):
+		if value is None:
+			return ""
+		if is_qty:
+			qty = frappe.utils.flt(value)
+			return f"{label}: {int(qty) if qty.is_integer() else qty}"
+		return f"{label}: {fmt_money(value)}"
+
+	formatted = []
+	n = len(labels)
+	for row in rows:
+		if as_dict:
+			for key, label in labels:
+				row[key] = fmt(label, row.get(key), key == "pp_stock_qty")
+			formatted.append(row)
+		else:
+			head, tail = list(row[:-n]), row[-n:]
+			head.extend(
+				fmt(label, value, key == "pp_stock_qty")
+				for (key, label), value in zip(labels, tail, strict=True)
+			)
+			formatted.append(tuple(head))
+	return formatted
+
+
+@frappe.whitelist()
+def search_pos_items(
+	pos_profile: str,
+	search_term: str | None = None,
+	item_group: str | None = None,
+	start: int = 0,
+	page_length: int = 40,
+	pp_search_scope: str | None = None,
+	pp_search_seq: int | None = None,
+) -> dict:
+	"""Server-side item search for the POS powerup.
+
+	Uses the same tokenization as custom_item_query (multi-word AND, % wildcards) and
+	is scoped to the POS Profile: its item groups, warehouse and selling price list.
+	Stock and price are joined into the search statement, so each page costs one query.
+
+	pp_search_scope / pp_search_seq are sent by CecypoPowerPack.RequestSequencer; a
+	request already superseded by a newer keystroke returns without querying.
+
+	Returns:
+		dict: {"items": [...], "has_more": bool}, plus "superseded": True when skipped.
+		Item rows carry the keys the POS item selector renders (item_code, item_name,
+		item_image, price_list_rate, currency, uom, actual_qty, ...).
+	"""
+	from frappe.utils import cint, nowdate
+
+	from cecypo_powerpack.utils import is_feature_enabled, is_search_superseded
+
+	if not is_feature_enabled("enable_pos_powerup"):
+		frappe.throw(_("POS Powerup is not enabled in PowerPack Settings"))
+
+	if is_search_superseded(pp_search_scope, pp_search_seq):
+		return {"items": [], "has_more": False, "superseded": True}
+
+	profile = frappe.get_cached_doc("POS Profile", pos_profile)
+	# The profile decides warehouse, price list and item groups; only its users may search with it
+	if frappe.session.user not in [u.user for u in profile.get("applicable_for_users") or []]:
+		frappe.has_permission("POS Profile", doc=profile, throw=True)
+	start = max(cint(start), 0)
+	page_length = min(max(cint(page_length), 1), 200)
+	txt = (search_term or "").strip()
+
+	meta = frappe.get_meta("Item", cached=True)
+	pos_search_fields = [
+		f
+		for f in frappe.get_all(
+			"POS Search Fields", filters={"parent": "POS Settings"}, pluck="fieldname"
+		)
+		if f and meta.has_field(f)
+	]
+	search_cols = list(dict.fromkeys(["item_code", "item_name", "item_group", *pos_search_fields]))
+
+	price_list = profile.selling_price_list
+	values = {
+		"today": nowdate(),
+		"start": start,
+		"page_len": page_length + 1,  # one extra row tells us whether another page exists
+		"_txt": txt.replace("%", ""),
+		"warehouse": profile.warehouse,
+		"price_list": price_list,
+		"currency": (price_list and frappe.db.get_value("Price List", price_list, "currency"))
+		or profile.currency,
+	}
+	conditions = [_item_search_condition(txt, search_cols, values)]
+
+	# Item group scope: the POS Profile's groups (with descendants), narrowed by the
+	# group picked in the POS item selector.
+	from erpnext.accounts.doctype.pos_profile.pos_profile import get_item_groups
+
+	profile_groups = get_item_groups(pos_profile)
+	if profile_groups:
+		values["profile_groups"] = tuple(profile_groups)
+		conditions.append("tabItem.item_group in %(profile_groups)s")
+	if item_group and frappe.db.exists("Item Group", item_group):
+		lft, rgt = frappe.db.get_value("Item Group", item_group, ["lft", "rgt"])
+		values.update({"ig_lft": lft, "ig_rgt": rgt})
+		conditions.append(
+			"exists (select 1 from `tabItem Group` ig where ig.name = tabItem.item_group"
+			" and ig.lft >= %(ig_lft)s and ig.rgt <= %(ig_rgt)s)"
+		)
+
+	if profile.get("hide_unavailable_items"):
+		conditions.append("(tabItem.is_stock_item = 0 or ifnull(pp_bin.actual_qty, 0) > 0)")
+
+	extra_columns = "".join(
+		f", tabItem.`{f}`" for f in pos_search_fields if f not in ("item_code", "item_name", "item_group")
+	)
+
+	rows = frappe.db.sql(
+		"""select tabItem.name as item_code, tabItem.item_name, tabItem.description,
+			tabItem.stock_uom, tabItem.stock_uom as uom, tabItem.image as item_image,
+			tabItem.is_stock_item, tabItem.item_group, tabItem.has_batch_no,
+			tabItem.has_serial_no, ifnull(pp_bin.actual_qty, 0) as actual_qty,
+			ifnull(pp_ip.price_list_rate, 0) as price_list_rate,
+			%(currency)s as currency {extra_columns}
 		from tabItem
-		where tabItem.docstatus < 2
-			and tabItem.disabled=0
-			and tabItem.has_variants=0
-			and (tabItem.end_of_life > %(today)s or ifnull(tabItem.end_of_life, '0000-00-00')='0000-00-00')
-			and ({scond})
-			{fcond} {mcond}
+		left join `tabBin` pp_bin
+			on pp_bin.item_code = tabItem.name and pp_bin.warehouse = %(warehouse)s
+		left join (
+			select item_code, max(price_list_rate) as price_list_rate
+			from `tabItem Price`
+			where price_list = %(price_list)s
+				and ifnull(customer, '') = '' and ifnull(supplier, '') = ''
+				and ifnull(batch_no, '') = ''
+				and (valid_from is null or valid_from <= %(today)s)
+				and (valid_upto is null or valid_upto >= %(today)s)
+			group by item_code
+		) pp_ip on pp_ip.item_code = tabItem.name
+		where tabItem.disabled = 0
+			and tabItem.has_variants = 0
+			and tabItem.is_sales_item = 1
+			and tabItem.is_fixed_asset = 0
+			and {conditions}
 		order by
-			if(locate(%(_txt)s, name), locate(%(_txt)s, name), 99999),
-			if(locate(%(_txt)s, item_name), locate(%(_txt)s, item_name), 99999),
-			idx desc,
-			name, item_name
+			(tabItem.name = %(_txt)s) desc,
+			if(locate(%(_txt)s, tabItem.name), locate(%(_txt)s, tabItem.name), 99999),
+			if(locate(%(_txt)s, tabItem.item_name), locate(%(_txt)s, tabItem.item_name), 99999),
+			tabItem.item_name, tabItem.name
 		limit %(start)s, %(page_len)s""".format(
-			columns=columns,
-			scond=search_cond,
-			fcond=get_filters_cond(doctype, filters, conditions).replace("%", "%%"),
-			mcond=get_match_cond(doctype).replace("%", "%%"),
+			extra_columns=extra_columns,
+			conditions=" and ".join(conditions),
 		),
 		values,
-		as_dict=as_dict,
+		as_dict=True,
 	)
 
+	return {"items": rows[:page_length], "has_more": len(rows) > page_length}
+
+
+MAX_PASTED_BILL_NUMBERS = 10000
+
 
 @frappe.whitelist()
 def resolve_bill_numbers_for_credit(company: str, supplier: str, bill_numbers: str) -> dict:
@@ -1448,6 +1814,9 @@ def resolve_bill_numbers_for_credit(company: str, supplier: str, bill_numbers: s
 	Resolve pasted bill_no strings to open Purchase Invoices for a given supplier/company.
 
 	Used by the "Zero Allocate with Paste" PowerUp in Payment Reconciliation.
+	Bill numbers are compared normalized (case, spacing, separators and leading zeros
+	ignored, see bill_no_index.py) and resolved in chunks, so full supplier
+	statements can be pasted.
 
 	Args:
 		company: Company to scope the query to.
@@ -1456,12 +1825,15 @@ def resolve_bill_numbers_for_credit(company: str, supplier: str, bill_numbers: s
 
 	Returns:
 		dict with keys:
-			matched:   list of {bill_no, pi_name, outstanding_amount, currency,
-			                    conversion_rate, posting_date}
-			ambiguous: list of {bill_no, candidates: [{pi_name, posting_date,
-			                    outstanding_amount}, ...]}
+			matched:   list of {bill_no, pi_name, pi_bill_no, outstanding_amount,
+			                    currency, conversion_rate, posting_date}
+			ambiguous: list of {bill_no, candidates: [{pi_name, pi_bill_no,
+			                    posting_date, outstanding_amount}, ...]}
 			not_found: list of bill_no strings
-		Input order is preserved in all three partitions.
+			duplicates: list of {bill_no, duplicate_of} for lines naming a bill
+			            already pasted (same normalized key, e.g. "inv 42" after
+			            "INV-00042"); only the first line is resolved
+		Input order is preserved in all partitions.
 	"""
 	import json as _json
 
@@ -1481,55 +1853,49 @@ def resolve_bill_numbers_for_credit(company: str, supplier: str, bill_numbers: s
 	if not isinstance(parsed, list):
 		frappe.throw(_("bill_numbers must be a JSON-encoded list of strings"))
 
-	# Strip, drop blanks, uniquify preserving first-seen order
-	seen = set()
+	from cecypo_powerpack.bill_no_index import find_open_invoices, normalize_bill_no
+
+	# Strip, drop blanks, uniquify on the normalized key preserving first-seen order.
+	# Each resolved line becomes its own allocation row, so two spellings of one bill
+	# would allocate the invoice twice.
+	first_seen: dict[str, str] = {}
 	cleaned: list[str] = []
+	duplicates: list[dict] = []
 	for raw in parsed:
 		if not isinstance(raw, str):
 			continue
 		s = raw.strip()
-		if not s or s in seen:
+		if not s:
+			continue
+		key = normalize_bill_no(s) or s
+		if key in first_seen:
+			duplicates.append({"bill_no": s, "duplicate_of": first_seen[key]})
 			continue
-		seen.add(s)
+		first_seen[key] = s
 		cleaned.append(s)
 
-	if len(cleaned) > 200:
-		frappe.throw(_("Too many bill numbers in one paste (max 200)"))
+	if len(cleaned) > MAX_PASTED_BILL_NUMBERS:
+		frappe.throw(_("Too many bill numbers in one paste (max {0})").format(MAX_PASTED_BILL_NUMBERS))
 
 	if not cleaned:
-		return {"matched": [], "ambiguous": [], "not_found": []}
-
-	rows = frappe.db.get_all(
-		"Purchase Invoice",
-		filters={
-			"supplier": supplier,
-			"company": company,
-			"docstatus": 1,
-			"outstanding_amount": [">", 0],
-			"bill_no": ["in", cleaned],
-		},
-		fields=[
-			"name", "bill_no", "outstanding_amount", "currency",
-			"conversion_rate", "posting_date", "grand_total",
-		],
-	)
+		return {"matched": [], "ambiguous": [], "not_found": [], "duplicates": duplicates}
 
-	# Group rows by bill_no
-	by_bill: dict[str, list] = {}
-	for r in rows:
-		by_bill.setdefault(r["bill_no"], []).append(r)
+	# Match on the normalized key so "INV/0042" finds "inv 42"; one query per chunk
+	keys = {bill_no: normalize_bill_no(bill_no) for bill_no in cleaned}
+	by_key = find_open_invoices(company, supplier, keys.values())
 
 	matched: list[dict] = []
 	ambiguous: list[dict] = []
 	not_found: list[str] = []
 
 	for bill_no in cleaned:
-		candidates = by_bill.get(bill_no, [])
+		candidates = by_key.get(keys[bill_no], [])
 		if len(candidates) == 1:
 			c = candidates[0]
 			matched.append({
 				"bill_no": bill_no,
 				"pi_name": c["name"],
+				"pi_bill_no": c["bill_no"],
 				"outstanding_amount": c["outstanding_amount"],
 				"currency": c["currency"],
 				"conversion_rate": c["conversion_rate"],
@@ -1541,6 +1907,7 @@ def resolve_bill_numbers_for_credit(company: str, supplier: str, bill_numbers: s
 				"candidates": [
 					{
 						"pi_name": c["name"],
+						"pi_bill_no": c["bill_no"],
 						"posting_date": c["posting_date"],
 						"outstanding_amount": c["outstanding_amount"],
 					}
@@ -1550,7 +1917,122 @@ def resolve_bill_numbers_for_credit(company: str, supplier: str, bill_numbers: s
 		else:
 			not_found.append(bill_no)
 
-	return {"matched": matched, "ambiguous": ambiguous, "not_found": not_found}
+	return {"matched": matched, "ambiguous": ambiguous, "not_found": not_found, "duplicates": duplicates}
+
+
+VAT_WITHHOLDING_RATE = 2  # percent of the invoice net (taxable) total
+
+
+@frappe.whitelist()
+def get_vat_withholding_allocations(doc) -> dict:
+	"""
+	Compute the 2% VAT withholding allocations for a Payment Reconciliation.
+
+	Used by the "Allocate 2%" button on the Allocation table. Each allocation row
+	gets 2% of its invoice's net_total, rounded up to a whole number. For a
+	Customer, a Sales Invoice row is only allocated when the payment is a Journal
+	Entry carrying a VAT Withholding certificate for that invoice (certificate
+	invoice_no = the ETR invoice number or the invoice name); other rows are left
+	as they are.
+
+	Invoice net totals, ETR numbers and certificates are each fetched with one
+	query, whatever the number of rows.
+
+	Args:
+		doc: Payment Reconciliation document state (dict or JSON string)
+
+	Returns:
+		dict with keys:
+			allocations: list of {name, invoice_number, reference_name, allocated_amount}
+			             for the allocation rows to update
+			summary:     list of {reference_name, unreconciled_amount, allocated_amount}
+			skipped:     allocation row names left unchanged
+	"""
+	import math
+
+	from cecypo_powerpack.utils import is_feature_enabled
+
+	if not is_feature_enabled("enable_payment_reconciliation_powerup"):
+		frappe.throw(_("Payment Reconciliation PowerUp is not enabled in PowerPack Settings"))
+
+	doc = frappe.parse_json(doc) or {}
+	party_type = doc.get("party_type")
+	invoice_type = {"Supplier": "Purchase Invoice", "Customer": "Sales Invoice"}.get(party_type)
+	if not invoice_type:
+		frappe.throw(_("2% allocation is only available for Customers and Suppliers"))
+
+	frappe.has_permission(invoice_type, "read", throw=True)
+
+	rows = [
+		r for r in (doc.get("allocation") or [])
+		if r.get("invoice_type") == invoice_type and r.get("invoice_number")
+	]
+	if not rows:
+		return {"allocations": [], "summary": [], "skipped": []}
+
+	invoice_names = list({r["invoice_number"] for r in rows})
+	invoice_fields = ["name", "net_total"]
+	if frappe.get_meta(invoice_type).has_field("etr_invoice_number"):
+		invoice_fields.append("etr_invoice_number")
+	invoices = {
+		inv.name: inv
+		for inv in frappe.get_all(invoice_type, filters={"name": ["in", invoice_names]}, fields=invoice_fields)
+	}
+
+	# Customer: which invoices each Journal Entry carries a withholding certificate for
+	certified = None
+	if party_type == "Customer":
+		certified = set()
+		je_names = list({
+			r["reference_name"] for r in rows
+			if r.get("reference_type") == "Journal Entry" and r.get("reference_name")
+		})
+		if je_names and frappe.db.exists("DocType", "VAT Withholding"):
+			for cert in frappe.get_all(
+				"VAT Withholding",
+				filters={"journal_entry": ["in", je_names]},
+				fields=["journal_entry", "invoice_no"],
+			):
+				if cert.invoice_no:
+					certified.add((cert.journal_entry, cert.invoice_no))
+
+	allocations = []
+	skipped = []
+	summary = {}
+	for row in rows:
+		invoice = invoices.get(row["invoice_number"])
+		if not invoice:
+			skipped.append(row.get("name"))
+			continue
+
+		if certified is not None:
+			reference = row.get("reference_name")
+			if not (
+				(reference, invoice.name) in certified
+				or (invoice.get("etr_invoice_number") and (reference, invoice.etr_invoice_number) in certified)
+			):
+				skipped.append(row.get("name"))
+				continue
+
+		# 2% of taxable amount, rounded up to nearest whole number
+		allocated = math.ceil(frappe.utils.flt(invoice.net_total) * VAT_WITHHOLDING_RATE / 100)
+		allocations.append({
+			"name": row.get("name"),
+			"invoice_number": invoice.name,
+			"reference_name": row.get("reference_name"),
+			"allocated_amount": allocated,
+		})
+
+		reference = row.get("reference_name")
+		if reference:
+			entry = summary.setdefault(reference, {
+				"reference_name": reference,
+				"unreconciled_amount": frappe.utils.flt(row.get("unreconciled_amount")),
+				"allocated_amount": 0,
+			})
+			entry["allocated_amount"] += allocated
+
+	return {"allocations": allocations, "summary": list(summary.values()), "skipped": skipped}
 
 
 @frappe.whitelist()
@@ -1792,181 +2274,54 @@ def update_item_prices(updates) -> dict:
 
 @frappe.whitelist()
 def preview_price_import(file_content: str, file_name: str) -> list:
+    """Synchronous preview for small files sent inline as base64.
+
+    Large files go through the background flow in cecypo_powerpack.price_import
+    (start_price_import), which shares the parser and classifier used here.
+    """
     frappe.has_permission("Item Price", "read", throw=True)
 
     import base64
 
+    from cecypo_powerpack.price_import import classify_rows, iter_chunks
+
     raw = base64.b64decode(file_content)
     rows = _parse_price_file(raw, file_name)
 
-    if not rows:
-        return []
-
-    all_item_codes = list({r["item_code"] for r in rows})
-
-    existing_items = set(
-        frappe.db.get_all("Item", filters=[["name", "in", all_item_codes]], pluck="name")
-    )
-
-    ip_rows = frappe.db.get_all(
-        "Item Price",
-        filters=[["item_code", "in", all_item_codes]],
-        fields=["name", "item_code", "price_list", "price_list_rate"],
-    )
-    item_price_map = {}
-    for ip in ip_rows:
-        key = (ip["item_code"], ip["price_list"])
-        if key not in item_price_map:  # first record wins if duplicates exist
-            item_price_map[key] = ip
-
     enriched = []
-    for row in rows:
-        item_code = row["item_code"]
-        price_list = row["price_list"]
-        rate = row["rate"]
-
-        if item_code not in existing_items:
-            enriched.append({
-                "item_code": item_code,
-                "price_list": price_list,
-                "rate": rate,
-                "existing_rate": None,
-                "item_price_name": None,
-                "status": "missing",
-            })
-            continue
-
-        ip = item_price_map.get((item_code, price_list))
-        if ip:
-            enriched.append({
-                "item_code": item_code,
-                "price_list": price_list,
-                "rate": rate,
-                "existing_rate": ip["price_list_rate"],
-                "item_price_name": ip["name"],
-                "status": "update",
-            })
-        else:
-            enriched.append({
-                "item_code": item_code,
-                "price_list": price_list,
-                "rate": rate,
-                "existing_rate": None,
-                "item_price_name": None,
-                "status": "new",
-            })
-
+    for chunk in iter_chunks(rows):
+        enriched.extend(classify_rows(chunk))
     return enriched
 
 
 def _parse_price_file(raw: bytes, file_name: str) -> list:
-    name_lower = (file_name or "").lower()
-    if name_lower.endswith(".xlsx"):
-        return _parse_xlsx(raw)
-    if name_lower.endswith(".csv"):
-        return _parse_csv(raw)
-    frappe.throw(_("Unsupported file type. Please upload a .xlsx or .csv file."))
-    return []  # unreachable — frappe.throw raises; satisfies type checkers
-
-
-def _parse_csv(raw: bytes) -> list:
-    import csv
     import io
 
-    text = raw.decode("utf-8-sig")
-    reader = csv.DictReader(io.StringIO(text))
-    rows = []
-    for raw_row in reader:
-        row = {k.strip().lower(): v for k, v in raw_row.items() if k}
-        rows.append(row)
-    return _extract_validated_rows(rows)
-
-
-def _parse_xlsx(raw: bytes) -> list:
-    import io
-    import openpyxl
-
-    wb = openpyxl.load_workbook(io.BytesIO(raw), read_only=True, data_only=True)
-    try:
-        ws = wb.active
-        headers = None
-        rows = []
-        for sheet_row in ws.iter_rows(values_only=True):
-            if headers is None:
-                headers = [str(c).strip().lower() if c is not None else "" for c in sheet_row]
-                continue
-            if not any(c is not None for c in sheet_row):
-                continue
-            rows.append(dict(zip(headers, sheet_row)))
-        return _extract_validated_rows(rows)
-    finally:
-        wb.close()
-
-
-def _extract_validated_rows(rows: list) -> list:
-    result = []
-    for row in rows:
-        item_code = str(row.get("item_code") or "").strip()
-        price_list = str(row.get("price_list") or "").strip()
-        rate_raw = row.get("rate")
+    from cecypo_powerpack.price_import import iter_price_rows
 
-        if not item_code or not price_list or rate_raw is None or str(rate_raw).strip() == "":
-            continue
-        try:
-            rate = float(str(rate_raw).replace(",", ""))
-        except (ValueError, TypeError):
-            continue
-
-        result.append({"item_code": item_code, "price_list": price_list, "rate": rate})
-    return result
+    return list(iter_price_rows(io.BytesIO(raw), file_name))
 
 
 @frappe.whitelist()
 def apply_price_import(rows: str) -> dict:
     frappe.has_permission("Item Price", "write", throw=True)
 
+    from cecypo_powerpack.price_import import apply_rows, iter_chunks, price_list_locks
+
     rows = frappe.parse_json(rows)
 
     has_new = any(r.get("status") == "new" for r in rows)
     if has_new:
         frappe.has_permission("Item Price", "create", throw=True)
 
-    updated = 0
-    created = 0
-    skipped = 0
-
-    for row in rows:
-        status = row.get("status")
-        if status == "missing":
-            skipped += 1
-            continue
-
-        item_code = row.get("item_code")
-        price_list = row.get("price_list")
-        rate = frappe.utils.flt(row.get("rate", 0))
-
-        if status == "update":
-            ip_name = row.get("item_price_name")
-            if ip_name:
-                frappe.db.set_value("Item Price", ip_name, "price_list_rate", rate)
-                updated += 1
-            else:
-                skipped += 1
-
-        elif status == "new":
-            try:
-                frappe.get_doc({
-                    "doctype": "Item Price",
-                    "item_code": item_code,
-                    "price_list": price_list,
-                    "price_list_rate": rate,
-                }).insert()
-                created += 1
-            except frappe.exceptions.DuplicateEntryError:
-                frappe.db.rollback()
-                skipped += 1
-
-    return {"updated": updated, "created": created, "skipped": skipped}
+    result = {"updated": 0, "created": 0, "skipped": 0, "unchanged": 0}
+    with price_list_locks(r.get("price_list") for r in rows if r.get("price_list")):
+        for chunk in iter_chunks(rows):
+            for key, value in apply_rows(chunk).items():
+                result[key] += value
+        # commit before the locks are released rather than when the request ends
+        frappe.db.commit()
+    return result
 
 
 @frappe.whitelist()
@@ -0,0 +1,313 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Auto-match proposals for Payment Reconciliation (PowerPack feature).
+
+Proposes allocations between the payments and invoices loaded in the form, in
+three passes, each working on what the previous passes left unallocated:
+
+1. Reference: a bill number or invoice name quoted in the payment's remarks or
+   reference / cheque number (compared on the normalized bill key).
+2. Amount: one payment whose amount equals one invoice's outstanding, within the
+   tolerance; oldest first, each payment and invoice used once.
+3. Combination: one payment equal to the sum of 2..MAX_COMBINATION invoices, or
+   one invoice equal to the sum of two payments. A combination is proposed only
+   when it is the single candidate within the tolerance, and only while the open
+   set is small enough that a sum hitting the target by chance is unlikely
+   (MAX_CHANCE_HITS): among thousands of unrelated amounts some pair always adds
+   up to any target.
+
+The amount and combination passes work on NumPy arrays (a payments x invoices
+comparison matrix, and sorted pairwise sums searched with searchsorted) rather
+than nested Python loops, so 2,000 x 2,000 candidates match in seconds. Every
+proposal carries a score and the rule that produced it; nothing is written until
+the clerk accepts proposals into the allocation table.
+"""
+
+import itertools
+import math
+import re
+
+import frappe
+from frappe.utils import flt, getdate
+
+from cecypo_powerpack.bill_no_index import KEY_FIELD, normalize_bill_no
+from cecypo_powerpack.price_import import iter_chunks
+
+DEFAULT_TOLERANCE = 0.01
+MAX_COMBINATION = 3
+# parts considered by the combination pass (pairwise sums grow quadratically)
+MAX_COMBINATION_PARTS = 2000
+# pair sums probed per candidate; a wider tolerance window counts as ambiguous
+MAX_PROBES = 50
+# expected coincidental sums within the tolerance of a target above which the
+# combination pass of that size is skipped
+MAX_CHANCE_HITS = 0.01
+MIN_KEY_LENGTH = 3
+
+SCORES = {
+	"Reference": 1.0,
+	"Reference (partial)": 0.9,
+	"Amount": 0.8,
+	"Amount (ambiguous)": 0.7,
+	"Combination": 0.6,
+}
+
+_TOKENS = re.compile(r"[A-Za-z0-9][A-Za-z0-9/\-_.]*")
+
+
+# --- Matching engine --------------------------------------------------------------
+
+
+def match_entries(
+	payment_amounts,
+	invoice_amounts,
+	payment_refs=None,
+	invoice_keys=None,
+	tolerance=DEFAULT_TOLERANCE,
+	max_combination=MAX_COMBINATION,
+):
+	"""Proposed allocations between payments and invoices given in matching order.
+
+	payment_refs / invoice_keys: per payment the set of normalized keys it quotes,
+	per invoice the set of keys it is known by.
+
+	Returns [{payment, invoice, allocated_amount, score, rule, group}] where payment
+	and invoice are indexes into the inputs; rows of one match share a group.
+	"""
+	import numpy as np
+
+	balance = np.array([flt(a) for a in payment_amounts], dtype=float)
+	need = np.array([flt(a) for a in invoice_amounts], dtype=float)
+	groups = itertools.count(1)
+	proposals = []
+
+	def allocate(p, i, rule, group):
+		amount = min(balance[p], need[i])
+		if amount <= tolerance:
+			return
+		balance[p] -= amount
+		need[i] -= amount
+		proposals.append({
+			"payment": int(p),
+			"invoice": int(i),
+			"allocated_amount": round(float(amount), 6),
+			"score": SCORES[rule],
+			"rule": rule,
+			"group": group,
+		})
+
+	# 1. Reference
+	if payment_refs and invoice_keys:
+		by_key = {}
+		for i, keys in enumerate(invoice_keys):
+			for key in keys:
+				by_key.setdefault(key, []).append(i)
+		for p, refs in enumerate(payment_refs):
+			quoted = sorted({i for key in refs for i in by_key.get(key, ())})
+			quoted = [i for i in quoted if need[i] > tolerance]
+			if not quoted or balance[p] <= tolerance:
+				continue
+			rule = "Reference" if abs(need[quoted].sum() - balance[p]) <= tolerance else "Reference (partial)"
+			group = next(groups)
+			for i in quoted:
+				allocate(p, i, rule, group)
+
+	# 2. Exact amount, one to one
+	open_p = np.flatnonzero(balance > tolerance)
+	open_i = np.flatnonzero(need > tolerance)
+	if len(open_p) and len(open_i):
+		# invoices x payments
+		close = np.abs(need[open_i][:, None] - balance[open_p][None, :]) <= tolerance
+		counts = close.sum(axis=1)
+		used = np.zeros(len(open_p), dtype=bool)
+		for row in np.flatnonzero(counts):
+			free = np.flatnonzero(close[row] & ~used)
+			if len(free):
+				used[free[0]] = True
+				rule = "Amount" if counts[row] == 1 else "Amount (ambiguous)"
+				allocate(open_p[free[0]], open_i[row], rule, next(groups))
+
+	# 3. Combinations: payment = sum of invoices, then invoice = sum of two payments
+	for size in range(2, max(2, max_combination) + 1):
+		for p, parts in _subset_matches(balance, need, size, tolerance):
+			group = next(groups)
+			for i in parts:
+				allocate(p, i, "Combination", group)
+	for i, parts in _subset_matches(need, balance, 2, tolerance):
+		group = next(groups)
+		for p in parts:
+			allocate(p, i, "Combination", group)
+
+	return proposals
+
+
+def _chance_hits(values, size, tolerance):
+	"""Expected number of size-part sums of values within tolerance of a target by chance."""
+	import numpy as np
+
+	largest = np.sort(values)[-size:].sum()
+	return math.comb(len(values), size) * 2 * tolerance / largest
+
+
+def _subset_matches(targets, parts, size, tolerance):
+	"""[(target, parts)] where size (2 or 3) distinct open parts sum to an open target.
+
+	Pairwise sums of the open parts are sorted once; each target is then found with
+	searchsorted (for triples: target minus each part, all at once). Greedy in
+	target order, every part used at most once, and a target is matched only when
+	exactly one free combination sums to it.
+	"""
+	import numpy as np
+
+	open_t = np.flatnonzero(targets > tolerance)
+	open_a = np.flatnonzero(parts > tolerance)[:MAX_COMBINATION_PARTS]
+	if not len(open_t) or len(open_a) < size or size not in (2, 3):
+		return []
+
+	values = parts[open_a]
+	if _chance_hits(values, size, tolerance) > MAX_CHANCE_HITS:
+		return []
+	x, y = np.triu_indices(len(open_a), k=1)
+	sums = values[x] + values[y]
+	order = np.argsort(sums, kind="stable")
+	sums, x, y = sums[order], x[order], y[order]
+
+	used = np.zeros(len(open_a), dtype=bool)
+	matches = []
+
+	def free_pairs(lo, hi, below=-1):
+		"""Free pairs in sums[lo:hi], at most two (enough to tell unique from ambiguous)."""
+		if hi - lo > MAX_PROBES:
+			return [None, None]
+		found = []
+		for k in range(lo, hi):
+			if not used[x[k]] and not used[y[k]] and below < x[k]:
+				found.append((x[k], y[k]))
+				if len(found) > 1:
+					break
+		return found
+
+	for t in open_t:
+		target = targets[t]
+		candidates = []
+		if size == 2:
+			lo = np.searchsorted(sums, target - tolerance, side="left")
+			hi = np.searchsorted(sums, target + tolerance, side="right")
+			candidates = free_pairs(lo, hi)
+		else:
+			rest = target - values
+			lo = np.searchsorted(sums, rest - tolerance, side="left")
+			hi = np.searchsorted(sums, rest + tolerance, side="right")
+			for z in np.flatnonzero((hi > lo) & ~used):
+				candidates += [pair and (z, *pair) for pair in free_pairs(lo[z], hi[z], below=z)]
+				if len(candidates) > 1:
+					break
+		if len(candidates) == 1:
+			found = candidates[0]
+			used[list(found)] = True
+			matches.append((t, [open_a[a] for a in found]))
+
+	return matches
+
+
+# --- Payment Reconciliation -------------------------------------------------------
+
+
+def _keys(*texts):
+	keys = set()
+	for text in texts:
+		for token in _TOKENS.findall(str(text or "")):
+			key = normalize_bill_no(token)
+			if len(key) >= MIN_KEY_LENGTH and any(c.isdigit() for c in key):
+				keys.add(key)
+	return keys
+
+
+def _payment_references(payments):
+	"""Per payment, the keys quoted in its remarks and reference / cheque number."""
+	numbers = {}
+	for doctype, field in (("Payment Entry", "reference_no"), ("Journal Entry", "cheque_no")):
+		names = [p.get("reference_name") for p in payments if p.get("reference_type") == doctype]
+		for chunk in iter_chunks(names, 1000):
+			for name, number in frappe.get_all(
+				doctype, filters={"name": ["in", chunk]}, fields=["name", field], as_list=True
+			):
+				numbers[(doctype, name)] = number
+	return [
+		_keys(p.get("remarks"), numbers.get((p.get("reference_type"), p.get("reference_name"))))
+		for p in payments
+	]
+
+
+def _invoice_keys(invoices):
+	"""Per invoice, its normalized name plus, for Purchase Invoices, the bill key."""
+	bill_keys = {}
+	names = [i.get("invoice_number") for i in invoices if i.get("invoice_type") == "Purchase Invoice"]
+	for chunk in iter_chunks(names, 1000):
+		for name, key in frappe.get_all(
+			"Purchase Invoice", filters={"name": ["in", chunk]}, fields=["name", KEY_FIELD], as_list=True
+		):
+			if key:
+				bill_keys[name] = key
+	return [
+		{k for k in (normalize_bill_no(i.get("invoice_number")), bill_keys.get(i.get("invoice_number"))) if k}
+		for i in invoices
+	]
+
+
+def propose_allocations(doc, tolerance=None, max_combination=None):
+	"""Scored allocation rows for the payments and invoices loaded in doc.
+
+	Returns {"proposals": [allocation row + score, rule, group], "summary": {...}}.
+	"""
+	from cecypo_powerpack.api import get_invoice_details_for_zero_allocate, make_zero_allocation
+
+	def by_date(rows, fieldname):
+		return sorted(rows, key=lambda r: (not r.get(fieldname), getdate(r.get(fieldname)) if r.get(fieldname) else None))
+
+	payments = by_date([p.as_dict() for p in doc.get("payments") or []], "posting_date")
+	invoices = by_date([i.as_dict() for i in doc.get("invoices") or []], "invoice_date")
+	if not payments or not invoices:
+		return {"proposals": [], "summary": {"payments": len(payments), "invoices": len(invoices)}}
+
+	matches = match_entries(
+		[p.amount for p in payments],
+		[i.outstanding_amount for i in invoices],
+		_payment_references(payments),
+		_invoice_keys(invoices),
+		tolerance=flt(tolerance) or DEFAULT_TOLERANCE,
+		max_combination=int(max_combination or MAX_COMBINATION),
+	)
+
+	matched_invoices = [invoices[m["invoice"]] for m in matches]
+	details = get_invoice_details_for_zero_allocate(doc, matched_invoices)
+	gain_loss_account = frappe.get_cached_doc("Accounts Settings").get("gain_loss_account")
+	posting_date = frappe.utils.nowdate()
+
+	proposals = []
+	for m in matches:
+		invoice = invoices[m["invoice"]]
+		row = make_zero_allocation(
+			payments[m["payment"]],
+			invoice,
+			details.get((invoice.invoice_type, invoice.invoice_number), {}),
+			gain_loss_account,
+			posting_date,
+		)
+		row.update(allocated_amount=m["allocated_amount"], score=m["score"], rule=m["rule"], group=m["group"])
+		proposals.append(row)
+
+	rules = {}
+	for m in matches:
+		rules[m["rule"]] = rules.get(m["rule"], 0) + 1
+	return {
+		"proposals": proposals,
+		"summary": {
+			"payments": len(payments),
+			"invoices": len(invoices),
+			"matched_invoices": len({m["invoice"] for m in matches}),
+			"allocated_amount": sum(m["allocated_amount"] for m in matches),
+			"rules": rules,
+		},
+	}
@@ -0,0 +1,282 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Multi-party batch reconciliation (PowerPack feature).
+
+Runs the Payment Reconciliation pipeline (get unreconciled entries, allocate, zero
+reconcile) for every party of a filtered list, e.g. all suppliers of a group at
+month-end. Parties are split into shards of PARTIES_PER_JOB, one long-queue job per
+shard, so several workers reconcile in parallel. Each party commits on its own and
+holds the same (company, party_type, party, account) lock as the form; a party that
+is being reconciled elsewhere is skipped, not waited for.
+
+Per-party results go to a cache hash; get_batch_reconciliation_report sums them into
+the report (reconciled amounts, skips, failures, invoices and payments left open) and
+is complete once every party has a result.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from cecypo_powerpack.price_import import iter_chunks
+
+PARTIES_PER_JOB = 25
+BATCH_CACHE_PREFIX = "cecypo_powerpack:batch_reconcile:"
+BATCH_CACHE_TTL = 24 * 60 * 60
+PROGRESS_EVENT = "powerpack_batch_reconcile_progress"
+METHODS = ("Allocate", "Auto Match")
+# Auto Match proposals accepted without review in a batch run
+AUTO_MATCH_MIN_SCORE = 0.8
+PARTY_GROUP_FIELDS = {"Customer": "customer_group", "Supplier": "supplier_group"}
+
+
+def _state_key(batch_id):
+	return f"{BATCH_CACHE_PREFIX}{batch_id}"
+
+
+def _results_key(batch_id):
+	return f"{BATCH_CACHE_PREFIX}{batch_id}:results"
+
+
+# --- Party selection --------------------------------------------------------------
+
+
+def get_batch_parties(company, party_type, party_group=None, parties=None):
+	"""Parties of the filter that have at least one open voucher in the company."""
+	if party_type not in PARTY_GROUP_FIELDS:
+		frappe.throw(_("Batch reconciliation supports Customers and Suppliers only"))
+
+	open_parties = frappe.db.sql_list(
+		"""select distinct party from (
+			select party
+			from `tabPayment Ledger Entry`
+			where company = %s and party_type = %s and delinked = 0
+			group by party, against_voucher_type, against_voucher_no
+			having abs(sum(amount)) > 0.005
+		) open_vouchers""",
+		(company, party_type),
+	)
+
+	filters = {"name": ["in", open_parties], "disabled": 0}
+	if parties:
+		filters["name"] = ["in", sorted(set(parties) & set(open_parties))]
+	if party_group:
+		filters[PARTY_GROUP_FIELDS[party_type]] = ["descendants of (inclusive)", party_group]
+	if not filters["name"][1]:
+		return []
+	return frappe.get_all(party_type, filters=filters, pluck="name", order_by="name asc")
+
+
+# --- Jobs -------------------------------------------------------------------------
+
+
+@frappe.whitelist()
+def start_batch_reconciliation(
+	company: str,
+	party_type: str,
+	party_group: str | None = None,
+	parties=None,
+	from_date: str | None = None,
+	to_date: str | None = None,
+	method: str = "Allocate",
+) -> dict:
+	from cecypo_powerpack.utils import is_feature_enabled
+
+	if not is_feature_enabled("enable_payment_reconciliation_powerup"):
+		frappe.throw(_("Payment Reconciliation Powerup is not enabled in PowerPack Settings"))
+	frappe.has_permission("Payment Reconciliation", "write", throw=True)
+	if method not in METHODS:
+		frappe.throw(_("Unknown allocation method {0}").format(method))
+
+	if isinstance(parties, str):
+		parties = frappe.parse_json(parties)
+	batch_parties = get_batch_parties(company, party_type, party_group, parties)
+	if not batch_parties:
+		frappe.throw(_("No {0} with open entries match the filters").format(_(party_type)))
+
+	batch_id = frappe.generate_hash(length=12)
+	options = {
+		"company": company,
+		"party_type": party_type,
+		"from_date": from_date,
+		"to_date": to_date,
+		"method": method,
+	}
+	state = {
+		"batch_id": batch_id,
+		"owner": frappe.session.user,
+		"total": len(batch_parties),
+		"options": options,
+	}
+	frappe.cache().set_value(_state_key(batch_id), state, expires_in_sec=BATCH_CACHE_TTL)
+
+	for shard in iter_chunks(batch_parties, PARTIES_PER_JOB):
+		frappe.enqueue(
+			"cecypo_powerpack.batch_reconciliation.run_batch_reconciliation",
+			queue="long",
+			timeout=3600,
+			batch_id=batch_id,
+			parties=shard,
+			options=options,
+		)
+	return {"batch_id": batch_id, "status": "Queued", "total": len(batch_parties)}
+
+
+def run_batch_reconciliation(batch_id, parties, options):
+	"""Background job: reconcile one shard of parties, committing per party."""
+	from cecypo_powerpack.custom_payment_reconciliation import PartyReconciliationBusyError
+
+	state = frappe.cache().get_value(_state_key(batch_id)) or {}
+	options = frappe._dict(options)
+
+	for party in parties:
+		try:
+			result = reconcile_party(options, party)
+		except PartyReconciliationBusyError:
+			# another run took the party between the free-lock check and our lock
+			frappe.db.rollback()
+			result = {"status": "Skipped", "reason": _("Being reconciled by another user")}
+		except Exception as e:
+			frappe.db.rollback()
+			if not isinstance(e, frappe.ValidationError):
+				frappe.log_error(title=_("PowerPack batch reconciliation failed for {0}").format(party))
+			result = {"status": "Failed", "error": str(e) or e.__class__.__name__}
+
+		frappe.cache().hset(_results_key(batch_id), party, result)
+		frappe.cache().expire(frappe.cache().make_key(_results_key(batch_id)), BATCH_CACHE_TTL)
+		report = get_batch_report(batch_id, include_parties=False)
+		frappe.publish_realtime(PROGRESS_EVENT, report, user=state.get("owner"))
+
+
+def reconcile_party(options, party):
+	"""Get entries, allocate and zero reconcile one party; returns its result row.
+
+	The reconciliation is committed while the party lock is held.
+	"""
+	from erpnext.accounts.party import get_party_account
+	from erpnext.accounts.utils import get_account_currency
+
+	from cecypo_powerpack.custom_payment_reconciliation import (
+		JOB_CACHE_PREFIX,
+		WINDOW_MAX_ENTRIES,
+		_party_lock_name,
+		party_reconciliation_lock,
+	)
+
+	doc = frappe.new_doc("Payment Reconciliation")
+	account = get_party_account(options.party_type, party, options.company)
+	doc.update({
+		"company": options.company,
+		"party_type": options.party_type,
+		"party": party,
+		"receivable_payable_account": account,
+		"party_account_currency": get_account_currency(account),
+		"from_invoice_date": options.from_date,
+		"to_invoice_date": options.to_date,
+		"from_payment_date": options.from_date,
+		"to_payment_date": options.to_date,
+		# the form's default limits would reconcile only the first page of each table
+		"invoice_limit": WINDOW_MAX_ENTRIES,
+		"payment_limit": WINDOW_MAX_ENTRIES,
+	})
+
+	lock = _party_lock_name(doc)
+	if frappe.cache().get_value(JOB_CACHE_PREFIX + lock) or not cint(
+		frappe.db.sql("select is_free_lock(%s)", lock)[0][0]
+	):
+		return {"status": "Skipped", "reason": _("Being reconciled by another user")}
+
+	doc.get_unreconciled_entries()
+	if not doc.payments or not doc.invoices:
+		return {
+			"status": "Skipped",
+			"reason": _("No payments and invoices to match"),
+			"left_open": len(doc.payments) + len(doc.invoices),
+		}
+
+	if options.method == "Auto Match":
+		from cecypo_powerpack.auto_match import propose_allocations
+
+		allocation = [
+			{k: v for k, v in row.items() if k not in ("score", "rule", "group")}
+			for row in propose_allocations(doc)["proposals"]
+			if row["score"] >= AUTO_MATCH_MIN_SCORE
+		]
+		doc.set("allocation", allocation)
+	else:
+		doc.allocate_entries(frappe._dict(
+			payments=[p.as_dict() for p in doc.payments],
+			invoices=[i.as_dict() for i in doc.invoices],
+		))
+
+	doc.allocation = [a for a in doc.allocation if flt(a.allocated_amount) > 0]
+	if not doc.allocation:
+		return {
+			"status": "Skipped",
+			"reason": _("Nothing allocated"),
+			"left_open": len(doc.payments) + len(doc.invoices),
+		}
+
+	left_open = count_left_open(doc)
+	with party_reconciliation_lock(doc, timeout=0):
+		summary = doc._reconcile_without_validation()
+		frappe.db.commit()
+	return {"status": "Reconciled", **summary, "left_open": left_open}
+
+
+def count_left_open(doc):
+	"""Invoices and payments of doc that its allocation does not fully settle."""
+	by_invoice, by_payment = {}, {}
+	for a in doc.allocation:
+		invoice = (a.invoice_type, a.invoice_number)
+		payment = (a.reference_type, a.reference_name, a.reference_row)
+		by_invoice[invoice] = by_invoice.get(invoice, 0) + flt(a.allocated_amount)
+		by_payment[payment] = by_payment.get(payment, 0) + flt(a.allocated_amount)
+
+	open_invoices = sum(
+		1 for i in doc.invoices
+		if flt(i.outstanding_amount) - by_invoice.get((i.invoice_type, i.invoice_number), 0) > 0.005
+	)
+	open_payments = sum(
+		1 for p in doc.payments
+		if flt(p.amount) - by_payment.get((p.reference_type, p.reference_name, p.reference_row), 0) > 0.005
+	)
+	return open_invoices + open_payments
+
+
+# --- Report -----------------------------------------------------------------------
+
+
+def get_batch_report(batch_id, include_parties=True):
+	state = frappe.cache().get_value(_state_key(batch_id))
+	if not state:
+		frappe.throw(_("Batch reconciliation {0} not found or expired").format(batch_id))
+
+	results = frappe.cache().hgetall(_results_key(batch_id)) or {}
+	results = {(k.decode() if isinstance(k, bytes) else k): v for k, v in results.items()}
+	counts = {"Reconciled": 0, "Skipped": 0, "Failed": 0}
+	for result in results.values():
+		counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+	report = {
+		"batch_id": batch_id,
+		"status": "Completed" if len(results) >= state["total"] else "Running",
+		"total": state["total"],
+		"done": len(results),
+		"counts": counts,
+		"allocations": sum(cint(r.get("reconciled")) for r in results.values()),
+		"allocated_amount": sum(flt(r.get("allocated_amount")) for r in results.values()),
+		"left_open": sum(cint(r.get("left_open")) for r in results.values()),
+	}
+	if include_parties:
+		report["parties"] = [{"party": party, **result} for party, result in sorted(results.items())]
+	return report
+
+
+@frappe.whitelist()
+def get_batch_reconciliation_report(batch_id: str) -> dict:
+	state = frappe.cache().get_value(_state_key(batch_id))
+	if state and state["owner"] != frappe.session.user and "System Manager" not in frappe.get_roles():
+		frappe.throw(_("Not permitted"), frappe.PermissionError)
+	return get_batch_report(batch_id)
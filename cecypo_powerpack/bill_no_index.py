@@ -0,0 +1,109 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Normalized supplier bill number key on Purchase Invoice (PowerPack feature).
+
+Supplier statements rarely spell bill numbers the way they were keyed in: "INV/0042",
+"inv 42" and "INV-042" are the same bill. Purchase Invoice carries a hidden
+pp_bill_no_key custom field holding bill_no reduced to its letter and digit runs
+(upper-cased, leading zeros dropped, joined with "-"), set on validate and indexed
+together with supplier and company. "Zero Allocate with Paste" matches pasted bill
+numbers on that key in chunks, so statements of thousands of lines resolve with one
+query per chunk.
+"""
+
+import re
+
+import frappe
+
+from cecypo_powerpack.price_import import iter_chunks
+
+KEY_FIELD = "pp_bill_no_key"
+RESOLVE_CHUNK_SIZE = 500
+
+_RUNS = re.compile(r"[A-Z]+|[0-9]+")
+
+
+def normalize_bill_no(bill_no):
+	runs = _RUNS.findall(str(bill_no or "").upper())
+	return "-".join(run.lstrip("0") or "0" if run.isdigit() else run for run in runs)
+
+
+def set_bill_no_key(doc, method=None):
+	"""Purchase Invoice validate"""
+	doc.set(KEY_FIELD, normalize_bill_no(doc.bill_no) or None)
+
+
+def find_open_invoices(company, supplier, keys):
+	"""Submitted, outstanding Purchase Invoices of the supplier, grouped by bill key.
+
+	One indexed query per RESOLVE_CHUNK_SIZE keys.
+	"""
+	by_key = {}
+	for chunk in iter_chunks(list(dict.fromkeys(k for k in keys if k)), RESOLVE_CHUNK_SIZE):
+		for row in frappe.db.get_all(
+			"Purchase Invoice",
+			filters={
+				"supplier": supplier,
+				"company": company,
+				"docstatus": 1,
+				"outstanding_amount": [">", 0],
+				KEY_FIELD: ["in", chunk],
+			},
+			fields=[
+				"name", "bill_no", KEY_FIELD, "outstanding_amount", "currency",
+				"conversion_rate", "posting_date", "grand_total",
+			],
+			order_by="posting_date asc, name asc",
+		):
+			by_key.setdefault(row[KEY_FIELD], []).append(row)
+	return by_key
+
+
+def setup_bill_no_key():
+	"""Create the key column if missing, fill it and add the composite index.
+
+	Called from after_install and the build_bill_no_key patch: fixtures (which carry
+	the custom field) are synced only after both, so the column may not exist yet.
+	"""
+	from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+	if not frappe.db.has_column("Purchase Invoice", KEY_FIELD):
+		create_custom_field(
+			"Purchase Invoice",
+			{
+				"fieldname": KEY_FIELD,
+				"label": "Normalized Supplier Invoice No",
+				"fieldtype": "Data",
+				"insert_after": "bill_no",
+				"hidden": 1,
+				"read_only": 1,
+				"no_copy": 1,
+				"print_hide": 1,
+				"report_hide": 1,
+				"search_index": 1,
+				"module": "Cecypo PowerPack",
+			},
+		)
+
+	backfill_bill_no_keys()
+	frappe.db.add_index("Purchase Invoice", ["supplier", "company", KEY_FIELD], "pp_supplier_bill_no_key")
+
+
+def backfill_bill_no_keys():
+	"""Set pp_bill_no_key on existing Purchase Invoices (setup_bill_no_key)."""
+	invoices = frappe.get_all(
+		"Purchase Invoice", filters=[["bill_no", "is", "set"]], fields=["name", "bill_no"]
+	)
+	for chunk in iter_chunks(invoices, 1000):
+		names = [inv.name for inv in chunk]
+		frappe.db.sql(
+			"""update `tabPurchase Invoice`
+			set {field} = case name {cases} end
+			where name in ({names})""".format(
+				field=KEY_FIELD,
+				cases=" ".join(["when %s then %s"] * len(chunk)),
+				names=", ".join(["%s"] * len(chunk)),
+			),
+			[v for inv in chunk for v in (inv.name, normalize_bill_no(inv.bill_no) or None)] + names,
+		)
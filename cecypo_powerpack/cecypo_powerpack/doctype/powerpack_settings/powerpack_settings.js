@@ -7,6 +7,7 @@ frappe.ui.form.on('PowerPack Settings', {
 		cecypo_check_min_price_conflict(frm);
 		cecypo_add_load_group_buttons(frm);
 		cecypo_refresh_min_price_grid(frm);
+		cecypo_add_tax_id_report_button(frm);
 	},
 
 	min_selling_price_rules_add: function(frm) { cecypo_refresh_min_price_grid(frm); },
@@ -140,3 +141,67 @@ function cecypo_load_item_groups(frm, is_group) {
 		}
 	});
 }
+
+function cecypo_add_tax_id_report_button(frm) {
+	if (!frappe.user.has_role('System Manager')) return;
+
+	frm.add_custom_button(__('Duplicate Tax ID Report'), function () {
+		frappe.call({
+			method: 'cecypo_powerpack.tax_id_index.start_tax_id_duplicate_report',
+			freeze: true,
+			callback: function (r) {
+				const report_id = r.message && r.message.report_id;
+				if (!report_id) return;
+				frappe.show_alert({ message: __('Scanning customers and suppliers for duplicate tax IDs...'), indicator: 'blue' });
+
+				const handler = function (data) {
+					if (data.report_id !== report_id) return;
+					frappe.realtime.off('powerpack_tax_id_report', handler);
+					frappe.call({
+						method: 'cecypo_powerpack.tax_id_index.get_tax_id_duplicate_report',
+						args: { report_id: report_id },
+						callback: function (res) { cecypo_show_tax_id_report(res.message || {}); }
+					});
+				};
+				frappe.realtime.on('powerpack_tax_id_report', handler);
+			}
+		});
+	}, __('Tools'));
+}
+
+function cecypo_show_tax_id_report(report) {
+	const esc = frappe.utils.escape_html;
+	const clusters = report.clusters || [];
+	let html;
+
+	if (report.status === 'Failed') {
+		html = `<p class="text-danger">${__('The report failed. See the Error Log for details.')}</p>`;
+	} else if (!clusters.length) {
+		html = `<p class="text-muted">${__('No duplicate tax IDs found.')}</p>`;
+	} else {
+		html = `<p class="text-muted">${__('{0} tax IDs are shared by more than one party.', [clusters.length])}</p>
+			<div style="max-height: 60vh; overflow-y: auto;">
+			<table class="table table-sm" style="font-size: 12px;">
+				<thead><tr>
+					<th>${__('Tax ID')}</th><th>${__('Party Type')}</th><th>${__('Party')}</th><th>${__('Name')}</th>
+				</tr></thead><tbody>`;
+		clusters.forEach(function (cluster) {
+			cluster.members.forEach(function (m, i) {
+				html += `<tr>
+					<td>${i ? '' : esc(cluster.normalized_tax_id) + (cluster.cross_doctype ? ` <span class="indicator-pill blue">${__('Customer & Supplier')}</span>` : '')}</td>
+					<td>${__(m.party_type)}</td>
+					<td><a href="/app/${frappe.router.slug(m.party_type)}/${encodeURIComponent(m.party)}" target="_blank">${esc(m.party)}</a></td>
+					<td>${esc(m.party_name || '')}</td>
+				</tr>`;
+			});
+		});
+		html += '</tbody></table></div>';
+	}
+
+	const d = new frappe.ui.Dialog({
+		title: __('Duplicate Tax ID Report'),
+		size: 'large',
+		fields: [{ fieldtype: 'HTML', options: html }]
+	});
+	d.show();
+}
@@ -4,6 +4,13 @@
 import frappe
 from frappe.model.document import Document
 
+from cecypo_powerpack.short_link import HITS_DOCTYPE, clear_link_context
+
 
 class PowerPackShortLink(Document):
-	pass
+	def on_update(self):
+		clear_link_context(self.name)
+
+	def on_trash(self):
+		clear_link_context(self.name)
+		frappe.db.delete(HITS_DOCTYPE, {"short_link": self.name})
@@ -0,0 +1,13 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class PowerPackShortLinkDailyHits(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique("PowerPack Short Link Daily Hits", ["short_link", "date"])
@@ -5,12 +5,209 @@
 Custom Payment Reconciliation Controller
 
 Provides zero-allocation reconciliation without affecting standard reconciliation.
+Large zero reconciliations can run as a background job that reports progress per
+allocation chunk; every run holds a lock on (company, party_type, party, account).
+Parties with thousands of open entries can be loaded as a window: the full candidate
+set is fetched once, cached server-side and served to the form page by page.
+
+The ERPNext functions this controller replaces during reconciliation
+(update_reference_in_journal_entry, check_if_advance_entry_modified,
+update_voucher_outstanding) are swapped for
+dispatchers once, at import. A dispatcher calls the override set for the current
+request or job through a ContextVar, and the original otherwise, so overrides never
+leak across threads or greenlets.
 """
 
+import bisect
+import contextvars
+import functools
+import hashlib
+from contextlib import contextmanager
+
 import frappe
-from frappe import _
-from frappe.utils import flt
 from erpnext.accounts.doctype.payment_reconciliation.payment_reconciliation import PaymentReconciliation
+from frappe import _
+from frappe.utils import cint, cstr, flt, fmt_money, today
+
+RECONCILE_CHUNK_SIZE = 50
+PROGRESS_EVENT = "powerpack_zero_reconcile_progress"
+JOB_CACHE_PREFIX = "cecypo_powerpack:zero_reconcile:"
+JOB_CACHE_TTL = 6 * 60 * 60
+JOB_TIMEOUT = 3600
+WINDOW_CACHE_PREFIX = "cecypo_powerpack:reconcile_window:"
+WINDOW_CACHE_TTL = 60 * 60
+WINDOW_PAGE_SIZE = 200
+WINDOW_MAX_ENTRIES = 100000
+# rows are cached in chunks, so a page request unpickles the key index and one or two chunks
+WINDOW_CHUNK_SIZE = 1000
+# table -> (date field, amount field, voucher type field, voucher no field) for keyset order and range filters
+WINDOW_TABLES = {
+    "invoices": ("invoice_date", "outstanding_amount", "invoice_type", "invoice_number"),
+    "payments": ("posting_date", "amount", "reference_type", "reference_name"),
+}
+
+_journal_entry_update = contextvars.ContextVar("pp_update_reference_in_journal_entry", default=None)
+_advance_entry_check = contextvars.ContextVar("pp_check_if_advance_entry_modified", default=None)
+_voucher_outstanding_update = contextvars.ContextVar("pp_update_voucher_outstanding", default=None)
+
+
+def _get_journal_entry_account_fields():
+    """
+    Journal Entry Account fieldnames copied onto split rows.
+
+    Read from the current meta (so accounting dimensions added at runtime are copied),
+    once per batched reconcile rather than once per allocation.
+    """
+    return frappe.flags.pp_journal_entry_account_fields or frappe.get_meta(
+        "Journal Entry Account"
+    ).get_fieldnames_with_value()
+
+
+def _dispatch(original, override_var):
+    @functools.wraps(original)
+    def dispatcher(*args, **kwargs):
+        return (override_var.get() or original)(*args, **kwargs)
+
+    dispatcher._pp_dispatch = True
+    return dispatcher
+
+
+def _install_dispatch():
+    """Replace the ERPNext functions with context-aware dispatchers (idempotent)."""
+    import erpnext.accounts.utils as erpnext_utils
+
+    for name, override_var in (
+        ("update_reference_in_journal_entry", _journal_entry_update),
+        ("check_if_advance_entry_modified", _advance_entry_check),
+        ("update_voucher_outstanding", _voucher_outstanding_update),
+    ):
+        original = getattr(erpnext_utils, name)
+        if not getattr(original, "_pp_dispatch", False):
+            setattr(erpnext_utils, name, _dispatch(original, override_var))
+
+
+_install_dispatch()
+
+
+@contextmanager
+def reconciliation_overrides(check_if_advance_entry_modified=None):
+    """
+    Use the fixed update_reference_in_journal_entry (and optionally a replacement
+    check_if_advance_entry_modified) for ERPNext calls made inside the block.
+
+    Only the current context sees the overrides; other requests and jobs running in
+    the same process, on other threads or greenlets, keep calling the originals.
+    """
+    tokens = [(_journal_entry_update, _journal_entry_update.set(_fixed_update_reference_in_journal_entry))]
+    if check_if_advance_entry_modified:
+        tokens.append((_advance_entry_check, _advance_entry_check.set(check_if_advance_entry_modified)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def _skip_advance_entry_check(entry):
+    # zero reconcile verifies all allocations up front in verify_advance_entries_unchanged
+    pass
+
+
+def verify_advance_entries_unchanged(entries):
+    """
+    Set-based replacement for check_if_advance_entry_modified.
+
+    For every Payment Entry / Journal Entry row referenced by entries, check that it is
+    still submitted, still belongs to the party and account, and that its unallocated
+    amount still covers the sum allocated against it. One query per voucher type
+    however many allocations there are; throws listing every voucher that changed.
+    """
+    required = {}
+    for entry in entries:
+        key = (entry.voucher_type, entry.voucher_no, entry.voucher_detail_no or None)
+        required[key] = required.get(key, 0) + flt(entry.allocated_amount)
+    if not required:
+        return
+
+    first = entries[0]
+    available = {}
+
+    payment_entries = {voucher_no for voucher_type, voucher_no, _d in required if voucher_type == "Payment Entry"}
+    if payment_entries:
+        details = [d for voucher_type, _v, d in required if voucher_type == "Payment Entry" and d] or [""]
+        for row in frappe.db.sql(
+            """select pe.name, per.name as detail, pe.unallocated_amount, per.allocated_amount as detail_amount
+            from `tabPayment Entry` pe
+            left join `tabPayment Entry Reference` per on per.parent = pe.name and per.name in %(details)s
+            where pe.name in %(names)s and pe.docstatus = 1
+                and pe.party_type = %(party_type)s and pe.party = %(party)s
+                and %(account)s in (pe.paid_from, pe.paid_to)""",
+            {
+                "names": list(payment_entries),
+                "details": details,
+                "account": first.account,
+                "party_type": first.party_type,
+                "party": first.party,
+            },
+            as_dict=True,
+        ):
+            available[("Payment Entry", row.name, None)] = flt(row.unallocated_amount)
+            if row.detail:
+                available[("Payment Entry", row.name, row.detail)] = flt(row.detail_amount)
+
+    journal_rows = [d for voucher_type, _v, d in required if voucher_type == "Journal Entry" and d]
+    if journal_rows:
+        for row in frappe.db.sql(
+            """select jea.parent, jea.name,
+                jea.debit_in_account_currency + jea.credit_in_account_currency as amount
+            from `tabJournal Entry Account` jea
+            inner join `tabJournal Entry` je on je.name = jea.parent
+            where jea.name in %(rows)s and je.docstatus = 1
+                and jea.account = %(account)s and jea.party_type = %(party_type)s and jea.party = %(party)s
+                and ifnull(jea.reference_type, '') in ('', 'Sales Order', 'Purchase Order')""",
+            {
+                "rows": journal_rows,
+                "account": first.account,
+                "party_type": first.party_type,
+                "party": first.party,
+            },
+            as_dict=True,
+        ):
+            available[("Journal Entry", row.parent, row.name)] = flt(row.amount)
+
+    modified = [
+        _("{0} {1}: allocated {2}, only {3} still unallocated").format(
+            _(voucher_type), frappe.bold(voucher_no), amount, available.get((voucher_type, voucher_no, detail), 0)
+        )
+        for (voucher_type, voucher_no, detail), amount in required.items()
+        if amount > available.get((voucher_type, voucher_no, detail), 0) + 0.005
+    ]
+    if modified:
+        frappe.throw(
+            _("These entries have been modified after you pulled them. Please pull them again.")
+            + "<br>" + "<br>".join(modified),
+            title=_("Entries Modified"),
+        )
+
+
+def _reconcile_with_batched_journal_entries(reconcile, *args, **kwargs):
+    """
+    Run a reconcile call with JE split rows applied in memory only.
+
+    reconcile_against_document groups allocations per (voucher_type, voucher_no) and saves
+    each voucher once after all of its allocations are applied, so with
+    pp_batch_journal_entry_updates set the patched update_reference_in_journal_entry does
+    not save the JE per allocation (300 invoices against one JE row = 1 save, not 301).
+    """
+    previous = frappe.flags.pp_batch_journal_entry_updates, frappe.flags.pp_journal_entry_account_fields
+    frappe.flags.pp_batch_journal_entry_updates = True
+    frappe.flags.pp_journal_entry_account_fields = frappe.get_meta(
+        "Journal Entry Account"
+    ).get_fieldnames_with_value()
+    try:
+        return reconcile(*args, **kwargs)
+    finally:
+        frappe.flags.pp_batch_journal_entry_updates, frappe.flags.pp_journal_entry_account_fields = previous
 
 
 def _fixed_update_reference_in_journal_entry(d, journal_entry, do_not_save=False):
@@ -26,8 +223,10 @@ def _fixed_update_reference_in_journal_entry(d, journal_entry, do_not_save=False
 
     Fix: read the actual current balance from jv_detail.get(d["dr_or_cr"]) — the row was
     correctly reduced by the previous iteration, so this value is always current.
+
+    Inside _reconcile_with_batched_journal_entries the JE is not saved here; the caller
+    saves it once after every allocation against it has been applied.
     """
-    from frappe.utils import cstr
     from erpnext.accounts.utils import get_advance_payment_doctypes
 
     jv_detail = journal_entry.get("accounts", {"name": d["voucher_detail_no"]})[0]
@@ -58,7 +257,7 @@ def _fixed_update_reference_in_journal_entry(d, journal_entry, do_not_save=False
 
     [
         new_row.set(field, jv_detail.get(field))
-        for field in frappe.get_meta("Journal Entry Account").get_fieldnames_with_value()
+        for field in _get_journal_entry_account_fields()
     ]
 
     new_row.set(d["dr_or_cr"], d["allocated_amount"])
@@ -87,7 +286,10 @@ def _fixed_update_reference_in_journal_entry(d, journal_entry, do_not_save=False
 
     journal_entry.flags.ignore_validate_update_after_submit = True
     journal_entry.flags.ignore_reposting_on_reconciliation = True
-    if not do_not_save:
+    if frappe.flags.pp_batch_journal_entry_updates:
+        # name the row now: exchange gain/loss journals reference it before the JE is saved
+        new_row.name = frappe.generate_hash(length=10)
+    elif not do_not_save:
         journal_entry.save(ignore_permissions=True)
 
     return new_row
@@ -100,19 +302,22 @@ class CustomPaymentReconciliation(PaymentReconciliation):
     """
 
     def reconcile_allocations(self, skip_ref_details_update_for_pe=False):
-        import erpnext.accounts.utils as erpnext_utils
-        erpnext_utils.update_reference_in_journal_entry = _fixed_update_reference_in_journal_entry
-        super().reconcile_allocations(skip_ref_details_update_for_pe)
+        with reconciliation_overrides():
+            _reconcile_with_batched_journal_entries(
+                super().reconcile_allocations, skip_ref_details_update_for_pe
+            )
 
     @frappe.whitelist()
-    def zero_reconcile(self):
+    def zero_reconcile(self, background=0):
         """
         Custom reconciliation method for zero allocations.
 
         This method:
         1. Filters out zero-amount allocations
-        2. Bypasses "Payment Entry modified" validation
-        3. Performs reconciliation on non-zero allocations
+        2. Verifies all referenced payments at once instead of the per-entry
+           "Payment Entry modified" validation
+        3. Performs reconciliation on non-zero allocations, or with background=1
+           enqueues it and returns the job state (progress arrives on PROGRESS_EVENT)
 
         Does NOT affect standard reconcile() method.
         """
@@ -123,6 +328,7 @@ class CustomPaymentReconciliation(PaymentReconciliation):
             frappe.throw(_("Zero Allocate feature is not enabled in PowerPack Settings"))
 
         # Filter out zero allocations
+        zero_count = 0
         if self.allocation:
             original_count = len(self.allocation)
 
@@ -166,32 +372,118 @@ class CustomPaymentReconciliation(PaymentReconciliation):
                     )
                 )
 
-        # Perform reconciliation without "modified" check
-        self._reconcile_without_validation()
+        if cint(background):
+            return self._enqueue_zero_reconcile(zero_count)
+
+        # Perform reconciliation (set-based "modified" check, under the party lock held
+        # until the request's transaction commits)
+        _check_not_queued(self)
+        with party_reconciliation_lock(self, until_transaction_end=True):
+            self._reconcile_without_validation()
 
         frappe.msgprint(_("Successfully Reconciled"), indicator="green")
 
-    # NOTE: The process-level monkey-patch in zero_reconcile() is safe under preforked
-    # Gunicorn (current bench16 config). Under gevent/gthread it would race across greenlets.
-    def _reconcile_without_validation(self):
+    def _enqueue_zero_reconcile(self, skipped_zero):
+        _check_not_queued(self)
+        lock = _party_lock_name(self)
+        if not cint(frappe.db.sql("select is_free_lock(%s)", lock)[0][0]):
+            _throw_party_busy(self)
+
+        reconcile_id = frappe.generate_hash(length=12)
+        state = {
+            "reconcile_id": reconcile_id,
+            "owner": frappe.session.user,
+            "status": "Queued",
+            "done": 0,
+            "total": len(self.allocation),
+            "skipped_zero": skipped_zero,
+        }
+        frappe.cache().set_value(_job_key(reconcile_id), state, expires_in_sec=JOB_CACHE_TTL)
+        frappe.cache().set_value(JOB_CACHE_PREFIX + lock, reconcile_id, expires_in_sec=JOB_TIMEOUT)
+        frappe.enqueue(
+            "cecypo_powerpack.custom_payment_reconciliation.run_zero_reconcile",
+            queue="long",
+            timeout=JOB_TIMEOUT,
+            reconcile_id=reconcile_id,
+            doc=self.as_dict(),
+        )
+        return state
+
+    @frappe.whitelist()
+    def start_unreconciled_window(self, page_size=WINDOW_PAGE_SIZE):
+        """
+        Windowed alternative to get_unreconciled_entries for very large ledgers.
+
+        Fetches every candidate once (the form's date / amount filters apply, the
+        invoice and payment limits are raised to WINDOW_MAX_ENTRIES), caches the set ordered by
+        (date, voucher type, voucher no, row) and loads only the first page of each table into
+        the form. Further pages come from get_unreconciled_page with a keyset cursor.
+        """
+        from cecypo_powerpack.utils import is_feature_enabled
+
+        if not is_feature_enabled('enable_payment_reconciliation_powerup'):
+            frappe.throw(_("Payment Reconciliation Powerup is not enabled in PowerPack Settings"))
+        if not (self.party and self.receivable_payable_account):
+            frappe.throw(_("Select a Party and Receivable / Payable Account first"))
+
+        limits = (self.invoice_limit, self.payment_limit)
+        self.invoice_limit = self.payment_limit = WINDOW_MAX_ENTRIES
+        try:
+            self.get_unreconciled_entries()
+        finally:
+            self.invoice_limit, self.payment_limit = limits
+
+        window_id = frappe.generate_hash(length=12)
+        cache_key = WINDOW_CACHE_PREFIX + window_id
+        cache = frappe.cache()
+        cache.hset(cache_key, "owner", frappe.session.user)
+
+        result = {"window_id": window_id}
+        for table in WINDOW_TABLES:
+            rows = [row.as_dict(no_default_fields=True) for row in self.get(table)]
+            rows.sort(key=lambda row: _window_key(row, table))
+            index = _window_index(rows, table)
+            cache.hset(cache_key, table, index)
+            for start in range(0, len(rows), WINDOW_CHUNK_SIZE):
+                cache.hset(cache_key, f"{table}:{start // WINDOW_CHUNK_SIZE}", rows[start:start + WINDOW_CHUNK_SIZE])
+
+            page = _window_page(index, lambda positions: [rows[i] for i in positions], page_size=page_size)
+            self.set(table, page.pop("rows"))
+            result[table] = page
+        cache.expire(cache.make_key(cache_key), WINDOW_CACHE_TTL)
+        return result
+
+    @frappe.whitelist()
+    def propose_auto_matches(self, tolerance=None):
+        """Scored allocation proposals for the loaded payments and invoices (see auto_match)."""
+        from cecypo_powerpack.auto_match import propose_allocations
+        from cecypo_powerpack.utils import is_feature_enabled
+
+        if not is_feature_enabled('enable_payment_reconciliation_powerup'):
+            frappe.throw(_("Payment Reconciliation Powerup is not enabled in PowerPack Settings"))
+
+        return propose_allocations(self, tolerance=tolerance)
+
+    def _reconcile_without_validation(self, progress=None):
         """
         Internal method that performs reconciliation without the strict validation.
-        Uses ERPNext's reconcile_against_document but skips "Payment Entry modified" check.
+        Uses ERPNext's reconcile_against_document, with its per-entry "Payment Entry modified"
+        check replaced by verify_advance_entries_unchanged over all allocations at once.
         For credit/debit notes (SI/PI with is_return=1), uses reconcile_dr_cr_note instead.
+
+        Allocations are reconciled in chunks of about RECONCILE_CHUNK_SIZE (never splitting
+        one voucher's allocations); progress(done, total) is called after each chunk.
+        Returns a summary of what was reconciled.
         """
+        from erpnext.accounts.doctype.payment_reconciliation.payment_reconciliation import (
+            reconcile_dr_cr_note,
+        )
         from erpnext.accounts.utils import reconcile_against_document
-        from erpnext.accounts.doctype.payment_reconciliation.payment_reconciliation import reconcile_dr_cr_note
-        import erpnext.accounts.utils
-
-        original_check = erpnext.accounts.utils.check_if_advance_entry_modified
-        erpnext.accounts.utils.update_reference_in_journal_entry = _fixed_update_reference_in_journal_entry
 
-        def dummy_check(entry):
-            pass
-
-        try:
-            erpnext.accounts.utils.check_if_advance_entry_modified = dummy_check
+        from cecypo_powerpack.price_import import iter_chunks
+        from cecypo_powerpack.utils import is_feature_enabled
 
+        with reconciliation_overrides(check_if_advance_entry_modified=_skip_advance_entry_check):
             # Build entry list using parent class logic
             dr_or_cr = "credit_in_account_currency" if self.party_type == "Customer" else "debit_in_account_currency"
 
@@ -239,15 +531,406 @@ class CustomPaymentReconciliation(PaymentReconciliation):
                 else:
                     entry_list.append(reconciled_entry)
 
-            # Use ERPNext's standard reconciliation with validation disabled
+            # ERPNext's per-entry "modified" check is replaced by one set-based check
+            verify_advance_entries_unchanged(entry_list)
             skip_ref_details_update_for_pe = True
 
-            if entry_list:
-                reconcile_against_document(entry_list, skip_ref_details_update_for_pe, self.dimensions)
+            total = len(entry_list) + len(dr_or_cr_notes)
+            done = 0
+
+            for chunk in _voucher_chunks(entry_list, RECONCILE_CHUNK_SIZE):
+                _reconcile_with_batched_journal_entries(
+                    reconcile_against_document, chunk, skip_ref_details_update_for_pe, self.dimensions
+                )
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
 
             # Credit/debit notes require their own reconciliation path that creates a JE
-            if dr_or_cr_notes:
-                reconcile_dr_cr_note(dr_or_cr_notes, self.company, self.dimensions)
+            consolidate = is_feature_enabled("consolidate_credit_note_reconciliation")
+            for chunk in iter_chunks(dr_or_cr_notes, RECONCILE_CHUNK_SIZE):
+                if consolidate:
+                    reconcile_dr_cr_notes_consolidated(chunk, self.company, self.dimensions)
+                else:
+                    reconcile_dr_cr_note(chunk, self.company, self.dimensions)
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+
+            return {
+                "reconciled": total,
+                "payments": len(entry_list),
+                "credit_notes": len(dr_or_cr_notes),
+                "allocated_amount": sum(flt(row.allocated_amount) for row in self.allocation),
+            }
+
+
+# --- Windowed loading of unreconciled entries -----------------------------------
+
+
+def _window_key(row, table):
+    """(date, voucher type, voucher no, row): unique per entry, one voucher can have several rows."""
+    date_field, _amount, type_field, name_field = WINDOW_TABLES[table]
+    return (
+        cstr(row.get(date_field)),
+        cstr(row.get(type_field)),
+        cstr(row.get(name_field)),
+        cstr(row.get("reference_row")),
+    )
 
-        finally:
-            erpnext.accounts.utils.check_if_advance_entry_modified = original_check
+
+def _window_index(rows, table):
+    """(key..., amount) per row in row order: everything paging and range filters read."""
+    amount_field = WINDOW_TABLES[table][1]
+    return [(*_window_key(row, table), flt(row.get(amount_field))) for row in rows]
+
+
+def _window_page(index, fetch_rows, after=None, page_size=WINDOW_PAGE_SIZE, from_date=None, to_date=None,
+                 min_amount=None, max_amount=None):
+    """
+    The page after the keyset cursor, within the optional ranges.
+
+    index is the table's _window_index; fetch_rows(positions) returns the rows at those
+    positions, so only the page itself is loaded.
+    """
+    page_size = max(1, min(cint(page_size) or WINDOW_PAGE_SIZE, 1000))
+    after = tuple(after) if after else None
+
+    matching = [
+        position for position, entry in enumerate(index)
+        if (not from_date or entry[0] >= cstr(from_date))
+        and (not to_date or entry[0] <= cstr(to_date))
+        and (min_amount in (None, "") or entry[-1] >= flt(min_amount))
+        and (max_amount in (None, "") or entry[-1] <= flt(max_amount))
+    ]
+    start = 0
+    if after:
+        start = bisect.bisect_right([index[position][:-1] for position in matching], after)
+
+    positions = matching[start:start + page_size]
+    return {
+        "rows": fetch_rows(positions) if positions else [],
+        "total": len(matching),
+        "start": start,
+        "cursor": list(index[positions[-1]][:-1]) if positions else None,
+        "has_more": start + page_size < len(matching),
+    }
+
+
+def _cached_window_rows(cache_key, table):
+    """fetch_rows for _window_page reading only the cached chunks that hold the positions."""
+    def fetch_rows(positions):
+        chunks = {}
+        rows = []
+        for position in positions:
+            chunk_no, offset = divmod(position, WINDOW_CHUNK_SIZE)
+            if chunk_no not in chunks:
+                chunks[chunk_no] = frappe.cache().hget(cache_key, f"{table}:{chunk_no}") or []
+            if offset >= len(chunks[chunk_no]):
+                frappe.throw(_("This window has expired. Please load the entries again."))
+            rows.append(chunks[chunk_no][offset])
+        return rows
+
+    return fetch_rows
+
+
+@frappe.whitelist()
+def get_unreconciled_page(window_id: str, table: str, after=None, page_size=WINDOW_PAGE_SIZE,
+                          from_date=None, to_date=None, min_amount=None, max_amount=None) -> dict:
+    """Next page of a window opened with start_unreconciled_window (keyset pagination)."""
+    if table not in WINDOW_TABLES:
+        frappe.throw(_("Invalid table {0}").format(table))
+
+    cache_key = WINDOW_CACHE_PREFIX + window_id
+    owner = frappe.cache().hget(cache_key, "owner")
+    index = frappe.cache().hget(cache_key, table)
+    if owner is None or index is None:
+        frappe.throw(_("This window has expired. Please load the entries again."))
+    if owner != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+
+    if isinstance(after, str):
+        after = frappe.parse_json(after)
+    return _window_page(
+        index, _cached_window_rows(cache_key, table), after=after, page_size=page_size,
+        from_date=from_date, to_date=to_date, min_amount=min_amount, max_amount=max_amount,
+    )
+
+
+# --- Consolidated credit / debit note journals ----------------------------------
+
+
+@contextmanager
+def _deferred_outstanding_updates():
+    """Collect update_voucher_outstanding calls made in the block; run each distinct one once after it."""
+    pending = {}
+
+    def collect(*args, **kwargs):
+        pending.setdefault((args, tuple(sorted(kwargs.items()))), None)
+
+    token = _voucher_outstanding_update.set(collect)
+    try:
+        yield
+    finally:
+        _voucher_outstanding_update.reset(token)
+
+    import erpnext.accounts.utils as erpnext_utils
+
+    for args, kwargs in pending:
+        erpnext_utils.update_voucher_outstanding(*args, **dict(kwargs))
+
+
+def _verify_note_outstanding(notes):
+    """Each note's outstanding must cover everything allocated from it (one query per doctype)."""
+    required = {}
+    for inv in notes:
+        key = (inv.voucher_type, inv.voucher_no)
+        required[key] = required.get(key, 0) + flt(inv.allocated_amount)
+
+    outstanding = {}
+    for voucher_type in {voucher_type for voucher_type, _v in required}:
+        names = [voucher_no for vt, voucher_no in required if vt == voucher_type]
+        for name, amount in frappe.get_all(
+            voucher_type, filters={"name": ["in", names]}, fields=["name", "outstanding_amount"], as_list=True
+        ):
+            outstanding[(voucher_type, name)] = abs(flt(amount))
+
+    for (voucher_type, voucher_no), amount in required.items():
+        if outstanding.get((voucher_type, voucher_no), 0) + 0.005 < amount:
+            frappe.throw(
+                _("Outstanding for {0} cannot be less than zero ({1})").format(
+                    frappe.bold(voucher_no), outstanding.get((voucher_type, voucher_no), 0) - amount
+                )
+            )
+
+
+def _dimension_values(inv, active_dimensions):
+    values = {}
+    for dimension in active_dimensions or []:
+        fieldname = dimension.get("fieldname") if isinstance(dimension, dict) else dimension
+        if fieldname:
+            values[fieldname] = inv.get(fieldname)
+    return values
+
+
+def reconcile_dr_cr_notes_consolidated(dr_cr_notes, company, active_dimensions=None):
+    """
+    Opt-in replacement for reconcile_dr_cr_note (consolidate_credit_note_reconciliation).
+
+    reconcile_dr_cr_note submits one Credit/Debit Note Journal Entry per allocation.
+    Here every allocation of the batch becomes a line pair of a single Journal Entry per
+    (voucher type, posting date), and each referenced invoice's outstanding amount is
+    recomputed once after submit instead of once per ledger entry. Allocations with an
+    exchange difference still go through reconcile_dr_cr_note, which books the gain/loss.
+
+    Returns the names of the consolidated Journal Entries.
+    """
+    import erpnext
+    from erpnext.accounts.doctype.payment_reconciliation.payment_reconciliation import reconcile_dr_cr_note
+
+    with_difference = [inv for inv in dr_cr_notes if flt(inv.difference_amount)]
+    if with_difference:
+        reconcile_dr_cr_note(with_difference, company, active_dimensions)
+
+    notes = [inv for inv in dr_cr_notes if not flt(inv.difference_amount)]
+    if not notes:
+        return []
+    _verify_note_outstanding(notes)
+
+    company_currency = erpnext.get_company_currency(company)
+    cost_center = erpnext.get_default_cost_center(company)
+
+    batches = {}
+    for inv in notes:
+        voucher_type = "Credit Note" if inv.voucher_type == "Sales Invoice" else "Debit Note"
+        posting_date = inv.debit_or_credit_note_posting_date or today()
+        batches.setdefault((voucher_type, posting_date), []).append(inv)
+
+    journals = []
+    for (voucher_type, posting_date), invs in batches.items():
+        jv = frappe.new_doc("Journal Entry")
+        jv.update({
+            "voucher_type": voucher_type,
+            "posting_date": posting_date,
+            "company": company,
+            "multi_currency": 1 if any(inv.currency != company_currency for inv in invs) else 0,
+        })
+
+        for inv in invs:
+            reconcile_dr_or_cr = (
+                "debit_in_account_currency"
+                if inv.dr_or_cr == "credit_in_account_currency"
+                else "credit_in_account_currency"
+            )
+            line = {
+                "account": inv.account,
+                "party_type": inv.party_type,
+                "party": inv.party,
+                "cost_center": cost_center,
+                "exchange_rate": inv.exchange_rate,
+                **_dimension_values(inv, active_dimensions),
+            }
+            amount = fmt_money(flt(inv.allocated_amount), currency=company_currency)
+            jv.append("accounts", {
+                **line,
+                inv.dr_or_cr: abs(inv.allocated_amount),
+                "reference_type": inv.against_voucher_type,
+                "reference_name": inv.against_voucher,
+                "user_remark": f"{amount} against {inv.against_voucher}",
+            })
+            jv.append("accounts", {
+                **line,
+                reconcile_dr_or_cr: (
+                    abs(inv.allocated_amount)
+                    if abs(inv.unadjusted_amount) > inv.allocated_amount
+                    else abs(inv.unadjusted_amount)
+                ),
+                "reference_type": inv.voucher_type,
+                "reference_name": inv.voucher_no,
+                "user_remark": f"{amount} from {inv.voucher_no}",
+            })
+
+        jv.flags.ignore_mandatory = True
+        jv.flags.skip_remarks_creation = True
+        jv.flags.ignore_exchange_rate = True
+        jv.is_system_generated = True
+        jv.remark = None
+        with _deferred_outstanding_updates():
+            jv.submit()
+        journals.append(jv.name)
+
+    return journals
+
+
+def _voucher_chunks(entries, size):
+    """Chunks of about size entries that keep each voucher's allocations together."""
+    groups = {}
+    for entry in entries:
+        groups.setdefault((entry.voucher_type, entry.voucher_no), []).append(entry)
+
+    chunk = []
+    for group in groups.values():
+        if chunk and len(chunk) + len(group) > size:
+            yield chunk
+            chunk = []
+        chunk += group
+    if chunk:
+        yield chunk
+
+
+# --- Per-party locking ----------------------------------------------------------
+
+
+class PartyReconciliationBusyError(frappe.ValidationError):
+    """Raised when the party is already being reconciled (lock held or job queued)."""
+
+
+def _party_lock_name(doc):
+    key = "\n".join(
+        cstr(v) for v in (doc.company, doc.party_type, doc.party, doc.receivable_payable_account)
+    )
+    return "pp_reconcile:" + hashlib.sha1(key.encode()).hexdigest()[:32]
+
+
+def _throw_party_busy(doc):
+    frappe.throw(
+        _("{0} {1} is already being reconciled. Please try again once that reconciliation finishes.").format(
+            _(doc.party_type), frappe.bold(doc.party)
+        ),
+        PartyReconciliationBusyError,
+    )
+
+
+def _check_not_queued(doc, reconcile_id=None):
+    """Refuse to start while a background reconciliation of the same party is queued."""
+    queued = frappe.cache().get_value(JOB_CACHE_PREFIX + _party_lock_name(doc))
+    if queued and queued != reconcile_id:
+        _throw_party_busy(doc)
+
+
+@contextmanager
+def party_reconciliation_lock(doc, timeout=10, until_transaction_end=False):
+    """Hold a database advisory lock (GET_LOCK) on the reconciled party for the block.
+
+    The key is (company, party_type, party, receivable/payable account); a second
+    reconciliation of the same party waits up to timeout seconds and then fails.
+
+    With until_transaction_end the lock is kept after the block and released when the
+    transaction commits or rolls back, so it also covers writes the caller commits
+    later (a web request commits only after the method returns).
+    """
+    lock = _party_lock_name(doc)
+    if not cint(frappe.db.sql("select get_lock(%s, %s)", (lock, timeout))[0][0]):
+        _throw_party_busy(doc)
+
+    def release():
+        frappe.db.sql("select release_lock(%s)", lock)
+
+    try:
+        yield
+    except BaseException:
+        release()
+        raise
+    if until_transaction_end:
+        frappe.db.after_commit.add(release)
+        frappe.db.after_rollback.add(release)
+    else:
+        release()
+
+
+# --- Background zero reconcile --------------------------------------------------
+
+
+def _job_key(reconcile_id):
+    return f"{JOB_CACHE_PREFIX}job:{reconcile_id}"
+
+
+def run_zero_reconcile(reconcile_id, doc):
+    """Background job: reconcile doc's allocations, publishing progress per chunk.
+
+    Everything commits together at the end, so a failure leaves nothing reconciled.
+    """
+    key = _job_key(reconcile_id)
+    state = frappe.cache().get_value(key) or {
+        "reconcile_id": reconcile_id,
+        "owner": frappe.session.user,
+        "done": 0,
+        "total": len(doc.get("allocation") or []),
+    }
+    reconciliation = frappe.get_doc(doc)
+
+    def publish(**update):
+        state.update(update)
+        frappe.cache().set_value(key, state, expires_in_sec=JOB_CACHE_TTL)
+        frappe.publish_realtime(PROGRESS_EVENT, state, user=state["owner"])
+
+    try:
+        publish(status="Running")
+        _check_not_queued(reconciliation, reconcile_id)
+        with party_reconciliation_lock(reconciliation, timeout=60):
+            summary = reconciliation._reconcile_without_validation(
+                progress=lambda done, total: publish(done=done, total=total)
+            )
+            frappe.db.commit()
+        publish(status="Done", done=state["total"], summary=summary)
+    except Exception as e:
+        frappe.db.rollback()
+        if not isinstance(e, frappe.ValidationError):
+            frappe.log_error(title=_("PowerPack zero reconcile failed"))
+        publish(
+            status="Failed",
+            error=str(e) if isinstance(e, frappe.ValidationError) else _("Reconciliation failed. Nothing was reconciled."),
+        )
+    finally:
+        if frappe.cache().get_value(JOB_CACHE_PREFIX + _party_lock_name(reconciliation)) == reconcile_id:
+            frappe.cache().delete_value(JOB_CACHE_PREFIX + _party_lock_name(reconciliation))
+
+
+@frappe.whitelist()
+def get_zero_reconcile_status(reconcile_id: str) -> dict:
+    state = frappe.cache().get_value(_job_key(reconcile_id))
+    if not state:
+        return {"reconcile_id": reconcile_id, "status": "Expired"}
+    if state["owner"] != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+    return state
@@ -109,7 +109,7 @@ website_route_rules = [
 # ------------
 
 # before_install = "cecypo_powerpack.install.before_install"
-# after_install = "cecypo_powerpack.install.after_install"
+after_install = "cecypo_powerpack.install.after_install"
 
 # Fixtures
 # --------
@@ -124,7 +124,8 @@ fixtures = [
                 [
                     "POS Profile-enable_powerpack_by_cecypo",
                     "POS Profile-powerpack_column_config",
-                    "Quotation-set_warehouse"
+                    "Quotation-set_warehouse",
+                    "Purchase Invoice-pp_bill_no_key"
                 ]
             ]
         ]
@@ -210,7 +211,21 @@ doc_events = {
 	},
 	"Sales Invoice": {
 		"before_cancel": "cecypo_powerpack.validations.prevent_etr_invoice_cancellation",
-		"validate": "cecypo_powerpack.min_selling_price.validate_min_selling_price"
+		"validate": "cecypo_powerpack.min_selling_price.validate_min_selling_price",
+		"on_submit": "cecypo_powerpack.overdue_summary.on_sales_invoice_change",
+		"on_cancel": "cecypo_powerpack.overdue_summary.on_sales_invoice_change",
+		"on_update_after_submit": "cecypo_powerpack.overdue_summary.on_sales_invoice_change"
+	},
+	"Payment Entry": {
+		"on_submit": "cecypo_powerpack.overdue_summary.on_payment_entry_change",
+		"on_cancel": "cecypo_powerpack.overdue_summary.on_payment_entry_change"
+	},
+	"Journal Entry": {
+		"on_submit": "cecypo_powerpack.overdue_summary.on_journal_entry_change",
+		"on_cancel": "cecypo_powerpack.overdue_summary.on_journal_entry_change"
+	},
+	"Payment Ledger Entry": {
+		"on_submit": "cecypo_powerpack.overdue_summary.on_payment_ledger_entry"
 	},
 	"POS Invoice": {
 		"before_cancel": "cecypo_powerpack.validations.prevent_etr_invoice_cancellation",
@@ -219,14 +234,50 @@ doc_events = {
 	"Delivery Note": {
 		"validate": "cecypo_powerpack.min_selling_price.validate_min_selling_price"
 	},
+	"Purchase Invoice": {
+		"validate": "cecypo_powerpack.bill_no_index.set_bill_no_key"
+	},
 	"Payment Reconciliation": {
 		"validate": "cecypo_powerpack.overrides.validate_allocation_with_zero_support"
+	},
+	"Customer": {
+		"on_update": "cecypo_powerpack.tax_id_index.sync_party",
+		"on_trash": "cecypo_powerpack.tax_id_index.remove_party",
+		"after_rename": "cecypo_powerpack.tax_id_index.rename_party"
+	},
+	"Supplier": {
+		"on_update": "cecypo_powerpack.tax_id_index.sync_party",
+		"on_trash": "cecypo_powerpack.tax_id_index.remove_party",
+		"after_rename": "cecypo_powerpack.tax_id_index.rename_party"
+	},
+	"Company": {
+		"on_update": "cecypo_powerpack.short_link.clear_context_cache",
+		"on_trash": "cecypo_powerpack.short_link.clear_context_cache",
+		"after_rename": "cecypo_powerpack.short_link.clear_context_cache"
+	},
+	"PowerPack Settings": {
+		"on_update": "cecypo_powerpack.short_link.clear_context_cache"
+	},
+	"Website Settings": {
+		"on_update": "cecypo_powerpack.short_link.clear_context_cache"
+	},
+	"Global Defaults": {
+		"on_update": "cecypo_powerpack.short_link.clear_context_cache"
 	}
 }
 
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"all": [
+		"cecypo_powerpack.short_link.flush_clicks"
+	],
+	"daily": [
+		"cecypo_powerpack.overdue_summary.rebuild_all"
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"cecypo_powerpack.tasks.all"
@@ -0,0 +1,20 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Install hooks.
+
+Patches are marked as applied without running when the app is installed on an
+existing site, so the derived tables they build are filled here as well. after_install
+also runs before fixtures are synced, so custom fields those builds need are created
+here if missing.
+"""
+
+
+def after_install():
+	from cecypo_powerpack.bill_no_index import setup_bill_no_key
+	from cecypo_powerpack.overdue_summary import rebuild_all
+	from cecypo_powerpack.tax_id_index import rebuild_index
+
+	rebuild_index()
+	rebuild_all()
+	setup_bill_no_key()
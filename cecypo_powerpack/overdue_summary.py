@@ -0,0 +1,209 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Precomputed customer overdue summary for the overdue-invoice popup (PowerPack feature).
+
+PowerPack Customer Overdue Summary keeps one row per (customer, company) that has
+overdue Sales Invoices: count, total outstanding, oldest due date, ageing buckets and
+the TOP_N oldest invoices. The popup on Quotation / Sales Order / Sales Invoice / POS
+Invoice reads that row instead of scanning the customer's invoices.
+
+Rows are refreshed for the affected customers whenever an invoice, payment or
+allocation changes outstanding amounts (doc events mark the pair, and one refresh per
+pair runs just before the transaction commits). Invoices also become overdue simply
+because the date moves on, so a daily job rebuilds every row in one pass; if that job
+has not run yet today, reads fall back to refreshing the requested pair.
+"""
+
+import json
+
+import frappe
+from frappe.utils import getdate, today
+
+from cecypo_powerpack.price_import import iter_chunks
+
+SUMMARY_DOCTYPE = "PowerPack Customer Overdue Summary"
+TOP_N = 20
+ROLLOVER_KEY = "cecypo_powerpack_overdue_rollover"
+
+_FIELDS = [
+	"customer", "company", "customer_name", "currency", "as_of",
+	"overdue_count", "total_outstanding", "oldest_due_date",
+	"ageing_0_30", "ageing_31_60", "ageing_61_90", "ageing_90_plus",
+	"top_invoices",
+]
+
+
+# --- Computation ----------------------------------------------------------------
+
+
+def _overdue_condition(pairs):
+	"""SQL condition and values for overdue invoices, optionally of the given pairs."""
+	cond = "si.docstatus = 1 and si.outstanding_amount > 0.001 and si.due_date < %s"
+	values = [today()]
+	if pairs is not None:
+		placeholders = ", ".join(["(%s, %s)"] * len(pairs))
+		cond += f" and (si.customer, si.company) in ({placeholders})"
+		values += [v for pair in pairs for v in pair]
+	return cond, values
+
+
+def compute_summaries(pairs=None):
+	"""{(customer, company): summary row} for overdue invoices, all pairs if pairs is None.
+
+	One grouped aggregate plus one ROW_NUMBER() query for the top invoices.
+	"""
+	cond, values = _overdue_condition(pairs)
+	on = today()
+	summaries = {}
+
+	for row in frappe.db.sql(
+		f"""select si.customer, si.company,
+			max(si.customer_name) as customer_name, max(si.currency) as currency,
+			count(*) as overdue_count,
+			sum(si.outstanding_amount) as total_outstanding,
+			min(si.due_date) as oldest_due_date,
+			sum(case when datediff(%s, si.due_date) <= 30 then si.outstanding_amount else 0 end) as ageing_0_30,
+			sum(case when datediff(%s, si.due_date) between 31 and 60 then si.outstanding_amount else 0 end) as ageing_31_60,
+			sum(case when datediff(%s, si.due_date) between 61 and 90 then si.outstanding_amount else 0 end) as ageing_61_90,
+			sum(case when datediff(%s, si.due_date) > 90 then si.outstanding_amount else 0 end) as ageing_90_plus
+		from `tabSales Invoice` si
+		where {cond}
+		group by si.customer, si.company""",
+		[on] * 4 + values,
+		as_dict=True,
+	):
+		row.as_of = on
+		row.top_invoices = []
+		summaries[(row.customer, row.company)] = row
+
+	if summaries:
+		for inv in frappe.db.sql(
+			f"""select name, customer, company, due_date, grand_total, outstanding_amount, currency
+			from (
+				select si.name, si.customer, si.company, si.due_date, si.grand_total,
+					si.outstanding_amount, si.currency,
+					row_number() over (partition by si.customer, si.company order by si.due_date, si.name) as rn
+				from `tabSales Invoice` si
+				where {cond}
+			) ranked
+			where rn <= %s
+			order by due_date, name""",
+			[*values, TOP_N],
+			as_dict=True,
+		):
+			summary = summaries.get((inv.pop("customer"), inv.pop("company")))
+			if summary:
+				inv.due_date = str(inv.due_date)
+				summary.top_invoices.append(inv)
+
+	return summaries
+
+
+def _store(summaries, pairs=None):
+	"""Replace the stored rows of pairs (all rows if None) with summaries."""
+	if pairs is None:
+		frappe.db.delete(SUMMARY_DOCTYPE)
+	else:
+		for chunk in iter_chunks(pairs, 500):
+			placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+			frappe.db.sql(
+				f"delete from `tabPowerPack Customer Overdue Summary` where (customer, company) in ({placeholders})",
+				[v for pair in chunk for v in pair],
+			)
+
+	now = frappe.utils.now()
+	user = frappe.session.user
+	for chunk in iter_chunks(summaries.values()):
+		frappe.db.bulk_insert(
+			SUMMARY_DOCTYPE,
+			["name", "owner", "creation", "modified", "modified_by", *_FIELDS],
+			[
+				(
+					frappe.generate_hash(length=10), user, now, now, user,
+					*(json.dumps(s.top_invoices, default=str) if f == "top_invoices" else s.get(f) for f in _FIELDS),
+				)
+				for s in chunk
+			],
+		)
+
+
+def refresh_pairs(pairs):
+	pairs = [p for p in set(pairs) if p[0] and p[1]]
+	if pairs:
+		_store(compute_summaries(pairs), pairs)
+
+
+def rebuild_all():
+	"""Daily job (and after_install / patch): recompute every summary for today's date."""
+	_store(compute_summaries())
+	frappe.db.set_global(ROLLOVER_KEY, today())
+
+
+# --- Maintenance (doc events) ---------------------------------------------------
+
+
+def mark_dirty(customer, company):
+	"""Queue a refresh of (customer, company) for just before the transaction commits."""
+	if not customer or not company:
+		return
+	if frappe.flags.pp_overdue_dirty is None:
+		frappe.flags.pp_overdue_dirty = set()
+		frappe.db.before_commit.add(_flush_dirty)
+		frappe.db.after_rollback.add(_discard_dirty)
+	frappe.flags.pp_overdue_dirty.add((customer, company))
+
+
+def _flush_dirty():
+	pairs, frappe.flags.pp_overdue_dirty = frappe.flags.pp_overdue_dirty, None
+	if pairs:
+		refresh_pairs(pairs)
+
+
+def _discard_dirty():
+	frappe.flags.pp_overdue_dirty = None
+
+
+def on_sales_invoice_change(doc, method=None):
+	"""Sales Invoice on_submit / on_cancel / on_update_after_submit"""
+	mark_dirty(doc.customer, doc.company)
+
+
+def on_payment_entry_change(doc, method=None):
+	"""Payment Entry on_submit / on_cancel"""
+	if doc.party_type == "Customer":
+		mark_dirty(doc.party, doc.company)
+
+
+def on_journal_entry_change(doc, method=None):
+	"""Journal Entry on_submit / on_cancel"""
+	for row in doc.get("accounts") or []:
+		if row.party_type == "Customer":
+			mark_dirty(row.party, doc.company)
+
+
+def on_payment_ledger_entry(doc, method=None):
+	"""Payment Ledger Entry on_submit: covers reconciliation and other allocations."""
+	if doc.party_type == "Customer":
+		mark_dirty(doc.party, doc.company)
+
+
+# --- Read -----------------------------------------------------------------------
+
+
+def get_summaries(customer, company=None):
+	"""Stored summary rows for the customer (one company, or all), fresh for today."""
+	filters = {"customer": customer}
+	if company:
+		filters["company"] = company
+
+	if frappe.db.get_global(ROLLOVER_KEY) != today():
+		# the daily rollover has not run yet: refresh this customer on the spot
+		companies = [company] if company else frappe.get_all("Company", pluck="name")
+		refresh_pairs((customer, c) for c in companies)
+
+	rows = frappe.get_all(SUMMARY_DOCTYPE, filters=filters, fields=_FIELDS, order_by="oldest_due_date asc")
+	for row in rows:
+		row.top_invoices = json.loads(row.top_invoices or "[]")
+		row.oldest_due_date = getdate(row.oldest_due_date) if row.oldest_due_date else None
+	return rows
@@ -0,0 +1,5 @@
+from cecypo_powerpack.bill_no_index import setup_bill_no_key
+
+
+def execute():
+	setup_bill_no_key()
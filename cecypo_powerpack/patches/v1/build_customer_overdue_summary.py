@@ -0,0 +1,5 @@
+from cecypo_powerpack.overdue_summary import rebuild_all
+
+
+def execute():
+	rebuild_all()
@@ -0,0 +1,5 @@
+from cecypo_powerpack.tax_id_index import rebuild_index
+
+
+def execute():
+	rebuild_index()
@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	# The bulk price editor endpoints now live in cecypo_powerpack.api; the API Server
+	# Script copies shipped as fixtures are no longer synced, so drop the installed ones.
+	for name in ("fetch_item_prices", "save_item_prices"):
+		if frappe.db.exists("Server Script", {"name": name, "module": "Cecypo PowerPack"}):
+			frappe.delete_doc("Server Script", name, ignore_permissions=True, force=True)
@@ -0,0 +1,381 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Bulk Item Price adjustment and price-list copy (PowerPack feature).
+
+Two operations, each a handful of set-based statements run in a background job:
+
+- adjust: raise/lower every generic price in a price list (optionally limited to an
+  Item Group subtree) by a percentage or an absolute amount; customer-, supplier- and
+  batch-specific prices are left alone, as in copy and export
+- copy: create the source list's prices in a target list with a markup, optionally
+  overwriting prices the target already has
+
+New rates can be rounded to a step (e.g. 5 or 0.05) up, down or to the nearest.
+preview_price_adjustment returns the number of affected prices and a sample. Before
+writing, the job saves a snapshot (old rates of touched prices and names of created
+ones) as a private File on the Price List; start_price_adjustment_rollback restores it.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from cecypo_powerpack.price_import import CHUNK_SIZE, _bulk_update_rates, price_list_locks, rate_precision
+
+PROGRESS_EVENT = "powerpack_price_adjustment_progress"
+OPERATIONS = ("Adjust", "Copy")
+MODES = ("Percent", "Amount")
+ROUNDING = {"Nearest": "round", "Up": "ceil", "Down": "floor"}
+SAMPLE_SIZE = 10
+
+GENERIC = "ifnull({0}.customer, '') = '' and ifnull({0}.supplier, '') = '' and ifnull({0}.batch_no, '') = ''"
+# a copied price corresponds to the target price of the same item in the same UOM
+SAME_PRICE = "{0}.item_code = {1}.item_code and ifnull({0}.uom, '') = ifnull({1}.uom, '')"
+
+
+# --- Options ------------------------------------------------------------------
+
+
+def _parse_options(
+	operation, price_list, value=0, mode="Percent", item_group=None, target_price_list=None,
+	round_to=0, rounding="Nearest", overwrite_existing=0,
+):
+	if operation not in OPERATIONS:
+		frappe.throw(_("Operation must be one of {0}").format(", ".join(OPERATIONS)))
+	if mode not in MODES:
+		frappe.throw(_("Mode must be one of {0}").format(", ".join(MODES)))
+	if rounding not in ROUNDING:
+		frappe.throw(_("Rounding must be one of {0}").format(", ".join(ROUNDING)))
+	if flt(round_to) < 0:
+		frappe.throw(_("Round To cannot be negative"))
+
+	options = frappe._dict(
+		operation=operation,
+		price_list=price_list,
+		target_price_list=target_price_list if operation == "Copy" else None,
+		item_group=item_group or None,
+		mode=mode,
+		value=flt(value),
+		round_to=flt(round_to),
+		rounding=rounding,
+		overwrite_existing=cint(overwrite_existing),
+	)
+
+	frappe.get_doc("Price List", price_list).check_permission("read")
+	if options.item_group and not frappe.db.exists("Item Group", options.item_group):
+		frappe.throw(_("Item Group {0} not found").format(options.item_group))
+	if operation == "Copy":
+		if not target_price_list or target_price_list == price_list:
+			frappe.throw(_("Choose a Target Price List different from the source"))
+		source_currency = frappe.db.get_value("Price List", price_list, "currency")
+		target = frappe.db.get_value(
+			"Price List", target_price_list, ["currency", "buying", "selling"], as_dict=True
+		)
+		if not target:
+			frappe.throw(_("Price List {0} not found").format(target_price_list))
+		if target.currency != source_currency:
+			frappe.throw(
+				_("Price Lists {0} and {1} have different currencies; copy with a markup only works within one currency").format(
+					price_list, target_price_list
+				)
+			)
+		options.target = target
+	elif not options.value:
+		frappe.throw(_("Enter a non-zero adjustment"))
+
+	return options
+
+
+def _check_write_permission(options):
+	frappe.has_permission("Item Price", "write", throw=True)
+	if options.operation == "Copy":
+		frappe.has_permission("Item Price", "create", throw=True)
+
+
+# --- SQL fragments ------------------------------------------------------------
+
+
+def _values(options):
+	values = {
+		"price_list": options.price_list,
+		"target_price_list": options.target_price_list,
+		"value": options.value,
+		"step": options.round_to,
+		"now": frappe.utils.now(),
+		"user": frappe.session.user,
+	}
+	if options.item_group:
+		values["ig_lft"], values["ig_rgt"] = frappe.db.get_value(
+			"Item Group", options.item_group, ["lft", "rgt"]
+		)
+	return values
+
+
+def _rate_expr(options, column):
+	"""SQL for the new rate computed from column, with the chosen rounding."""
+	if options.mode == "Percent":
+		base = f"{column} * (1 + %(value)s / 100)"
+	else:
+		base = f"{column} + %(value)s"
+
+	if options.round_to:
+		expr = f"{ROUNDING[options.rounding]}(({base}) / %(step)s) * %(step)s"
+	else:
+		expr = f"round({base}, {rate_precision()})"
+	return f"greatest({expr}, 0)"
+
+
+def _group_cond(options, alias):
+	if not options.item_group:
+		return ""
+	return f"""and {alias}.item_code in (
+		select i.name from `tabItem` i
+		join `tabItem Group` ig on ig.name = i.item_group
+		where ig.lft >= %(ig_lft)s and ig.rgt <= %(ig_rgt)s)"""
+
+
+def _changed_prices_query(options, columns):
+	"""SELECT over the prices the operation would overwrite, with their new rate."""
+	if options.operation == "Adjust":
+		new_rate = _rate_expr(options, "ip.price_list_rate")
+		return f"""select {columns}, {new_rate} as new_rate
+			from `tabItem Price` ip
+			where ip.price_list = %(price_list)s and {GENERIC.format("ip")} {_group_cond(options, "ip")}
+				and ip.price_list_rate != {new_rate}"""
+
+	new_rate = _rate_expr(options, "src.price_list_rate")
+	return f"""select {columns}, {new_rate} as new_rate
+		from `tabItem Price` ip
+		join `tabItem Price` src
+			on {SAME_PRICE.format("src", "ip")} and src.price_list = %(price_list)s and {GENERIC.format("src")}
+		where ip.price_list = %(target_price_list)s and {GENERIC.format("ip")}
+			{_group_cond(options, "src")}
+			and ip.price_list_rate != {new_rate}"""
+
+
+def _new_prices_query(options, columns):
+	"""SELECT over source prices the copy would create in the target list."""
+	return f"""select {columns}
+		from `tabItem Price` src
+		where src.price_list = %(price_list)s and {GENERIC.format("src")}
+			{_group_cond(options, "src")}
+			and not exists (
+				select 1 from `tabItem Price` ip
+				where {SAME_PRICE.format("ip", "src")} and ip.price_list = %(target_price_list)s
+					and {GENERIC.format("ip")})"""
+
+
+# --- Endpoints ----------------------------------------------------------------
+
+
+@frappe.whitelist()
+def preview_price_adjustment(**kwargs) -> dict:
+	"""Count (and sample) the prices an adjustment or copy would touch."""
+	kwargs.pop("cmd", None)
+	options = _parse_options(**kwargs)
+	_check_write_permission(options)
+	values = _values(options)
+
+	result = {"update": 0, "create": 0, "sample": []}
+	if options.operation == "Adjust" or options.overwrite_existing:
+		query = _changed_prices_query(options, "ip.item_code, ip.price_list_rate as old_rate")
+		result["update"] = frappe.db.sql(f"select count(*) from ({query}) t", values)[0][0]
+		result["sample"] = frappe.db.sql(f"{query} order by ip.item_code limit {SAMPLE_SIZE}", values, as_dict=True)
+
+	if options.operation == "Copy":
+		query = _new_prices_query(options, f"src.item_code, null as old_rate, {_rate_expr(options, 'src.price_list_rate')} as new_rate")
+		result["create"] = frappe.db.sql(f"select count(*) from ({query}) t", values)[0][0]
+		if len(result["sample"]) < SAMPLE_SIZE:
+			result["sample"] += frappe.db.sql(
+				f"{query} order by src.item_code limit {SAMPLE_SIZE - len(result['sample'])}", values, as_dict=True
+			)
+
+	return result
+
+
+@frappe.whitelist()
+def start_price_adjustment(**kwargs) -> dict:
+	kwargs.pop("cmd", None)
+	options = _parse_options(**kwargs)
+	_check_write_permission(options)
+
+	job_id = frappe.generate_hash(length=12)
+	frappe.enqueue(
+		"cecypo_powerpack.price_adjustment.run_price_adjustment",
+		queue="long",
+		timeout=3600,
+		adjustment_id=job_id,
+		options=dict(kwargs),
+	)
+	return {"job_id": job_id, "status": "Queued"}
+
+
+def run_price_adjustment(adjustment_id, options):
+	"""Background job: snapshot, then apply the operation in a few statements."""
+	user = frappe.session.user
+	options = _parse_options(**options)
+	values = _values(options)
+	locked = [options.price_list] + ([options.target_price_list] if options.target_price_list else [])
+
+	try:
+		with price_list_locks(locked, timeout=300):
+			snapshot = {
+				"operation": options.operation,
+				"price_list": options.target_price_list or options.price_list,
+				"prices": [],
+				"created": [],
+			}
+			updated = created = 0
+
+			if options.operation == "Adjust" or options.overwrite_existing:
+				changed = frappe.db.sql(
+					_changed_prices_query(options, "ip.name, ip.price_list_rate"), values
+				)
+				snapshot["prices"] = [[name, flt(rate)] for name, rate, _new in changed]
+				if changed:
+					_update_changed(options, values)
+					updated = len(changed)
+
+			if options.operation == "Copy":
+				created = _insert_copies(options, values)
+				snapshot["created"] = frappe.get_all(
+					"Item Price",
+					filters={
+						"price_list": options.target_price_list,
+						"creation": values["now"],
+						"owner": user,
+					},
+					pluck="name",
+				)
+
+			snapshot_url = _save_snapshot(adjustment_id, snapshot) if (updated or created) else None
+			frappe.db.commit()
+
+		frappe.publish_realtime(
+			PROGRESS_EVENT,
+			{"job_id": adjustment_id, "status": "Done", "updated": updated, "created": created, "snapshot": snapshot_url},
+			user=user,
+		)
+	except Exception as e:
+		frappe.db.rollback()
+		if not isinstance(e, frappe.ValidationError):
+			frappe.log_error(title=_("PowerPack price adjustment failed"))
+		frappe.publish_realtime(
+			PROGRESS_EVENT,
+			{"job_id": adjustment_id, "status": "Failed", "error": str(e) if isinstance(e, frappe.ValidationError) else _("Price adjustment failed.")},
+			user=user,
+		)
+
+
+def _update_changed(options, values):
+	if options.operation == "Adjust":
+		new_rate = _rate_expr(options, "ip.price_list_rate")
+		frappe.db.sql(
+			f"""update `tabItem Price` ip
+			set ip.price_list_rate = {new_rate}, ip.modified = %(now)s, ip.modified_by = %(user)s
+			where ip.price_list = %(price_list)s and {GENERIC.format("ip")} {_group_cond(options, "ip")}
+				and ip.price_list_rate != {new_rate}""",
+			values,
+		)
+	else:
+		new_rate = _rate_expr(options, "src.price_list_rate")
+		frappe.db.sql(
+			f"""update `tabItem Price` ip
+			join `tabItem Price` src
+				on {SAME_PRICE.format("src", "ip")} and src.price_list = %(price_list)s and {GENERIC.format("src")}
+			set ip.price_list_rate = {new_rate}, ip.modified = %(now)s, ip.modified_by = %(user)s
+			where ip.price_list = %(target_price_list)s and {GENERIC.format("ip")}
+				{_group_cond(options, "src")}
+				and ip.price_list_rate != {new_rate}""",
+			values,
+		)
+
+
+def _insert_copies(options, values):
+	values = dict(values, salt=frappe.generate_hash(length=8), **options.target)
+	columns = f"""substr(md5(concat(src.name, %(salt)s)), 1, 10), %(user)s, %(now)s, %(now)s, %(user)s, 0,
+		src.item_code, src.item_name, src.item_description, src.uom, src.packing_unit,
+		%(target_price_list)s, %(currency)s, %(buying)s, %(selling)s,
+		{_rate_expr(options, "src.price_list_rate")}"""
+	frappe.db.sql(
+		f"""insert into `tabItem Price` (
+			name, owner, creation, modified, modified_by, docstatus,
+			item_code, item_name, item_description, uom, packing_unit,
+			price_list, currency, buying, selling, price_list_rate
+		) {_new_prices_query(options, columns)}""",
+		values,
+	)
+	return frappe.db.sql("select row_count()")[0][0]
+
+
+def _save_snapshot(job_id, snapshot):
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": f"price-adjustment-{frappe.utils.nowdate()}-{job_id}.json",
+		"is_private": 1,
+		"attached_to_doctype": "Price List",
+		"attached_to_name": snapshot["price_list"],
+		"content": json.dumps(snapshot),
+	}).insert(ignore_permissions=True)
+	return file_doc.file_url
+
+
+# --- Rollback -----------------------------------------------------------------
+
+
+@frappe.whitelist()
+def start_price_adjustment_rollback(snapshot: str) -> dict:
+	"""Enqueue restoring a snapshot written by run_price_adjustment."""
+	frappe.has_permission("Item Price", "write", throw=True)
+	frappe.has_permission("Item Price", "delete", throw=True)
+
+	file_doc = frappe.get_doc("File", {"file_url": snapshot})
+	file_doc.check_permission("read")
+
+	job_id = frappe.generate_hash(length=12)
+	frappe.enqueue(
+		"cecypo_powerpack.price_adjustment.run_price_adjustment_rollback",
+		queue="long",
+		timeout=3600,
+		adjustment_id=job_id,
+		file_name=file_doc.name,
+	)
+	return {"job_id": job_id, "status": "Queued"}
+
+
+def run_price_adjustment_rollback(adjustment_id, file_name):
+	"""Background job: restore old rates and delete created prices, then drop the snapshot."""
+	user = frappe.session.user
+	try:
+		file_doc = frappe.get_doc("File", file_name)
+		snapshot = json.loads(file_doc.get_content())
+
+		with price_list_locks([snapshot["price_list"]], timeout=300):
+			prices = snapshot.get("prices") or []
+			for start in range(0, len(prices), CHUNK_SIZE):
+				_bulk_update_rates(dict(prices[start : start + CHUNK_SIZE]))
+
+			created = snapshot.get("created") or []
+			for start in range(0, len(created), CHUNK_SIZE):
+				frappe.db.delete("Item Price", {"name": ["in", created[start : start + CHUNK_SIZE]]})
+
+			# A snapshot is single-use: restoring it twice would undo later edits
+			file_doc.delete(ignore_permissions=True)
+			frappe.db.commit()
+
+		frappe.publish_realtime(
+			PROGRESS_EVENT,
+			{"job_id": adjustment_id, "status": "Done", "restored": len(prices), "deleted": len(created)},
+			user=user,
+		)
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title=_("PowerPack price adjustment rollback failed"))
+		frappe.publish_realtime(
+			PROGRESS_EVENT,
+			{"job_id": adjustment_id, "status": "Failed", "error": _("Rolling back the price adjustment failed.")},
+			user=user,
+		)
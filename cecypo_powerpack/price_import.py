@@ -0,0 +1,728 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Background Item Price import (PowerPack feature).
+
+The Item Price list's "Import Prices (PowerPack)" dialog uploads the spreadsheet as a
+private File and calls start_price_import. A background job then streams the file in
+chunks, classifies every chunk against Item / Item Price with set-based lookups and
+keeps the classified rows in the cache, publishing progress over realtime. The dialog
+pages through the stored preview with get_price_import_page and applies it with
+start_price_import_apply, so the rows never travel back and forth through the browser.
+
+The "Export Prices (PowerPack)" action is the other half: start_price_export streams
+a price list from a server-side cursor into an .xlsx (openpyxl write_only) or .csv
+File in the same item_code / price_list / rate layout, ready to edit and re-import.
+"""
+
+import csv
+import hashlib
+import io
+import os
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+CHUNK_SIZE = 2000
+MAX_PAGE_LENGTH = 500
+CACHE_PREFIX = "cecypo_powerpack:price_import:"
+CACHE_TTL = 6 * 60 * 60
+PROGRESS_EVENT = "powerpack_price_import_progress"
+LOCK_WAIT_JOB = 300  # seconds a queued import waits for another import of the same list
+EXPORT_EVENT = "powerpack_price_export_progress"
+EXPORT_COLUMNS = ("item_code", "price_list", "rate", "item_name", "uom")
+
+
+# --- Parsing ------------------------------------------------------------------
+
+
+def iter_price_rows(fileobj, file_name):
+	"""Return an iterator of validated {"item_code", "price_list", "rate"} dicts.
+
+	fileobj is a binary file object; .csv is read through the csv iterator and .xlsx
+	through openpyxl's read_only mode, so neither format is loaded whole. Rows missing
+	a column or with an unparseable rate are skipped.
+	"""
+	raw_rows = _iter_xlsx(fileobj) if file_kind(file_name) == "xlsx" else _iter_csv(fileobj)
+	return filter(None, map(_validate_row, raw_rows))
+
+
+def file_kind(file_name):
+	""""xlsx" or "csv" from the file name; throws for anything else."""
+	name_lower = (file_name or "").lower()
+	if name_lower.endswith(".xlsx"):
+		return "xlsx"
+	if name_lower.endswith(".csv"):
+		return "csv"
+	frappe.throw(_("Unsupported file type. Please upload a .xlsx or .csv file."))
+
+
+def count_price_rows(fileobj, file_name):
+	"""Cheap row estimate for progress reporting (data rows, header excluded)."""
+	if file_kind(file_name) == "xlsx":
+		import openpyxl
+
+		wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+		try:
+			return max(cint(wb.active.max_row) - 1, 0)
+		finally:
+			wb.close()
+
+	return max(sum(1 for _line in fileobj) - 1, 0)
+
+
+def _iter_csv(fileobj):
+	text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+	for raw_row in csv.DictReader(text):
+		yield {k.strip().lower(): v for k, v in raw_row.items() if k}
+
+
+def _iter_xlsx(fileobj):
+	import openpyxl
+
+	wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+	try:
+		headers = None
+		for sheet_row in wb.active.iter_rows(values_only=True):
+			if headers is None:
+				headers = [str(c).strip().lower() if c is not None else "" for c in sheet_row]
+				continue
+			if not any(c is not None for c in sheet_row):
+				continue
+			# read-only sheets may trim trailing empty cells, so lengths can differ
+			yield dict(zip(headers, sheet_row, strict=False))
+	finally:
+		wb.close()
+
+
+def _validate_row(row):
+	item_code = str(row.get("item_code") or "").strip()
+	price_list = str(row.get("price_list") or "").strip()
+	rate_raw = row.get("rate")
+
+	if not item_code or not price_list or rate_raw is None or str(rate_raw).strip() == "":
+		return None
+	try:
+		rate = float(str(rate_raw).replace(",", ""))
+	except (ValueError, TypeError):
+		return None
+
+	return {"item_code": item_code, "price_list": price_list, "rate": rate}
+
+
+def iter_chunks(iterable, size=CHUNK_SIZE):
+	chunk = []
+	for row in iterable:
+		chunk.append(row)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+# --- Classification -----------------------------------------------------------
+
+
+def classify_rows(rows):
+	"""Diff parsed rows against the database.
+
+	Each row is tagged:
+	- missing: the item does not exist
+	- new: the item has no generic price in that price list
+	- unchanged: the price exists and equals the file rate at Item Price precision
+	- update: the price exists with a different rate
+
+	Two set-based lookups per call (Item, and Item Price scoped to the exact
+	(item_code, price_list) pairs in the rows), so callers should pass rows in chunks.
+	"""
+	if not rows:
+		return []
+
+	all_item_codes = list({r["item_code"] for r in rows})
+
+	existing_items = set(
+		frappe.db.get_all("Item", filters=[["name", "in", all_item_codes]], pluck="name")
+	)
+	item_price_map = get_generic_prices(
+		(r["item_code"], r["price_list"]) for r in rows if r["item_code"] in existing_items
+	)
+	precision = rate_precision()
+
+	enriched = []
+	for row in rows:
+		item_code = row["item_code"]
+		price_list = row["price_list"]
+		out = {
+			"item_code": item_code,
+			"price_list": price_list,
+			"rate": row["rate"],
+			"existing_rate": None,
+			"item_price_name": None,
+		}
+
+		if item_code not in existing_items:
+			out["status"] = "missing"
+		elif ip := item_price_map.get((item_code, price_list)):
+			out.update(
+				existing_rate=ip.price_list_rate,
+				item_price_name=ip.name,
+				status="unchanged" if rates_equal(row["rate"], ip.price_list_rate, precision) else "update",
+			)
+		else:
+			out["status"] = "new"
+		enriched.append(out)
+
+	return enriched
+
+
+def get_generic_prices(pairs):
+	"""{(item_code, price_list): row(name, price_list_rate)} for the given pairs.
+
+	Only generic prices are considered (no customer, supplier or batch), which is what
+	the importer creates. The lookup is scoped to the exact pairs rather than every
+	price of every item in the file.
+	"""
+	pairs = list(set(pairs))
+	if not pairs:
+		return {}
+
+	found = frappe.db.sql(
+		"""select name, item_code, price_list, price_list_rate
+		from `tabItem Price`
+		where (item_code, price_list) in ({pairs})
+			and ifnull(customer, '') = '' and ifnull(supplier, '') = ''
+			and ifnull(batch_no, '') = ''
+		order by creation""".format(pairs=", ".join(["(%s, %s)"] * len(pairs))),
+		[v for pair in pairs for v in pair],
+		as_dict=True,
+	)
+	prices = {}
+	for ip in found:
+		prices.setdefault((ip.item_code, ip.price_list), ip)  # oldest record wins if duplicated
+	return prices
+
+
+def rate_precision():
+	return cint(frappe.get_precision("Item Price", "price_list_rate")) or 2
+
+
+def rates_equal(a, b, precision):
+	return flt(a, precision) == flt(b, precision)
+
+
+# --- Apply --------------------------------------------------------------------
+
+
+def apply_rows(rows):
+	"""Write classified rows set-based. Returns {"updated", "created", "skipped", "unchanged"}.
+
+	Only real changes are written: "unchanged" rows are counted and left alone, so
+	their modified timestamp is not bumped.
+
+	Updates become one UPDATE ... CASE statement and new prices one bulk insert, inside
+	a savepoint. If the set-based write fails, the chunk is rolled back to that
+	savepoint and retried row by row (each row in its own savepoint), so a bad row is
+	skipped without discarding the rest of the chunk or earlier chunks.
+
+	"new" rows whose price has been created since the preview are updated instead.
+	Item Prices are written without loading documents, so no Version is recorded.
+	"""
+	result = {"updated": 0, "created": 0, "skipped": 0, "unchanged": 0}
+
+	updates = {}  # Item Price name -> rate; the last row wins for repeated prices
+	new_rows = {}  # (item_code, price_list) -> row
+	for row in rows:
+		status = row.get("status")
+		if status == "unchanged":
+			result["unchanged"] += 1
+		elif status == "update" and row.get("item_price_name"):
+			updates[row["item_price_name"]] = flt(row.get("rate", 0))
+		elif status == "new":
+			new_rows[(row.get("item_code"), row.get("price_list"))] = row
+		else:
+			result["skipped"] += 1
+
+	repeated = len(rows) - result["skipped"] - result["unchanged"] - len(updates) - len(new_rows)
+	result["skipped"] += repeated
+
+	savepoint = _savepoint_name()
+	frappe.db.savepoint(savepoint)
+	try:
+		_write_prices(dict(updates), list(new_rows.values()), result)
+	except Exception:
+		frappe.db.rollback(save_point=savepoint)
+		frappe.log_error(title=_("PowerPack price import: chunk retried row by row"))
+		for name, rate in updates.items():
+			_write_single(result, updates={name: rate})
+		for row in new_rows.values():
+			_write_single(result, new_rows=[row])
+	else:
+		frappe.db.release_savepoint(savepoint)
+
+	return result
+
+
+def _write_single(result, updates=None, new_rows=None):
+	savepoint = _savepoint_name()
+	frappe.db.savepoint(savepoint)
+	try:
+		_write_prices(updates or {}, new_rows or [], result)
+		frappe.db.release_savepoint(savepoint)
+	except Exception:
+		frappe.db.rollback(save_point=savepoint)
+		result["skipped"] += 1
+
+
+def _savepoint_name():
+	return "pp_price_import_" + frappe.generate_hash(length=8)
+
+
+def _write_prices(updates, new_rows, result):
+	"""Apply an {Item Price name: rate} map and insert new_rows; bump result counts.
+
+	Counts are merged into result only once every write has succeeded, so a chunk
+	rolled back and retried row by row is not counted twice.
+	"""
+	counts = {"updated": 0, "created": 0, "skipped": 0, "unchanged": 0}
+	to_insert = []
+	if new_rows:
+		existing = get_generic_prices((r["item_code"], r["price_list"]) for r in new_rows)
+		precision = rate_precision()
+		for row in new_rows:
+			ip = existing.get((row["item_code"], row["price_list"]))
+			if not ip:
+				to_insert.append(row)
+			elif rates_equal(row.get("rate"), ip.price_list_rate, precision):
+				counts["unchanged"] += 1
+			else:
+				updates[ip.name] = flt(row.get("rate", 0))
+
+	counts["updated"] += _bulk_update_rates(updates)
+	counts["created"], counts["skipped"] = _bulk_insert_prices(to_insert)
+
+	for key, value in counts.items():
+		result[key] += value
+
+
+def _bulk_update_rates(updates):
+	if not updates:
+		return 0
+
+	names = list(updates)
+	case = " ".join(["when %s then %s"] * len(names))
+	params = [v for name in names for v in (name, updates[name])]
+	params += [frappe.utils.now(), frappe.session.user]
+	params += names
+	frappe.db.sql(
+		"""update `tabItem Price`
+		set price_list_rate = case name {case} end, modified = %s, modified_by = %s
+		where name in ({names})""".format(case=case, names=", ".join(["%s"] * len(names))),
+		params,
+	)
+	return len(names)
+
+
+def _bulk_insert_prices(rows):
+	"""Insert new Item Prices in one statement. Returns (created, skipped).
+
+	Buying / selling flags and currency come from each row's Price List; rows for an
+	unknown or disabled price list, or an unknown item, are skipped.
+	"""
+	if not rows:
+		return 0, 0
+
+	price_lists = {
+		pl.name: pl
+		for pl in frappe.get_all(
+			"Price List",
+			filters={"name": ["in", list({r["price_list"] for r in rows})], "enabled": 1},
+			fields=["name", "currency", "buying", "selling"],
+		)
+	}
+	items = {
+		item.name: item
+		for item in frappe.get_all(
+			"Item",
+			filters={"name": ["in", list({r["item_code"] for r in rows})]},
+			fields=["name", "item_name", "description", "stock_uom"],
+		)
+	}
+
+	fields = [
+		"name", "owner", "creation", "modified", "modified_by", "docstatus",
+		"item_code", "item_name", "item_description", "uom",
+		"price_list", "currency", "buying", "selling", "price_list_rate",
+	]
+	now = frappe.utils.now()
+	user = frappe.session.user
+	values = []
+	for row in rows:
+		pl = price_lists.get(row["price_list"])
+		item = items.get(row["item_code"])
+		if not pl or not item:
+			continue
+		values.append((
+			frappe.generate_hash(length=10), user, now, now, user, 0,
+			item.name, item.item_name, item.description, item.stock_uom,
+			pl.name, pl.currency, pl.buying, pl.selling, flt(row.get("rate", 0)),
+		))
+
+	if values:
+		frappe.db.bulk_insert("Item Price", fields, values)
+	return len(values), len(rows) - len(values)
+
+
+@contextmanager
+def price_list_locks(price_lists, timeout=10):
+	"""Hold a database advisory lock (GET_LOCK) on each price list for the block.
+
+	Locks are taken in sorted order so two imports over overlapping lists cannot
+	deadlock; a second import of the same list waits up to timeout seconds and then
+	fails instead of interleaving its writes with the first.
+	"""
+	acquired = []
+	try:
+		for price_list in sorted(set(price_lists)):
+			lock = "pp_price_list:" + hashlib.sha1(price_list.encode()).hexdigest()[:32]
+			if not cint(frappe.db.sql("select get_lock(%s, %s)", (lock, timeout))[0][0]):
+				frappe.throw(
+					_("Another price update for Price List {0} is in progress. Please try again once it finishes.").format(
+						frappe.bold(price_list)
+					)
+				)
+			acquired.append(lock)
+		yield
+	finally:
+		for lock in reversed(acquired):
+			frappe.db.sql("select release_lock(%s)", lock)
+
+
+# --- Job state ----------------------------------------------------------------
+
+
+def _state_key(import_id):
+	return f"{CACHE_PREFIX}{import_id}"
+
+
+def _chunk_key(import_id, idx):
+	return f"{CACHE_PREFIX}{import_id}:chunk:{idx}"
+
+
+def _get_state(import_id):
+	state = frappe.cache().get_value(_state_key(import_id))
+	if not state:
+		frappe.throw(_("Price import {0} not found or expired. Please upload the file again.").format(import_id))
+	if state["owner"] != frappe.session.user and "System Manager" not in frappe.get_roles():
+		frappe.throw(_("Not permitted"), frappe.PermissionError)
+	return state
+
+
+def _save_state(state, publish=True):
+	frappe.cache().set_value(_state_key(state["import_id"]), state, expires_in_sec=CACHE_TTL)
+	if publish:
+		frappe.publish_realtime(PROGRESS_EVENT, state, user=state["owner"])
+
+
+# --- Endpoints ----------------------------------------------------------------
+
+
+@frappe.whitelist()
+def start_price_import(file_url: str) -> dict:
+	"""Enqueue parsing + classification of an uploaded price file."""
+	frappe.has_permission("Item Price", "read", throw=True)
+
+	file_doc = frappe.get_doc("File", {"file_url": file_url})
+	file_doc.check_permission("read")
+	file_kind(file_doc.file_name)
+
+	import_id = frappe.generate_hash(length=12)
+	state = {
+		"import_id": import_id,
+		"owner": frappe.session.user,
+		"file": file_doc.name,
+		"file_name": file_doc.file_name,
+		"stage": "preview",
+		"status": "Queued",
+		"processed": 0,
+		"total": 0,
+		"chunks": 0,
+		"counts": {"update": 0, "unchanged": 0, "new": 0, "missing": 0},
+		"price_lists": [],
+		"result": None,
+		"error": None,
+	}
+	_save_state(state, publish=False)
+
+	frappe.enqueue(
+		"cecypo_powerpack.price_import.run_price_import",
+		queue="long",
+		timeout=3600,
+		import_id=import_id,
+	)
+	return state
+
+
+def run_price_import(import_id):
+	"""Background job: stream the file, classify chunk by chunk, store the preview."""
+	state = frappe.cache().get_value(_state_key(import_id))
+	if not state:
+		return
+
+	cache = frappe.cache()
+	try:
+		path = frappe.get_doc("File", state["file"]).get_full_path()
+		with open(path, "rb") as f:
+			state["total"] = count_price_rows(f, state["file_name"])
+
+		state["status"] = "Running"
+		_save_state(state)
+
+		with open(path, "rb") as f:
+			for idx, chunk in enumerate(iter_chunks(iter_price_rows(f, state["file_name"]))):
+				classified = classify_rows(chunk)
+				cache.set_value(_chunk_key(import_id, idx), classified, expires_in_sec=CACHE_TTL)
+
+				for row in classified:
+					state["counts"][row["status"]] += 1
+				state["price_lists"] = sorted(set(state["price_lists"]).union(r["price_list"] for r in chunk))
+				state["chunks"] = idx + 1
+				state["processed"] += len(classified)
+				_save_state(state)
+
+		state["status"] = "Ready"
+	except Exception:
+		frappe.log_error(title=_("PowerPack price import failed"))
+		state["status"] = "Failed"
+		state["error"] = _("Could not read the file. Check format and required columns.")
+
+	_save_state(state)
+
+
+@frappe.whitelist()
+def get_price_import_status(import_id: str) -> dict:
+	return _get_state(import_id)
+
+
+@frappe.whitelist()
+def get_price_import_page(import_id: str, start: int = 0, page_length: int = 100) -> dict:
+	"""One page of the stored preview, read from the chunks that cover it."""
+	state = _get_state(import_id)
+	start = max(cint(start), 0)
+	page_length = min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+
+	cache = frappe.cache()
+	rows = []
+	idx = start // CHUNK_SIZE
+	offset = start % CHUNK_SIZE
+	while len(rows) < page_length and idx < state["chunks"]:
+		chunk = cache.get_value(_chunk_key(import_id, idx)) or []
+		rows.extend(chunk[offset : offset + page_length - len(rows)])
+		idx += 1
+		offset = 0
+
+	return {"rows": rows, "start": start, "total": state["processed"]}
+
+
+@frappe.whitelist()
+def start_price_import_apply(import_id: str) -> dict:
+	"""Enqueue writing the stored preview to Item Price."""
+	frappe.has_permission("Item Price", "write", throw=True)
+
+	state = _get_state(import_id)
+	if state["stage"] == "preview" and state["status"] != "Ready":
+		frappe.throw(_("The preview is not ready yet."))
+	if state["stage"] == "apply":
+		frappe.throw(_("This import has already been applied or is being applied."))
+	if state["counts"]["new"]:
+		frappe.has_permission("Item Price", "create", throw=True)
+
+	state.update(
+		stage="apply",
+		status="Queued",
+		processed=0,
+		result={"updated": 0, "created": 0, "skipped": 0, "unchanged": 0},
+	)
+	_save_state(state, publish=False)
+
+	frappe.enqueue(
+		"cecypo_powerpack.price_import.run_price_import_apply",
+		queue="long",
+		timeout=3600,
+		import_id=import_id,
+	)
+	return state
+
+
+def run_price_import_apply(import_id):
+	"""Background job: apply the stored preview chunk by chunk."""
+	state = frappe.cache().get_value(_state_key(import_id))
+	if not state:
+		return
+
+	cache = frappe.cache()
+	state["status"] = "Running"
+	_save_state(state)
+	try:
+		with price_list_locks(state["price_lists"], timeout=LOCK_WAIT_JOB):
+			for idx in range(state["chunks"]):
+				rows = cache.get_value(_chunk_key(import_id, idx)) or []
+				result = apply_rows(rows)
+				frappe.db.commit()
+
+				for key, value in result.items():
+					state["result"][key] += value
+				state["processed"] += len(rows)
+				_save_state(state)
+
+		state["status"] = "Done"
+	except Exception as e:
+		frappe.db.rollback()
+		state["status"] = "Failed"
+		if isinstance(e, frappe.ValidationError):
+			state["error"] = str(e)
+		else:
+			frappe.log_error(title=_("PowerPack price import apply failed"))
+			state["error"] = _("Applying prices failed. Chunks applied before the error were saved.")
+
+	_save_state(state)
+
+
+# --- Export -------------------------------------------------------------------
+
+
+@frappe.whitelist()
+def start_price_export(price_list: str, file_format: str = "xlsx") -> dict:
+	"""Enqueue an export of a price list's generic Item Prices.
+
+	The file has the importer's columns (item_code, price_list, rate) first; item_name
+	and uom follow for reference and are ignored on re-import.
+	"""
+	frappe.has_permission("Item Price", "export", throw=True)
+	frappe.get_doc("Price List", price_list).check_permission("read")
+	if file_format not in ("xlsx", "csv"):
+		frappe.throw(_("Unsupported file type. Please choose xlsx or csv."))
+
+	export_id = frappe.generate_hash(length=12)
+	frappe.enqueue(
+		"cecypo_powerpack.price_import.run_price_export",
+		queue="long",
+		timeout=3600,
+		export_id=export_id,
+		price_list=price_list,
+		file_format=file_format,
+	)
+	return {"export_id": export_id, "status": "Queued"}
+
+
+def run_price_export(export_id, price_list, file_format):
+	"""Background job: stream the price list to a private File attached to it."""
+	from frappe.utils import get_files_path
+
+	user = frappe.session.user
+	progress = {"export_id": export_id, "price_list": price_list, "status": "Running", "processed": 0}
+
+	def publish(**kwargs):
+		progress.update(kwargs)
+		frappe.publish_realtime(EXPORT_EVENT, progress, user=user)
+
+	file_name = f"{frappe.scrub(price_list)}-{frappe.utils.nowdate()}.{file_format}"
+	stored_name = f"{export_id}-{file_name}"
+	path = get_files_path(stored_name, is_private=1)
+
+	try:
+		total = frappe.db.count("Item Price", _export_filters(price_list))
+		publish(total=total)
+
+		writer = _XlsxPriceWriter(path) if file_format == "xlsx" else _CsvPriceWriter(path)
+		with writer, frappe.db.unbuffered_cursor():
+			rows = frappe.db.sql(
+				"""select ip.item_code, ip.price_list, ip.price_list_rate, ip.item_name, ip.uom
+				from `tabItem Price` ip
+				where ip.price_list = %(price_list)s
+					and ifnull(ip.customer, '') = '' and ifnull(ip.supplier, '') = ''
+					and ifnull(ip.batch_no, '') = ''
+				order by ip.item_code""",
+				{"price_list": price_list},
+				as_iterator=True,
+			)
+			for count, row in enumerate(rows, 1):
+				writer.write(row)
+				if count % CHUNK_SIZE == 0:
+					publish(processed=count)
+			processed = writer.count
+
+		file_doc = frappe.get_doc({
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{stored_name}",
+			"is_private": 1,
+			"attached_to_doctype": "Price List",
+			"attached_to_name": price_list,
+		}).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+		publish(status="Done", processed=processed, file_url=file_doc.file_url)
+	except Exception:
+		frappe.log_error(title=_("PowerPack price export failed"))
+		if os.path.exists(path):
+			os.remove(path)
+		publish(status="Failed", error=_("Exporting prices failed."))
+
+
+def _export_filters(price_list):
+	return {
+		"price_list": price_list,
+		"customer": ["is", "not set"],
+		"supplier": ["is", "not set"],
+		"batch_no": ["is", "not set"],
+	}
+
+
+def _export_row(row):
+	item_code, price_list, rate, item_name, uom = row
+	return [item_code, price_list, flt(rate), item_name, uom]
+
+
+class _CsvPriceWriter:
+	def __init__(self, path):
+		self.path = path
+		self.count = 0
+
+	def __enter__(self):
+		self._file = open(self.path, "w", newline="", encoding="utf-8")
+		self._writer = csv.writer(self._file)
+		self._writer.writerow(EXPORT_COLUMNS)
+		return self
+
+	def write(self, row):
+		self._writer.writerow(_export_row(row))
+		self.count += 1
+
+	def __exit__(self, *exc):
+		self._file.close()
+
+
+class _XlsxPriceWriter:
+	"""openpyxl write_only workbook: rows are flushed as they are appended."""
+
+	def __init__(self, path):
+		self.path = path
+		self.count = 0
+
+	def __enter__(self):
+		import openpyxl
+
+		self._wb = openpyxl.Workbook(write_only=True)
+		self._ws = self._wb.create_sheet(_("Prices"))
+		self._ws.append(EXPORT_COLUMNS)
+		return self
+
+	def write(self, row):
+		self._ws.append(_export_row(row))
+		self.count += 1
+
+	def __exit__(self, *exc):
+		self._wb.save(self.path)
@@ -164,6 +164,80 @@ CecypoPowerPack.Settings = {
     }
 };
 
+/**
+ * Request sequencing for search-as-you-type
+ * Each call() supersedes the previous one: the earlier XHR is aborted and, should
+ * its response still arrive, its callbacks are dropped. The scope/seq pair is sent
+ * as pp_search_scope / pp_search_seq so the server can skip superseded work too
+ * (see cecypo_powerpack.utils.is_search_superseded).
+ *
+ * Usage:
+ *   const seq = new CecypoPowerPack.RequestSequencer('pos-search');
+ *   seq.call({ method: '...', args: {...}, callback: r => ... });
+ */
+CecypoPowerPack.RequestSequencer = function(name) {
+    // Random suffix keeps a reloaded page from inheriting an older tab's sequence
+    this.scope = name + ':' + frappe.utils.get_random(8);
+    this.seq = 0;
+    this._xhr = null;
+};
+
+CecypoPowerPack.RequestSequencer.prototype = {
+    /**
+     * Issue a request, superseding any that is still in flight
+     * @param {Object} opts - frappe.call options (callback, error and always are sequenced)
+     * @returns {Number} The sequence number of this request
+     */
+    call: function(opts) {
+        const self = this;
+        this.cancel();
+        const seq = this.seq;
+
+        const args = Object.assign({}, opts.args, {
+            pp_search_scope: this.scope,
+            pp_search_seq: seq
+        });
+
+        this._xhr = frappe.call(Object.assign({}, opts, {
+            args: args,
+            callback: function(r) {
+                if (!self.isCurrent(seq) || (r.message && r.message.superseded)) return;
+                opts.callback && opts.callback(r);
+            },
+            error: function(r) {
+                if (!self.isCurrent(seq)) return;
+                opts.error && opts.error(r);
+            },
+            always: function(r) {
+                if (!self.isCurrent(seq)) return;
+                self._xhr = null;
+                opts.always && opts.always(r);
+            }
+        }));
+
+        return seq;
+    },
+
+    /**
+     * Whether seq belongs to the most recent request
+     */
+    isCurrent: function(seq) {
+        return seq === this.seq;
+    },
+
+    /**
+     * Drop the in-flight request (if any) without issuing a new one
+     */
+    cancel: function() {
+        this.seq++;
+        const xhr = this._xhr;
+        this._xhr = null;
+        if (xhr && typeof xhr.abort === 'function') {
+            xhr.abort();
+        }
+    }
+};
+
 /**
  * Item List Powerup Utilities
  */
@@ -248,6 +322,7 @@ CecypoPowerPack.TaxIDChecker = {
         // Check for duplicates synchronously
         let has_duplicates = false;
         let duplicates_data = null;
+        let other_matches = [];
 
         frappe.call({
             method: 'cecypo_powerpack.api.check_duplicate_tax_id',
@@ -262,6 +337,7 @@ CecypoPowerPack.TaxIDChecker = {
                     has_duplicates = true;
                     duplicates_data = r.message.duplicates;
                 }
+                other_matches = (r.message && r.message.other_doctype_matches) || [];
             }
         });
 
@@ -271,22 +347,47 @@ CecypoPowerPack.TaxIDChecker = {
                 frm,
                 duplicates_data,
                 doctype,
-                tax_id
+                tax_id,
+                other_matches
             );
             return false;  // Block save
         }
 
+        // The same party on the other side (customer who is also a supplier) is
+        // common and legitimate, so only flag it
+        if (other_matches.length) {
+            frappe.show_alert({
+                message: CecypoPowerPack.TaxIDChecker.otherMatchesMessage(tax_id, other_matches),
+                indicator: 'blue'
+            }, 8);
+        }
+
         return true;  // Allow save
     },
 
+    /**
+     * Describe parties of the other doctype sharing the tax ID
+     * @param {String} tax_id - The tax ID
+     * @param {Array} matches - List of {doctype, name, display_name}
+     * @returns {String}
+     */
+    otherMatchesMessage: function(tax_id, matches) {
+        const other_doctype = matches[0].doctype;
+        const links = matches.map(m =>
+            `<a href="/app/${frappe.router.slug(m.doctype)}/${encodeURIComponent(m.name)}" target="_blank">${frappe.utils.escape_html(m.display_name || m.name)}</a>`
+        ).join(', ');
+        return __('Tax ID {0} is already a {1}: {2}', [frappe.utils.escape_html(tax_id), __(other_doctype), links]);
+    },
+
     /**
      * Show confirmation dialog with list of duplicates
      * @param {Object} frm - The form object
      * @param {Array} duplicates - List of duplicate records
      * @param {String} doctype - 'Customer' or 'Supplier'
      * @param {String} tax_id - The tax ID
+     * @param {Array} other_matches - Parties of the other doctype with the same tax ID
      */
-    showConfirmationDialog: function(frm, duplicates, doctype, tax_id) {
+    showConfirmationDialog: function(frm, duplicates, doctype, tax_id, other_matches) {
         const title = doctype === 'Customer' ? __('Duplicate Customer Tax IDs') : __('Duplicate Supplier Tax IDs');
         const name_label = doctype === 'Customer' ? __('Customer Name') : __('Supplier Name');
 
@@ -328,6 +429,17 @@ CecypoPowerPack.TaxIDChecker = {
                     </tbody>
                 </table>
             </div>
+        `;
+
+        if ((other_matches || []).length) {
+            html += `
+                <p style="margin: 10px 0 0; font-size: 12px; color: var(--text-muted);">
+                    ${CecypoPowerPack.TaxIDChecker.otherMatchesMessage(tax_id, other_matches)}
+                </p>
+            `;
+        }
+
+        html += `
             <div style="margin-top: 15px; padding: 10px; background: var(--yellow-highlight-bg); border-left: 3px solid var(--yellow-500); border-radius: 4px;">
                 <p style="margin: 0; font-size: 12px; color: var(--text-color);">
                     <strong>Note:</strong> Having multiple records with the same Tax ID may indicate duplicate entries.
@@ -456,12 +568,11 @@ CecypoPowerPack.Warnings = {
         const invoices = data.invoices || [];
         const customer_name = data.customer_name || '';
 
-        // Calculate total outstanding
-        let total_outstanding = 0;
-        const currency = invoices.length ? (invoices[0].currency || '') : '';
-        invoices.forEach(function(inv) {
-            total_outstanding += flt(inv.outstanding_amount);
-        });
+        // Totals come precomputed over every overdue invoice; `invoices` lists the oldest only
+        const overdue_count = data.overdue_count || invoices.length;
+        const total_outstanding = flt(data.total_outstanding);
+        const currency = data.currency || (invoices.length ? (invoices[0].currency || '') : '');
+        const ageing = data.ageing || {};
 
         let rows = '';
         invoices.forEach(function(inv) {
@@ -481,9 +592,24 @@ CecypoPowerPack.Warnings = {
 
         const total_fmt = format_currency(total_outstanding, currency);
 
+        const buckets = [
+            ['ageing_0_30', __('1-30 days')],
+            ['ageing_31_60', __('31-60 days')],
+            ['ageing_61_90', __('61-90 days')],
+            ['ageing_90_plus', __('90+ days')]
+        ];
+        const ageing_html = buckets.map(function(b) {
+            return `<span style="margin-right:14px;">${b[1]}: <strong>${format_currency(flt(ageing[b[0]]), currency)}</strong></span>`;
+        }).join('');
+        const shown_note = invoices.length < overdue_count
+            ? `<div style="margin-top:6px; font-size:11px; color:var(--text-muted);">${__('Showing the {0} oldest', [invoices.length])}</div>`
+            : '';
+
         const html = `
             <div style="margin-bottom:12px; padding:10px; background:var(--alert-bg,var(--bg-color)); border-left:3px solid var(--red-500); border-radius:4px;">
-                <strong style="color:var(--red-500);">&#9888; ${invoices.length} overdue invoice${invoices.length !== 1 ? 's' : ''} found</strong>
+                <strong style="color:var(--red-500);">&#9888; ${overdue_count} overdue invoice${overdue_count !== 1 ? 's' : ''} found</strong>
+                <div style="margin-top:6px; font-size:12px;">${ageing_html}</div>
+                ${shown_note}
             </div>
             <div style="max-height:280px; overflow-y:auto; border:1px solid var(--border-color); border-radius:4px;">
                 <table class="table table-sm" style="margin-bottom:0; font-size:12px; color:var(--text-color);">
@@ -511,7 +637,7 @@ CecypoPowerPack.Warnings = {
             fields: [{ fieldtype: 'HTML', options: html }],
             primary_action_label: __('Copy Reminder'),
             primary_action: function() {
-                CecypoPowerPack.Warnings.copyReminderText(customer_name, invoices, total_outstanding, currency);
+                CecypoPowerPack.Warnings.copyReminderText(customer_name, invoices, total_outstanding, currency, overdue_count);
             },
             secondary_action_label: __('Close'),
             secondary_action: function() { d.hide(); }
@@ -531,8 +657,9 @@ CecypoPowerPack.Warnings = {
      * @param {Array}  invoices
      * @param {Number} total_outstanding
      * @param {String} currency
+     * @param {Number} overdue_count - All overdue invoices, when more than listed
      */
-    copyReminderText: function(customer_name, invoices, total_outstanding, currency) {
+    copyReminderText: function(customer_name, invoices, total_outstanding, currency, overdue_count) {
         const pad = function(str, len) {
             str = String(str);
             return str + ' '.repeat(Math.max(0, len - str.length));
@@ -553,6 +680,10 @@ CecypoPowerPack.Warnings = {
             lines.push(pad(inv.name, 22) + pad(due, 16) + pad(amount, 20) + outstanding);
         });
 
+        if (overdue_count > invoices.length) {
+            lines.push('... and ' + (overdue_count - invoices.length) + ' more');
+        }
+
         const total_fmt = format_currency(total_outstanding, currency);
         lines.push(sep);
         lines.push('Total Outstanding: ' + total_fmt);
@@ -799,3 +930,57 @@ frappe.ui.form.on('Quotation', {
         }
     }
 });
+
+/**
+ * Item search enrichment
+ * Passes the row warehouse and document price list along with the item_code
+ * query so the server can append stock and rate columns to each result.
+ * Gated by enable_item_search_powerup + item_search_show_stock_price.
+ */
+CecypoPowerPack.ItemSearch = {
+    ITEM_QUERY: 'erpnext.controllers.queries.item_query',
+
+    setup: function(frm) {
+        const grid = frm.fields_dict.items && frm.fields_dict.items.grid;
+        const field = grid && grid.get_field('item_code');
+        if (!field || field._pp_item_search_wrapped) return;
+
+        CecypoPowerPack.Settings.get(function(settings) {
+            if (!settings.enable_item_search_powerup || !settings.item_search_show_stock_price) return;
+            if (field._pp_item_search_wrapped) return;
+            field._pp_item_search_wrapped = true;
+
+            const base_query = field.get_query;
+            field.get_query = function(doc, cdt, cdn) {
+                const row = locals[cdt] && locals[cdt][cdn] || {};
+                let query = typeof base_query === 'function' ? base_query(doc, cdt, cdn) : base_query;
+
+                if (typeof query === 'string') {
+                    query = { query: query, filters: {} };
+                }
+                // Only the stock item_query understands the extra keys; leave anything else untouched
+                if (!query || query.query !== CecypoPowerPack.ItemSearch.ITEM_QUERY) return query;
+                if (query.filters && (typeof query.filters !== 'object' || Array.isArray(query.filters))) return query;
+
+                const filters = Object.assign({}, query.filters || {});
+                const warehouse = row.warehouse || doc.set_warehouse;
+                const price_list = doc.selling_price_list || doc.buying_price_list;
+                if (warehouse) filters.pp_warehouse = warehouse;
+                if (price_list) filters.pp_price_list = price_list;
+
+                return Object.assign({}, query, { filters: filters });
+            };
+        });
+    }
+};
+
+[
+    'Quotation', 'Sales Order', 'Sales Invoice', 'POS Invoice', 'Delivery Note',
+    'Purchase Order', 'Purchase Receipt', 'Purchase Invoice'
+].forEach(function(doctype) {
+    frappe.ui.form.on(doctype, {
+        refresh: function(frm) {
+            CecypoPowerPack.ItemSearch.setup(frm);
+        }
+    });
+});
@@ -3,9 +3,16 @@
  *
  * All features are gated by enable_payment_reconciliation_powerup in PowerPack Settings:
  *   - Zero Allocate  : creates zero-amount allocation rows for manual distribution
+ *   - Auto Match     : proposes scored allocations (reference, exact amount and
+ *                      small-combination matches) to accept into the allocation table
  *   - Zero Reconcile : reconciles allocations, filtering zero-amount entries
- *   - 2% Allocate    : sets allocations to 2% of invoice net total (Supplier only)
+ *                      (large batches run as a background job with progress)
+ *   - 2% Allocate    : sets allocations to 2% of invoice net total (Suppliers, and
+ *                      Customers with a matching VAT Withholding certificate)
  *   - Load Additional Doc Info : injects ETR / Bill No / VAT Withholding info inline
+ *   - Batch Reconcile: background allocate + reconcile over a filtered list of parties
+ *   - Load in Pages  : fetches all unreconciled entries once into a server-side window
+ *                      and shows them page by page (keyset cursor per table)
  *
  * Performance: uses batch queries (1 API call per table, never 1 per row).
  */
@@ -105,9 +112,13 @@ frappe.ui.form.on('Payment Reconciliation', {
 		is_powerpack_enabled().then(enabled => {
 			if (!enabled) return;
 			setup_zero_allocate_button(frm);
+			setup_auto_match_button(frm);
 			setup_zero_allocate_paste_button(frm);
 			setup_load_doc_info_button(frm);
 			setup_allocate_2pct_button(frm);
+			setup_window_button(frm);
+			setup_batch_reconcile_button(frm);
+			resume_zero_reconcile(frm);
 		});
 	},
 	party_type(frm) {
@@ -120,6 +131,8 @@ frappe.ui.form.on('Payment Reconciliation', {
 	},
 	get_unreconciled_entries(frm) {
 		remove_all_displays();
+		reconcile_window = null;
+		$('.pp-window-pager').remove();
 		is_powerpack_enabled().then(enabled => {
 			if (enabled) setup_zero_allocate_paste_button(frm);
 		});
@@ -130,6 +143,14 @@ frappe.ui.form.on('Payment Reconciliation', {
 			if (enabled) setup_allocate_2pct_button(frm);
 		});
 	},
+	from_invoice_date(frm)      { reload_window_table(frm, 'invoices'); },
+	to_invoice_date(frm)        { reload_window_table(frm, 'invoices'); },
+	minimum_invoice_amount(frm) { reload_window_table(frm, 'invoices'); },
+	maximum_invoice_amount(frm) { reload_window_table(frm, 'invoices'); },
+	from_payment_date(frm)      { reload_window_table(frm, 'payments'); },
+	to_payment_date(frm)        { reload_window_table(frm, 'payments'); },
+	minimum_payment_amount(frm) { reload_window_table(frm, 'payments'); },
+	maximum_payment_amount(frm) { reload_window_table(frm, 'payments'); },
 });
 
 frappe.ui.form.on('Payment Reconciliation Allocation', {
@@ -150,6 +171,13 @@ function setup_zero_allocate_button(frm) {
 	frm.page.add_inner_button(__('Zero Allocate'), () => zero_allocate(frm), __('Powerup'));
 }
 
+// Above this many allocations Zero Reconcile runs as a background job that reports
+// progress per chunk instead of holding the web request open.
+const ZERO_RECONCILE_BACKGROUND_THRESHOLD = 100;
+const ZERO_RECONCILE_EVENT = 'powerpack_zero_reconcile_progress';
+const ZERO_RECONCILE_JOB_KEY = 'cecypo_powerpack_zero_reconcile_job';
+let tracked_reconcile_id = null;
+
 function setup_zero_reconcile_button(frm) {
 	if (!frm.doc?.allocation?.length) return;
 	const non_zero   = frm.doc.allocation.filter(a => (a.allocated_amount || 0) > 0).length;
@@ -158,31 +186,98 @@ function setup_zero_reconcile_button(frm) {
 	try { frm.page.remove_inner_button(__('Zero Reconcile')); } catch (_) {}
 
 	frm.page.add_inner_button(__('Zero Reconcile'), function () {
-		const msg = zero_count > 0
+		const background = non_zero > ZERO_RECONCILE_BACKGROUND_THRESHOLD;
+		let msg = zero_count > 0
 			? __('Reconcile {0} non-zero allocation(s)? ({1} zero allocation(s) will be filtered out)', [non_zero, zero_count])
 			: __('Reconcile {0} allocation(s)?', [non_zero]);
+		if (background) msg += '<br><br>' + __('This runs in the background; progress is shown here.');
 
 		frappe.confirm(msg, function () {
 			frm.call({
 				doc: frm.doc,
 				method: 'zero_reconcile',
+				args: { background: background ? 1 : 0 },
 				freeze: true,
-				freeze_message: __('Reconciling...'),
+				freeze_message: background ? __('Queuing reconciliation...') : __('Reconciling...'),
 				callback(r) {
-					if (!r.exc) {
-						frm.clear_table('allocation');
-						frm.clear_table('payments');
-						frm.clear_table('invoices');
-						frm.refresh_fields();
-						frappe.show_alert({ message: __('Successfully reconciled'), indicator: 'green' });
-						try { frm.page.remove_inner_button(__('Zero Reconcile')); } catch (_) {}
+					if (r.exc) return;
+					if (background) {
+						track_zero_reconcile(frm, r.message);
+						return;
 					}
+					clear_reconciled_tables(frm);
+					frappe.show_alert({ message: __('Successfully reconciled'), indicator: 'green' });
 				},
 			});
 		});
 	}, __('Powerup'));
 }
 
+function clear_reconciled_tables(frm) {
+	frm.clear_table('allocation');
+	frm.clear_table('payments');
+	frm.clear_table('invoices');
+	frm.refresh_fields();
+	try { frm.page.remove_inner_button(__('Zero Reconcile')); } catch (_) {}
+}
+
+// Follow a background zero reconcile. The job id is kept in localStorage so the
+// result is still reported if the form is reloaded while the job runs.
+function track_zero_reconcile(frm, state) {
+	if (!state?.reconcile_id || state.reconcile_id === tracked_reconcile_id) return;
+	tracked_reconcile_id = state.reconcile_id;
+	localStorage.setItem(ZERO_RECONCILE_JOB_KEY, state.reconcile_id);
+
+	const on_progress = (p) => {
+		if (p.reconcile_id !== state.reconcile_id) return;
+		if (p.status === 'Running' || p.status === 'Queued') {
+			frappe.show_progress(__('Zero Reconcile'), p.done || 0, p.total || 1,
+				__('Reconciled {0} of {1} allocation(s)', [p.done || 0, p.total || 0]));
+			return;
+		}
+		frappe.realtime.off(ZERO_RECONCILE_EVENT, on_progress);
+		tracked_reconcile_id = null;
+		frappe.hide_progress();
+		show_zero_reconcile_result(frm, p);
+	};
+	frappe.realtime.on(ZERO_RECONCILE_EVENT, on_progress);
+	on_progress(state);
+}
+
+function resume_zero_reconcile(frm) {
+	const reconcile_id = localStorage.getItem(ZERO_RECONCILE_JOB_KEY);
+	if (!reconcile_id) return;
+	frappe.xcall('cecypo_powerpack.custom_payment_reconciliation.get_zero_reconcile_status', { reconcile_id })
+		.then(state => {
+			if (state.status === 'Expired') localStorage.removeItem(ZERO_RECONCILE_JOB_KEY);
+			else track_zero_reconcile(frm, state);
+		})
+		.catch(() => localStorage.removeItem(ZERO_RECONCILE_JOB_KEY));
+}
+
+function show_zero_reconcile_result(frm, p) {
+	localStorage.removeItem(ZERO_RECONCILE_JOB_KEY);
+	if (p.status === 'Failed') {
+		frappe.msgprint({
+			title: __('Zero Reconcile Failed'),
+			message: frappe.utils.escape_html(p.error || __('Reconciliation failed. Nothing was reconciled.')),
+			indicator: 'red',
+		});
+		return;
+	}
+	const s = p.summary || {};
+	clear_reconciled_tables(frm);
+	frappe.msgprint({
+		title: __('Successfully Reconciled'),
+		message: [
+			__('Reconciled {0} allocation(s) totalling {1}.', [s.reconciled || 0, format_currency(s.allocated_amount || 0)]),
+			__('Payments / journals: {0}, credit / debit notes: {1}.', [s.payments || 0, s.credit_notes || 0]),
+			p.skipped_zero ? __('{0} zero-amount allocation(s) were skipped.', [p.skipped_zero]) : '',
+		].filter(Boolean).join('<br>'),
+		indicator: 'green',
+	});
+}
+
 function zero_allocate(frm) {
 	let selected_payments, selected_invoices;
 	try {
@@ -202,61 +297,73 @@ function zero_allocate(frm) {
 		return;
 	}
 
-	const total_rows  = selected_payments.length * selected_invoices.length;
+	show_zero_allocate_dialog(frm, selected_payments, selected_invoices);
+}
+
+const ZERO_ALLOCATE_PAIRINGS = {
+	'All combinations': 'All',
+	'FIFO (oldest first)': 'FIFO',
+	'Match amounts, then FIFO': 'Amount',
+};
+
+function show_zero_allocate_dialog(frm, payments, invoices) {
+	const total_rows  = payments.length * invoices.length;
 	const has_existing = frm.doc.allocation?.length > 0;
-	const proceed = () => has_existing
-		? show_replace_append_dialog(frm, selected_payments, selected_invoices, total_rows)
-		: show_confirmation_dialog(frm, selected_payments, selected_invoices, total_rows);
-
-	if (total_rows > 500) {
-		frappe.confirm(
-			__('This will create {0} rows which may impact performance. Continue?', [total_rows]),
-			proceed
-		);
-	} else {
-		proceed();
+	// Smart pairing emits at most one row per invoice plus one per payment boundary
+	const default_pairing = total_rows > 500 ? 'FIFO (oldest first)' : 'All combinations';
+
+	const fields = [
+		{
+			fieldname: 'pairing',
+			fieldtype: 'Select',
+			label: __('Pairing'),
+			options: Object.keys(ZERO_ALLOCATE_PAIRINGS),
+			default: default_pairing,
+			reqd: 1,
+			description: __('All combinations creates {0} rows ({1} payments × {2} invoices). FIFO and amount matching only pair each invoice with the payments needed to cover it.',
+				[total_rows, payments.length, invoices.length]),
+		},
+	];
+	if (has_existing) {
+		fields.push({
+			fieldname: 'action',
+			fieldtype: 'Select',
+			label: 'Action',
+			options: ['Replace existing allocations', 'Append to existing allocations'],
+			default: 'Append to existing allocations',
+			reqd: 1,
+			description: __('There are {0} existing allocation rows.', [frm.doc.allocation.length]),
+		});
 	}
-}
 
-function show_replace_append_dialog(frm, payments, invoices, total_rows) {
 	const d = new frappe.ui.Dialog({
-		title: __('Existing Allocations Found'),
-		fields: [
-			{
-				fieldtype: 'HTML',
-				options: `<p>There are ${frm.doc.allocation.length} existing allocation rows.</p>
-				          <p>This will create ${total_rows} new rows. What would you like to do?</p>`,
-			},
-			{
-				fieldname: 'action',
-				fieldtype: 'Select',
-				label: 'Action',
-				options: ['Replace existing allocations', 'Append to existing allocations'],
-				default: 'Append to existing allocations',
-				reqd: 1,
-			},
-		],
-		primary_action_label: __('Continue'),
+		title: __('Zero Allocate'),
+		fields,
+		primary_action_label: __('Create Rows'),
 		primary_action(values) {
-			d.hide();
-			execute_zero_allocate(frm, payments, invoices, values.action === 'Replace existing allocations');
+			const pairing = ZERO_ALLOCATE_PAIRINGS[values.pairing];
+			const run = () => {
+				d.hide();
+				execute_zero_allocate(frm, payments, invoices, values.action === 'Replace existing allocations', pairing);
+			};
+			if (pairing === 'All' && total_rows > 500) {
+				frappe.confirm(
+					__('This will create {0} rows which may impact performance. Continue?', [total_rows]),
+					run
+				);
+			} else {
+				run();
+			}
 		},
 	});
 	d.show();
 }
 
-function show_confirmation_dialog(frm, payments, invoices, total_rows) {
-	frappe.confirm(
-		__('This will create {0} allocation rows with zero amounts. Continue?', [total_rows]),
-		() => execute_zero_allocate(frm, payments, invoices, false)
-	);
-}
-
-function execute_zero_allocate(frm, payments, invoices, replace) {
+function execute_zero_allocate(frm, payments, invoices, replace, pairing) {
 	frappe.show_alert({ message: __('Creating zero allocations...'), indicator: 'blue' });
 	frappe.call({
 		method: 'cecypo_powerpack.api.zero_allocate_entries',
-		args: { doc: frm.doc, payments, invoices },
+		args: { doc: frm.doc, payments, invoices, pairing: pairing || 'All' },
 		freeze: true,
 		freeze_message: __('Creating allocation entries...'),
 		callback(r) {
@@ -280,6 +387,265 @@ function execute_zero_allocate(frm, payments, invoices, replace) {
 	});
 }
 
+// ═══════════════════════════════════════════════════════════════════════════════
+// AUTO MATCH
+// ═══════════════════════════════════════════════════════════════════════════════
+
+// Groups at or above this score start ticked in the review dialog
+const AUTO_MATCH_PRESELECT_SCORE = 0.8;
+
+function setup_auto_match_button(frm) {
+	try { frm.page.remove_inner_button(__('Auto Match')); } catch (_) {}
+	if (!frm.doc.payments?.length || !frm.doc.invoices?.length) return;
+	frm.page.add_inner_button(__('Auto Match'), () => {
+		frm.call({
+			doc: frm.doc,
+			method: 'propose_auto_matches',
+			freeze: true,
+			freeze_message: __('Matching payments to invoices...'),
+			callback(r) {
+				if (r.exc || !r.message) return;
+				if (!r.message.proposals.length) {
+					frappe.msgprint({ title: __('Auto Match'), message: __('No matches found.'), indicator: 'orange' });
+					return;
+				}
+				show_auto_match_dialog(frm, r.message);
+			},
+		});
+	}, __('Powerup'));
+}
+
+function show_auto_match_dialog(frm, result) {
+	const groups = {};
+	result.proposals.forEach(p => { (groups[p.group] = groups[p.group] || []).push(p); });
+	const s = result.summary;
+
+	const rows_html = Object.entries(groups).map(([group, rows]) => rows.map((p, idx) => `
+		<tr style="border-bottom:1px solid var(--border-color);">
+			<td style="padding:4px 8px;">${idx ? '' : `<input type="checkbox" class="pp-match-group" data-group="${group}" ${p.score >= AUTO_MATCH_PRESELECT_SCORE ? 'checked' : ''}>`}</td>
+			<td style="padding:4px 8px;">${frappe.utils.escape_html(p.reference_name || '')}</td>
+			<td style="padding:4px 8px;">${frappe.utils.escape_html(p.invoice_number || '')}</td>
+			<td style="padding:4px 8px;text-align:right;">${format_currency(p.allocated_amount, p.currency)}</td>
+			<td style="padding:4px 8px;">${idx ? '' : badge(__(p.rule), p.score >= AUTO_MATCH_PRESELECT_SCORE ? '#10b981' : '#f59e0b')}</td>
+		</tr>`).join('')).join('');
+
+	const d = new frappe.ui.Dialog({
+		title: __('Auto Match'),
+		size: 'extra-large',
+		fields: [
+			{
+				fieldtype: 'HTML',
+				fieldname: 'proposals',
+				options: `
+					<p class="text-muted">${__('{0} of {1} invoices matched, {2} allocated. Tick the matches to accept.', [s.matched_invoices, s.invoices, format_currency(s.allocated_amount)])}</p>
+					<div style="max-height:420px;overflow:auto;">
+						<table style="width:100%;font-size:12px;">
+							<thead><tr style="text-align:left;border-bottom:2px solid var(--border-color);">
+								<th></th><th>${__('Payment')}</th><th>${__('Invoice')}</th>
+								<th style="text-align:right;">${__('Allocated')}</th><th>${__('Match')}</th>
+							</tr></thead>
+							<tbody>${rows_html}</tbody>
+						</table>
+					</div>`,
+			},
+			{
+				fieldname: 'replace',
+				fieldtype: 'Check',
+				label: __('Replace existing allocations'),
+				hidden: !frm.doc.allocation?.length,
+			},
+		],
+		primary_action_label: __('Accept Selected'),
+		primary_action(values) {
+			const accepted = d.$wrapper.find('.pp-match-group:checked').map((_, el) => $(el).data('group')).get();
+			if (!accepted.length) return;
+			if (values.replace) frm.clear_table('allocation');
+			accepted.forEach(group => groups[group].forEach(p => {
+				const { score, rule, group: _group, ...row } = p;
+				Object.assign(frm.add_child('allocation'), row);
+			}));
+			frm.refresh_field('allocation');
+			setTimeout(() => setup_zero_reconcile_button(frm), 100);
+			d.hide();
+			frappe.show_alert({ message: __('Accepted {0} match(es)', [accepted.length]), indicator: 'green' });
+		},
+	});
+	d.show();
+}
+
+// ═══════════════════════════════════════════════════════════════════════════════
+// BATCH RECONCILE
+// ═══════════════════════════════════════════════════════════════════════════════
+
+const BATCH_RECONCILE_EVENT = 'powerpack_batch_reconcile_progress';
+
+function setup_batch_reconcile_button(frm) {
+	try { frm.page.remove_inner_button(__('Batch Reconcile')); } catch (_) {}
+	frm.page.add_inner_button(__('Batch Reconcile'), () => show_batch_reconcile_dialog(frm), __('Powerup'));
+}
+
+function show_batch_reconcile_dialog(frm) {
+	let batch_id = null;
+
+	const d = new frappe.ui.Dialog({
+		title: __('Batch Reconcile'),
+		size: 'large',
+		fields: [
+			{ fieldname: 'company', fieldtype: 'Link', options: 'Company', label: __('Company'), default: frm.doc.company, reqd: 1 },
+			{ fieldname: 'party_type', fieldtype: 'Select', options: 'Supplier\nCustomer', label: __('Party Type'), default: frm.doc.party_type === 'Customer' ? 'Customer' : 'Supplier', reqd: 1 },
+			{ fieldname: 'supplier_group', fieldtype: 'Link', options: 'Supplier Group', label: __('Supplier Group'), depends_on: "eval:doc.party_type=='Supplier'" },
+			{ fieldname: 'customer_group', fieldtype: 'Link', options: 'Customer Group', label: __('Customer Group'), depends_on: "eval:doc.party_type=='Customer'" },
+			{ fieldtype: 'Column Break' },
+			{ fieldname: 'from_date', fieldtype: 'Date', label: __('From Date') },
+			{ fieldname: 'to_date', fieldtype: 'Date', label: __('To Date') },
+			{ fieldname: 'method', fieldtype: 'Select', options: 'Allocate\nAuto Match', label: __('Allocation'), default: 'Allocate',
+				description: __('Allocate uses the standard FIFO allocation; Auto Match only reconciles confident matches.') },
+			{ fieldtype: 'Section Break' },
+			{ fieldname: 'result', fieldtype: 'HTML', options: '<div class="pp-batch-result"></div>' },
+		],
+		primary_action_label: __('Start'),
+		primary_action(values) {
+			d.get_primary_btn().prop('disabled', true);
+			frappe.xcall('cecypo_powerpack.batch_reconciliation.start_batch_reconciliation', {
+				company: values.company,
+				party_type: values.party_type,
+				party_group: values.party_type === 'Customer' ? values.customer_group : values.supplier_group,
+				from_date: values.from_date,
+				to_date: values.to_date,
+				method: values.method,
+			}).then(r => {
+				batch_id = r.batch_id;
+				$result.html(`<div class="text-muted">${__('Queued {0} parties…', [r.total])}</div>`);
+			}).catch(() => d.get_primary_btn().prop('disabled', false));
+		},
+	});
+
+	const $result = d.fields_dict.result.$wrapper.find('.pp-batch-result');
+	const on_progress = (p) => {
+		if (p.batch_id !== batch_id) return;
+		if (p.status !== 'Completed') {
+			$result.html(`<div class="text-muted">${__('{0} of {1} parties done…', [p.done, p.total])}</div>`);
+			return;
+		}
+		frappe.xcall('cecypo_powerpack.batch_reconciliation.get_batch_reconciliation_report', { batch_id })
+			.then(report => render_batch_report($result, report));
+	};
+	frappe.realtime.on(BATCH_RECONCILE_EVENT, on_progress);
+	d.onhide = () => frappe.realtime.off(BATCH_RECONCILE_EVENT, on_progress);
+	d.show();
+}
+
+function render_batch_report($result, report) {
+	const colors = { Reconciled: '#10b981', Skipped: '#94a3b8', Failed: '#ef4444' };
+	const rows = report.parties
+		.filter(p => p.status !== 'Skipped' || p.reason)
+		.map(p => `
+			<tr style="border-bottom:1px solid var(--border-color);">
+				<td style="padding:4px 8px;">${frappe.utils.escape_html(p.party)}</td>
+				<td style="padding:4px 8px;">${badge(__(p.status), colors[p.status] || '#94a3b8')}</td>
+				<td style="padding:4px 8px;text-align:right;">${p.status === 'Reconciled' ? format_currency(p.allocated_amount) : ''}</td>
+				<td style="padding:4px 8px;">${frappe.utils.escape_html(p.error || p.reason || (p.reconciled ? __('{0} allocation(s)', [p.reconciled]) : ''))}</td>
+				<td style="padding:4px 8px;text-align:right;">${p.left_open ? __('{0} left open', [p.left_open]) : ''}</td>
+			</tr>`).join('');
+	$result.html(`
+		<p>${__('Reconciled {0}, skipped {1}, failed {2} of {3} parties. {4} allocation(s), {5} allocated, {6} invoice(s) / payment(s) left open.', [
+			report.counts.Reconciled, report.counts.Skipped, report.counts.Failed, report.total,
+			report.allocations, format_currency(report.allocated_amount), report.left_open || 0,
+		])}</p>
+		<div style="max-height:360px;overflow:auto;">
+			<table style="width:100%;font-size:12px;"><tbody>${rows}</tbody></table>
+		</div>`);
+}
+
+// ═══════════════════════════════════════════════════════════════════════════════
+// LOAD IN PAGES
+// ═══════════════════════════════════════════════════════════════════════════════
+
+// Per table: window id, total, start of the current page and the cursors of the
+// pages before it (keyset pagination only moves forward, so Previous pops a cursor).
+// The form's date / amount filters narrow the window server-side; changing one while
+// a window is open reloads that table from its first page.
+const WINDOW_TABLES = { invoices: __('Invoices'), payments: __('Payments') };
+const WINDOW_RANGES = {
+	invoices: ['from_invoice_date', 'to_invoice_date', 'minimum_invoice_amount', 'maximum_invoice_amount'],
+	payments: ['from_payment_date', 'to_payment_date', 'minimum_payment_amount', 'maximum_payment_amount'],
+};
+let reconcile_window = null;
+
+function setup_window_button(frm) {
+	try { frm.page.remove_inner_button(__('Load in Pages')); } catch (_) {}
+	frm.page.add_inner_button(__('Load in Pages'), () => {
+		frm.call({
+			doc: frm.doc,
+			method: 'start_unreconciled_window',
+			freeze: true,
+			freeze_message: __('Loading unreconciled entries...'),
+			callback(r) {
+				if (r.exc || !r.message) return;
+				reconcile_window = { window_id: r.message.window_id };
+				Object.keys(WINDOW_TABLES).forEach(table => {
+					reconcile_window[table] = { ...r.message[table], history: [] };
+					render_window_pager(frm, table);
+				});
+			},
+		});
+	}, __('Powerup'));
+}
+
+function reload_window_table(frm, table) {
+	const state = reconcile_window?.[table];
+	if (!state) return;
+	state.history = [];
+	state.after = null;
+	load_window_page(frm, table, null);
+}
+
+function load_window_page(frm, table, after) {
+	const state = reconcile_window[table];
+	const [from_date, to_date, min_amount, max_amount] = WINDOW_RANGES[table].map(f => frm.doc[f] || null);
+	frappe.xcall('cecypo_powerpack.custom_payment_reconciliation.get_unreconciled_page', {
+		window_id: reconcile_window.window_id,
+		table,
+		after: after ? JSON.stringify(after) : null,
+		from_date,
+		to_date,
+		min_amount,
+		max_amount,
+	}).then(page => {
+		frm.clear_table(table);
+		page.rows.forEach(row => Object.assign(frm.add_child(table), row));
+		frm.refresh_field(table);
+		const { rows, ...meta } = page;
+		Object.assign(state, meta);
+		remove_all_displays();
+		render_window_pager(frm, table);
+	});
+}
+
+function render_window_pager(frm, table) {
+	const state = reconcile_window?.[table];
+	const grid = frm.fields_dict[table]?.grid;
+	if (!state || !grid) return;
+
+	$(grid.wrapper).find('.pp-window-pager').remove();
+	const shown = frm.doc[table]?.length || 0;
+	const $pager = $(`<div class="pp-window-pager" style="display:flex;align-items:center;gap:8px;padding:6px 0;font-size:12px;color:var(--text-muted);">
+		<button class="btn btn-xs btn-default pp-window-prev" ${state.history.length ? '' : 'disabled'}>‹ ${__('Previous')}</button>
+		<span>${__('{0} {1}–{2} of {3}', [WINDOW_TABLES[table], shown ? state.start + 1 : 0, state.start + shown, state.total])}</span>
+		<button class="btn btn-xs btn-default pp-window-next" ${state.has_more ? '' : 'disabled'}>${__('Next')} ›</button>
+	</div>`);
+	$pager.find('.pp-window-next').on('click', () => {
+		state.history.push(state.after || null);
+		state.after = state.cursor;
+		load_window_page(frm, table, state.cursor);
+	});
+	$pager.find('.pp-window-prev').on('click', () => {
+		state.after = state.history.pop();
+		load_window_page(frm, table, state.after);
+	});
+	$(grid.wrapper).append($pager);
+}
+
 // ═══════════════════════════════════════════════════════════════════════════════
 // LOAD ADDITIONAL DOC INFO
 // ═══════════════════════════════════════════════════════════════════════════════
@@ -520,14 +886,14 @@ async function add_allocation_bill_no_display(frm) {
 }
 
 // ═══════════════════════════════════════════════════════════════════════════════
-// 2% ALLOCATE (Supplier only)
+// 2% ALLOCATE
 // ═══════════════════════════════════════════════════════════════════════════════
 
 function setup_allocate_2pct_button(frm) {
 	const grid = frm.fields_dict.allocation?.grid;
 	if (!grid) return;
 
-	if (frm.doc.party_type !== 'Supplier') {
+	if (!['Supplier', 'Customer'].includes(frm.doc.party_type)) {
 		const $existing = grid.custom_buttons?.[__('Allocate 2%')];
 		if ($existing) $existing.addClass('hidden');
 		return;
@@ -551,33 +917,34 @@ function setup_allocate_2pct_button(frm) {
 }
 
 async function apply_2pct_allocation(frm) {
-	const alloc_rows = (frm.doc.allocation || []).filter(r => r.invoice_type === 'Purchase Invoice' && r.invoice_number);
+	const invoice_type = frm.doc.party_type === 'Customer' ? 'Sales Invoice' : 'Purchase Invoice';
+	const alloc_rows = (frm.doc.allocation || []).filter(r => r.invoice_type === invoice_type && r.invoice_number);
 	if (!alloc_rows.length) {
-		frappe.show_alert({ message: __('No Purchase Invoice rows in the Allocation table'), indicator: 'orange' });
+		frappe.show_alert({ message: __('No {0} rows in the Allocation table', [__(invoice_type)]), indicator: 'orange' });
 		return;
 	}
 
-	// BATCH: fetch net_total for all unique invoices
-	const pi_names = [...new Set(alloc_rows.map(r => r.invoice_number))];
-	const pi_rows = await frappe.db.get_list('Purchase Invoice', {
-		filters: [['name', 'in', pi_names]],
-		fields: ['name', 'net_total'],
-		limit: Math.min(pi_names.length, 500),
+	// Net totals, ETR numbers and withholding certificates are resolved server-side
+	const r = await frappe.call({
+		method: 'cecypo_powerpack.api.get_vat_withholding_allocations',
+		args: { doc: frm.doc },
 	});
-	const net_total_map = Object.fromEntries(pi_rows.map(r => [r.name, r.net_total]));
+	const result = r.message || {};
+	const rows_by_name = Object.fromEntries(alloc_rows.map(row => [row.name, row]));
 
-	const payment_summary = {};
-	for (const row of alloc_rows) {
-		const net_total = net_total_map[row.invoice_number];
-		if (net_total == null) continue;
-		// 2% of taxable amount, rounded up to nearest whole number
-		const allocated = Math.ceil(net_total * 0.02);
-		frappe.model.set_value(row.doctype, row.name, 'allocated_amount', allocated);
-		const ref = row.reference_name;
-		if (ref) {
-			if (!payment_summary[ref]) payment_summary[ref] = { unreconciled: row.unreconciled_amount || 0, allocated_2pct: 0 };
-			payment_summary[ref].allocated_2pct += allocated;
-		}
+	(result.allocations || []).forEach(a => {
+		const row = rows_by_name[a.name];
+		if (row) frappe.model.set_value(row.doctype, row.name, 'allocated_amount', a.allocated_amount);
+	});
+	const payment_summary = Object.fromEntries((result.summary || []).map(d => [
+		d.reference_name, { unreconciled: d.unreconciled_amount || 0, allocated_2pct: d.allocated_amount },
+	]));
+
+	if ((result.skipped || []).length) {
+		frappe.show_alert({
+			message: __('{0} rows left unchanged (no invoice or withholding certificate found)', [result.skipped.length]),
+			indicator: 'orange',
+		}, 6);
 	}
 
 	// Remove stale display rows before grid re-renders from set_value calls
@@ -787,13 +1154,17 @@ function render_review_section(dialog, state) {
 			<td style="font-family:monospace;">${frappe.utils.escape_html(b)}</td>
 			<td>${__('Not found')}</td>
 		</tr>`),
+		...state.duplicates.map(d => `<tr>
+			<td style="font-family:monospace;">${frappe.utils.escape_html(d.bill_no)}</td>
+			<td>${__('Duplicate of {0}', [frappe.utils.escape_html(d.duplicate_of)])}</td>
+		</tr>`),
 		...state.invalid.map(s => `<tr>
 			<td style="font-family:monospace;">${frappe.utils.escape_html(s.line)}</td>
 			<td>${frappe.utils.escape_html(s.reason)}</td>
 		</tr>`),
 	].join('');
 
-	const total_skipped = state.ambiguous.length + state.not_found.length + state.invalid.length;
+	const total_skipped = state.ambiguous.length + state.not_found.length + state.duplicates.length + state.invalid.length;
 	const skipped_collapsed = total_skipped === 0 ? ' hidden' : '';
 
 	const html = `
@@ -907,6 +1278,7 @@ function zero_allocate_with_paste(frm) {
 		matched: [],
 		ambiguous: [],
 		not_found: [],
+		duplicates: [],
 		invalid: [],
 	};
 
@@ -978,6 +1350,7 @@ function zero_allocate_with_paste(frm) {
 				}));
 				state.ambiguous = r.message.ambiguous || [];
 				state.not_found = r.message.not_found || [];
+				state.duplicates = r.message.duplicates || [];
 				state.invalid = skipped;
 				render_review_section(dialog, state);
 			},
@@ -1020,11 +1393,13 @@ function proceed_zero_allocate_paste(frm, dialog, state) {
 			invoice_type: 'Purchase Invoice',
 			invoice_number: r.pi_name,
 			outstanding_amount: r.outstanding_amount,
+			pasted_amount: flt(r.amount, 2),
 			currency: r.currency,
 		}));
 		frappe.call({
 			method: 'cecypo_powerpack.api.zero_allocate_entries',
-			args: { doc: frm.doc, payments: payments_payload, invoices: invoices_payload },
+			// Pasted bill order; the total is already capped at the credit, so every row is kept
+			args: { doc: frm.doc, payments: payments_payload, invoices: invoices_payload, pairing: 'Order' },
 			freeze: true,
 			freeze_message: __('Building allocation rows…'),
 			callback(r) {
@@ -16,9 +16,6 @@
     // Enhanced search enabled flag
     let enhancedSearchEnabled = true;
 
-    // POS search fields from POS Profile
-    let posSearchFields = [];
-
     // Cost permission check
     let canSeeCost = false;
 
@@ -135,9 +132,6 @@
                     // Check cost permission
                     canSeeCost = hasCostPermission();
 
-                    // Load POS Profile search fields
-                    loadPOSSearchFields();
-
                     // Enable features
                     enablePowerPackFeatures();
                 }
@@ -145,32 +139,6 @@
         });
     }
 
-    function loadPOSSearchFields() {
-        // Fetch POS Settings to get search fields (child table)
-        frappe.call({
-            method: 'frappe.client.get',
-            args: {
-                doctype: 'POS Settings',
-                name: 'POS Settings'
-            },
-            callback: (r) => {
-                if (r.message && r.message.pos_search_fields && Array.isArray(r.message.pos_search_fields)) {
-                    // Extract fieldnames from child table
-                    posSearchFields = r.message.pos_search_fields
-                        .map(row => row.fieldname)
-                        .filter(f => f && f.length > 0);
-
-                    console.log('PowerPack: Loaded POS search fields from POS Settings:', posSearchFields);
-                } else {
-                    console.log('PowerPack: No POS search fields configured in POS Settings');
-                }
-            },
-            error: (r) => {
-                console.log('PowerPack: Could not load POS Settings');
-            }
-        });
-    }
-
     function hasCostPermission() {
         const costRoles = [
             "System Manager",
@@ -1018,14 +986,28 @@
         const $searchInput = $('.powerpack-search-input');
         const $clearBtn = $('.powerpack-search-clear-btn');
 
-        // Cache all items when POS loads
+        // Cache of the unfiltered POS item list, shown when the search box is empty
         let allItemsCache = [];
 
+        // Server search state. The sequencer aborts the previous request on every new
+        // query, so a slow response for an older term never overwrites a newer one.
+        const searchState = { term: '', start: 0, items: [], hasMore: false, loading: false };
+        const searchSequencer = new CecypoPowerPack.RequestSequencer('pos-item-search');
+        const PAGE_LENGTH = 40;
+
         // Get initial items
         setTimeout(() => {
             fetchAndCacheAllItems();
         }, 500);
 
+        // Load the next page when the item list is scrolled near its end
+        cur_pos.item_selector.$items_container.on('scroll.powerpack-search', function() {
+            if (!searchState.term || !searchState.hasMore || searchState.loading) return;
+            if (this.scrollTop + this.clientHeight >= this.scrollHeight - 100) {
+                fetchSearchPage(searchState.term, searchState.start);
+            }
+        });
+
         // Search input handler
         let searchTimeout;
         $searchInput.on('input', function() {
@@ -1075,6 +1057,9 @@
         function performEnhancedSearch(searchTerm) {
             if (!searchTerm) {
                 // No search - show all items
+                searchState.term = '';
+                searchState.loading = false;
+                searchSequencer.cancel();
                 if (allItemsCache.length > 0) {
                     cur_pos.item_selector.render_item_list(allItemsCache);
                 } else {
@@ -1083,170 +1068,36 @@
                 return;
             }
 
-            // Apply enhanced search
-            if (allItemsCache.length > 0) {
-                const filtered = getSortedFilteredData(allItemsCache, searchTerm);
-                cur_pos.item_selector.render_item_list(filtered);
-            } else {
-                fetchAndCacheAllItems();
-            }
+            searchState.term = searchTerm;
+            searchState.items = [];
+            fetchSearchPage(searchTerm, 0);
         }
-    }
-
-    function wildcard_to_regex(pattern) {
-        // Convert wildcard pattern to regex
-        // Escape special regex chars, then replace % with .*
-        const escaped = pattern
-            .split('%')
-            .map(s => s.replace(/[.*+?^${}()|[\]\\]/g, '\\$&'))
-            .join('.*');
-        return new RegExp(escaped, 'i');
-    }
-
-    function getSortedFilteredData(items, search_term) {
-        // Validate inputs
-        if (!items || !Array.isArray(items) || items.length === 0) {
-            return items || [];
-        }
-
-        if (!search_term || typeof search_term !== 'string') {
-            return items;
-        }
-
-        const search_lower = search_term.toLowerCase();
-
-        // Check if using wildcard pattern (%)
-        const hasWildcard = search_term.includes('%');
 
-        let scoredItems;
-
-        if (hasWildcard) {
-            // Wildcard search using regex (matching bulk_selection logic)
-            const pattern_local = wildcard_to_regex(search_lower);
-
-            scoredItems = items.map(item => {
-                const item_code_lower = (item.item_code || '').toLowerCase();
-                const item_name_lower = (item.item_name || '').toLowerCase();
-
-                // Build combined string with POS search fields
-                let combined = item_code_lower + ' ' + item_name_lower;
-
-                // Add POS search fields to combined string
-                if (posSearchFields && posSearchFields.length > 0) {
-                    posSearchFields.forEach(field => {
-                        const fieldValue = (item[field] || '').toString().toLowerCase();
-                        if (fieldValue) {
-                            combined += ' ' + fieldValue;
-                        }
-                    });
-                }
-
-                let score = 0;
-
-                if (pattern_local.test(combined)) {
-                    score += 10;
-
-                    // Boost for item_code match
-                    if (pattern_local.test(item_code_lower)) {
-                        score += 30;
-                    }
-
-                    // Check POS search fields for matches
-                    if (posSearchFields && posSearchFields.length > 0) {
-                        posSearchFields.forEach(field => {
-                            const fieldValue = (item[field] || '').toString().toLowerCase();
-                            if (fieldValue && pattern_local.test(fieldValue)) {
-                                score += 20; // Boost for POS search field match
-                            }
-                        });
-                    }
-
-                    // Boost for exact match
-                    const clean_search = search_term.replace(/%/g, '').toLowerCase();
-                    if (item_code_lower === clean_search) {
-                        score += 100;
-                    }
-
-                    // Boost for start-of-string
-                    if (item_code_lower.startsWith(clean_search)) {
-                        score += 50;
-                    }
+        function fetchSearchPage(searchTerm, start) {
+            searchState.loading = true;
+
+            searchSequencer.call({
+                method: 'cecypo_powerpack.api.search_pos_items',
+                args: {
+                    pos_profile: cur_pos.frm.doc.pos_profile,
+                    search_term: searchTerm,
+                    item_group: cur_pos.item_selector.item_group,
+                    start: start,
+                    page_length: PAGE_LENGTH
+                },
+                callback: (r) => {
+                    const result = r.message || {};
+                    const items = result.items || [];
+                    searchState.items = start === 0 ? items : searchState.items.concat(items);
+                    searchState.start = start + items.length;
+                    searchState.hasMore = !!result.has_more;
+                    cur_pos.item_selector.render_item_list(searchState.items);
+                },
+                always: () => {
+                    searchState.loading = false;
                 }
-
-                return { item, score };
-            });
-        } else {
-            // Natural multi-word search mode (matching bulk_selection logic)
-            const tokens = search_lower.split(/\s+/).filter(t => t.length > 0);
-
-            scoredItems = items.map(item => {
-                const item_code_lower = (item.item_code || '').toLowerCase();
-                const item_name_lower = (item.item_name || '').toLowerCase();
-
-                // Build combined string with POS search fields
-                let combined = item_code_lower + ' ' + item_name_lower;
-
-                // Add POS search fields to combined string
-                if (posSearchFields && posSearchFields.length > 0) {
-                    posSearchFields.forEach(field => {
-                        const fieldValue = (item[field] || '').toString().toLowerCase();
-                        if (fieldValue) {
-                            combined += ' ' + fieldValue;
-                        }
-                    });
-                }
-
-                // Check if ALL tokens match somewhere
-                const all_match = tokens.every(token => combined.includes(token));
-
-                let score = 0;
-
-                if (all_match) {
-                    tokens.forEach(token => {
-                        // Exact match in item_code (highest priority)
-                        if (item_code_lower === token) score += 100;
-                        // Item code starts with token
-                        else if (item_code_lower.startsWith(token)) score += 50;
-                        // Token in item_code
-                        else if (item_code_lower.includes(token)) score += 30;
-
-                        // Exact word match in item_name
-                        const name_words = item_name_lower.split(/\s+/);
-                        if (name_words.includes(token)) score += 25;
-                        // Item name starts with token
-                        else if (item_name_lower.startsWith(token)) score += 15;
-                        // Token in item_name
-                        else if (item_name_lower.includes(token)) score += 10;
-
-                        // Check POS search fields for matches
-                        if (posSearchFields && posSearchFields.length > 0) {
-                            posSearchFields.forEach(field => {
-                                const fieldValue = (item[field] || '').toString().toLowerCase();
-                                if (fieldValue) {
-                                    // Exact match in POS search field
-                                    if (fieldValue === token) score += 40;
-                                    // Starts with token
-                                    else if (fieldValue.startsWith(token)) score += 20;
-                                    // Contains token
-                                    else if (fieldValue.includes(token)) score += 12;
-                                }
-                            });
-                        }
-                    });
-
-                    // Bonus for shorter item codes (more specific matches)
-                    score += Math.max(0, 20 - item_code_lower.length);
-                }
-
-                return { item, score };
             });
         }
-
-        // Filter items with score > 0 and sort by score descending
-        return scoredItems
-            .filter(x => x.score > 0)
-            .sort((a, b) => b.score - a.score)
-            .map(x => x.item);
     }
 
     // Start watching for POS ready
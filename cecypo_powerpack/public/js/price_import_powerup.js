@@ -11,6 +11,8 @@
 	function _pip_onload(listview) {
 		if (_base_onload) _base_onload.call(this, listview);
 		listview.page.add_action_item(__("Import Prices (PowerPack)"), open_price_import_dialog);
+		listview.page.add_action_item(__("Export Prices (PowerPack)"), open_price_export_dialog);
+		listview.page.add_action_item(__("Adjust Prices (PowerPack)"), open_price_adjustment_dialog);
 	}
 
 	const _store = Object.assign({}, frappe.listview_settings["Item Price"] || {}, { onload: _pip_onload });
@@ -29,8 +31,12 @@
 
 // ─── Dialog ───────────────────────────────────────────────────────────────────
 
+const PAGE_LENGTH = 200;
+const PROGRESS_EVENT = "powerpack_price_import_progress";
+
 function open_price_import_dialog() {
-	const state = { rows: [] };
+	// job: server-side import state (counts, status, stage); rows: the page on screen
+	const state = { job: null, rows: [], start: 0 };
 
 	const dialog = new frappe.ui.Dialog({
 		title: __("Import Prices"),
@@ -61,8 +67,15 @@ function open_price_import_dialog() {
 		primary_action() { apply_changes(dialog, state); },
 	});
 
+	const on_progress = (job) => {
+		if (state.job && job.import_id === state.job.import_id) on_job_update(dialog, state, job);
+	};
+	frappe.realtime.on(PROGRESS_EVENT, on_progress);
+	dialog.onhide = () => frappe.realtime.off(PROGRESS_EVENT, on_progress);
+
 	dialog.get_primary_btn().prop("disabled", true);
 	wire_upload(dialog, state);
+	wire_pager(dialog, state);
 	dialog.show();
 }
 
@@ -77,7 +90,7 @@ function wire_upload(dialog, state) {
 	dialog.$wrapper.on("change", ".pip-file-input", function (e) {
 		const file = e.target.files[0];
 		e.target.value = "";  // allow re-selecting the same file
-		if (file) read_and_preview(file, dialog, state);
+		if (file) upload_and_preview(file, dialog, state);
 	});
 
 	dialog.$wrapper.on("dragover", ".pip-upload-area", function (e) {
@@ -90,40 +103,118 @@ function wire_upload(dialog, state) {
 		$(this).css("border-color", "#d1d5db");
 		if (e.type === "drop") {
 			const file = e.originalEvent.dataTransfer.files[0];
-			if (file) read_and_preview(file, dialog, state);
+			if (file) upload_and_preview(file, dialog, state);
 		}
 	});
 }
 
-// ─── File read + server call ──────────────────────────────────────────────────
+// ─── Upload + background preview ─────────────────────────────────────────────
+// The file is uploaded as a private File; parsing and classification run in a
+// background job that reports progress over realtime. The classified rows stay on
+// the server and are paged into the review grid.
 
-function read_and_preview(file, dialog, state) {
-	const $review = dialog.fields_dict.review.$wrapper.find(".pip-review-area");
-	$review.show().html(`<div style="text-align:center;padding:20px;color:var(--text-muted);">${__("Parsing file…")}</div>`);
-	dialog.get_primary_btn().prop("disabled", true);
+function review_area(dialog) {
+	return dialog.fields_dict.review.$wrapper.find(".pip-review-area");
+}
 
-	const reader = new FileReader();
-	reader.onerror = function () {
-		$review.html(`<p style="color:#dc2626;padding:12px;">${__("Could not read file.")}</p>`);
-	};
-	reader.onload = function (e) {
-		const base64 = e.target.result.split(",")[1];
-		frappe.call({
-			method: "cecypo_powerpack.api.preview_price_import",
-			args: { file_content: base64, file_name: file.name },
-			freeze: true,
-			freeze_message: __("Reading prices…"),
-			callback(r) {
-				if (r.exc) {
-					$review.html(`<p style="color:#dc2626;padding:12px;">${__("Error reading file. Check format and required columns.")}</p>`);
-					return;
-				}
-				state.rows = r.message || [];
-				render_review(dialog, state);
-			},
+function upload_and_preview(file, dialog, state) {
+	const $review = review_area(dialog);
+	$review.show().html(`<div style="text-align:center;padding:20px;color:var(--text-muted);">${__("Uploading file…")}</div>`);
+	dialog.get_primary_btn().prop("disabled", true);
+	state.job = null;
+
+	const form = new FormData();
+	form.append("file", file, file.name);
+	form.append("is_private", 1);
+	form.append("folder", "Home");
+
+	fetch("/api/method/upload_file", {
+		method: "POST",
+		headers: { "X-Frappe-CSRF-Token": frappe.csrf_token, Accept: "application/json" },
+		body: form,
+	})
+		.then(r => r.json().then(data => ({ ok: r.ok, data })))
+		.then(({ ok, data }) => {
+			if (!ok || !data.message) throw new Error();
+			return frappe.xcall("cecypo_powerpack.price_import.start_price_import", {
+				file_url: data.message.file_url,
+			});
+		})
+		.then(job => {
+			on_job_update(dialog, state, job);
+			// Catch up on anything published before state.job was set
+			return frappe.xcall("cecypo_powerpack.price_import.get_price_import_status", { import_id: job.import_id })
+				.then(latest => on_job_update(dialog, state, latest));
+		})
+		.catch(() => {
+			$review.html(`<p style="color:#dc2626;padding:12px;">${__("Could not upload file.")}</p>`);
 		});
-	};
-	reader.readAsDataURL(file);
+}
+
+function on_job_update(dialog, state, job) {
+	const previous = state.job;
+	state.job = job;
+	const $review = review_area(dialog);
+
+	if (job.status === "Failed") {
+		$review.html(`<p style="color:#dc2626;padding:12px;">${frappe.utils.escape_html(job.error || __("Import failed."))}</p>`);
+		dialog.get_primary_btn().prop("disabled", true);
+		return;
+	}
+
+	if (job.stage === "preview" && job.status === "Ready") {
+		// Load the first page only once; later duplicate events keep the current page
+		if (!previous || previous.status !== "Ready") load_page(dialog, state, 0);
+		return;
+	}
+
+	if (job.stage === "apply" && job.status === "Done") {
+		finish_apply(dialog, job);
+		return;
+	}
+
+	const label = job.stage === "apply" ? __("Applying price changes…") : __("Reading prices…");
+	render_progress($review, label, job.processed, job.stage === "apply" ? count_actions(job) + job.counts.missing : job.total);
+}
+
+function render_progress($review, label, done, total) {
+	const pct = total ? Math.min(100, Math.round(done / total * 100)) : 0;
+	$review.show().html(`
+		<div style="padding:20px;">
+			<div style="margin-bottom:8px;color:var(--text-muted);">${label} ${format_int(done)}${total ? " / " + format_int(total) : ""}</div>
+			<div class="progress" style="height:8px;">
+				<div class="progress-bar" style="width:${total ? pct : 100}%;${total ? "" : "opacity:.4;"}"></div>
+			</div>
+		</div>`);
+}
+
+function load_page(dialog, state, start) {
+	frappe.xcall("cecypo_powerpack.price_import.get_price_import_page", {
+		import_id: state.job.import_id,
+		start: start,
+		page_length: PAGE_LENGTH,
+	}).then(page => {
+		state.rows = page.rows || [];
+		state.start = page.start;
+		render_review(dialog, state);
+	});
+}
+
+function wire_pager(dialog, state) {
+	dialog.$wrapper.on("click", ".pip-page-prev", function () {
+		load_page(dialog, state, Math.max(0, state.start - PAGE_LENGTH));
+	});
+	dialog.$wrapper.on("click", ".pip-page-next", function () {
+		load_page(dialog, state, state.start + PAGE_LENGTH);
+	});
+}
+
+function count_actions(job) {
+	return (job.counts.update || 0) + (job.counts.new || 0);
+}
+
+function format_int(n) {
+	return (n || 0).toLocaleString();
 }
 
 // ─── Review grid ──────────────────────────────────────────────────────────────
@@ -135,6 +226,9 @@ function change_badge(row) {
 	if (row.status === "new") {
 		return `<span style="background:#e0f2fe;color:#0369a1;border-radius:3px;padding:2px 7px;font-size:11px;">&#10022; ${__("new price")}</span>`;
 	}
+	if (row.status === "unchanged") {
+		return `<span style="background:#f3f4f6;color:#9ca3af;border-radius:3px;padding:2px 7px;font-size:11px;">${__("unchanged")}</span>`;
+	}
 	const existing = parseFloat(row.existing_rate) || 0;
 	const rate = parseFloat(row.rate) || 0;
 	const diff = parseFloat((rate - existing).toFixed(2));
@@ -168,6 +262,7 @@ function change_badge(row) {
 }
 
 function row_style(status) {
+	if (status === "unchanged") return "color:#9ca3af;";
 	if (status === "missing") return "background:#fffbeb;";
 	if (status === "new") return "background:#f0f9ff;";
 	return "";
@@ -180,25 +275,36 @@ function format_num(n) {
 
 function render_review(dialog, state) {
 	const rows = state.rows;
-	const $review = dialog.fields_dict.review.$wrapper.find(".pip-review-area");
+	const job = state.job;
+	const $review = review_area(dialog);
 	$review.show();
 
-	if (!rows.length) {
+	if (!job.processed) {
 		$review.html(`<p style="text-align:center;color:var(--text-muted);padding:16px;">${__("No rows found in file. Check that columns item_code, price_list, and rate are present.")}</p>`);
 		dialog.get_primary_btn().prop("disabled", true);
 		return;
 	}
 
-	const n_update  = rows.filter(r => r.status === "update").length;
-	const n_new     = rows.filter(r => r.status === "new").length;
-	const n_missing = rows.filter(r => r.status === "missing").length;
+	const n_update  = job.counts.update;
+	const n_new     = job.counts.new;
+	const n_missing = job.counts.missing;
+	const n_same    = job.counts.unchanged || 0;
 	const n_action  = n_update + n_new;
 
+	const page_end = state.start + rows.length;
+	const pager = job.processed > PAGE_LENGTH ? `
+		<div style="display:flex;justify-content:flex-end;align-items:center;gap:8px;padding-top:8px;font-size:11px;color:#6b7280;">
+			<span>${__("Rows {0}–{1} of {2}", [format_int(state.start + 1), format_int(page_end), format_int(job.processed)])}</span>
+			<button class="btn btn-xs btn-default pip-page-prev" ${state.start ? "" : "disabled"}>${__("Previous")}</button>
+			<button class="btn btn-xs btn-default pip-page-next" ${page_end < job.processed ? "" : "disabled"}>${__("Next")}</button>
+		</div>` : "";
+
 	const summary = `
 		<div style="display:flex;gap:8px;flex-wrap:wrap;padding:10px 0 12px;">
-			<span style="background:#f3f4f6;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#374151;">${rows.length} ${__("total")}</span>
+			<span style="background:#f3f4f6;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#374151;">${format_int(job.processed)} ${__("total")}</span>
 			${n_update  ? `<span style="background:#f0fdf4;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#166534;">&#10003; ${n_update} ${__("updating")}</span>` : ""}
 			${n_new     ? `<span style="background:#e0f2fe;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#0369a1;">&#10022; ${n_new} ${__("new prices")}</span>` : ""}
+			${n_same    ? `<span style="background:#f3f4f6;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#9ca3af;">= ${n_same} ${__("unchanged")}</span>` : ""}
 			${n_missing ? `<span style="background:#fffbeb;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#92400e;">&#9888; ${n_missing} ${__("not found")}</span>` : ""}
 		</div>`;
 
@@ -228,7 +334,8 @@ function render_review(dialog, state) {
 				</thead>
 				<tbody>${tbody}</tbody>
 			</table>
-		</div>`);
+		</div>
+		${pager}`);
 
 	dialog.set_primary_action(__("Apply {0} Changes", [n_action]), function () {
 		apply_changes(dialog, state);
@@ -239,29 +346,169 @@ function render_review(dialog, state) {
 // ─── Apply ────────────────────────────────────────────────────────────────────
 
 function apply_changes(dialog, state) {
-	const n_action = state.rows.filter(r => r.status === "update" || r.status === "new").length;
-	if (!n_action) return;
+	if (!state.job || !count_actions(state.job)) return;
 
 	dialog.get_primary_btn().prop("disabled", true);
-	frappe.call({
-		method: "cecypo_powerpack.api.apply_price_import",
-		args: { rows: JSON.stringify(state.rows) },
-		freeze: true,
-		freeze_message: __("Applying price changes…"),
-		callback(r) {
-			if (r.exc) {
-				dialog.get_primary_btn().prop("disabled", false);
-				return;
-			}
-			const { updated = 0, created = 0, skipped = 0 } = r.message || {};
-			dialog.hide();
-			const parts = [];
-			if (updated) parts.push(__("Updated {0} prices", [updated]));
-			if (created) parts.push(__("created {0} new", [created]));
-			const skipped_msg = skipped ? __(". {0} items not found were skipped.", [skipped]) : ".";
-			frappe.show_alert({ message: parts.join(", ") + skipped_msg, indicator: "green" });
+	frappe.xcall("cecypo_powerpack.price_import.start_price_import_apply", {
+		import_id: state.job.import_id,
+	}).then(job => on_job_update(dialog, state, job))
+		.catch(() => dialog.get_primary_btn().prop("disabled", false));
+}
+
+function finish_apply(dialog, job) {
+	const { updated = 0, created = 0, skipped = 0, unchanged = 0 } = job.result || {};
+	dialog.hide();
+	const parts = [];
+	if (updated) parts.push(__("Updated {0} prices", [updated]));
+	if (created) parts.push(__("created {0} new", [created]));
+	if (unchanged) parts.push(__("{0} already up to date", [unchanged]));
+	const skipped_msg = skipped ? __(". {0} items not found were skipped.", [skipped]) : ".";
+	frappe.show_alert({ message: parts.join(", ") + skipped_msg, indicator: "green" });
+}
+
+// ─── Export ───────────────────────────────────────────────────────────────────
+// Streams one price list to .xlsx/.csv in a background job; the file has the
+// importer's columns, so it can be edited and imported straight back.
+
+const EXPORT_EVENT = "powerpack_price_export_progress";
+
+function open_price_export_dialog() {
+	let export_id = null;
+
+	const dialog = new frappe.ui.Dialog({
+		title: __("Export Prices"),
+		fields: [
+			{ fieldname: "price_list", fieldtype: "Link", options: "Price List", label: __("Price List"), reqd: 1 },
+			{ fieldname: "file_format", fieldtype: "Select", options: "xlsx\ncsv", default: "xlsx", label: __("Format") },
+			{ fieldname: "status", fieldtype: "HTML", options: '<div class="pip-export-status"></div>' },
+		],
+		primary_action_label: __("Export"),
+		primary_action(values) {
+			dialog.get_primary_btn().prop("disabled", true);
+			frappe.xcall("cecypo_powerpack.price_import.start_price_export", values)
+				.then(r => {
+					export_id = r.export_id;
+					$status.html(`<div style="color:var(--text-muted);">${__("Export queued…")}</div>`);
+				})
+				.catch(() => dialog.get_primary_btn().prop("disabled", false));
 		},
 	});
+
+	const $status = dialog.fields_dict.status.$wrapper.find(".pip-export-status");
+	const on_progress = (p) => {
+		if (p.export_id !== export_id) return;
+		if (p.status === "Failed") {
+			$status.html(`<p style="color:#dc2626;">${frappe.utils.escape_html(p.error || __("Export failed."))}</p>`);
+			dialog.get_primary_btn().prop("disabled", false);
+		} else if (p.status === "Done") {
+			$status.html(`
+				<div style="padding:8px 0;">
+					${__("{0} prices exported.", [format_int(p.processed)])}
+					<a href="${encodeURI(p.file_url)}" target="_blank" class="btn btn-xs btn-primary" style="margin-left:8px;">${__("Download")}</a>
+				</div>`);
+		} else {
+			render_progress($status, __("Exporting prices…"), p.processed, p.total);
+		}
+	};
+	frappe.realtime.on(EXPORT_EVENT, on_progress);
+	dialog.onhide = () => frappe.realtime.off(EXPORT_EVENT, on_progress);
+
+	dialog.show();
+}
+
+// ─── Adjust / copy ────────────────────────────────────────────────────────────
+// Percentage or absolute change over a price list (optionally one Item Group
+// subtree), or a copy into another list with a markup. Runs server-side as a few
+// set-based statements; the result offers an Undo backed by a saved snapshot.
+
+const ADJUST_EVENT = "powerpack_price_adjustment_progress";
+
+function open_price_adjustment_dialog() {
+	let job_id = null;
+
+	const dialog = new frappe.ui.Dialog({
+		title: __("Adjust Prices"),
+		fields: [
+			{ fieldname: "operation", fieldtype: "Select", label: __("Operation"), options: "Adjust\nCopy", default: "Adjust", reqd: 1 },
+			{ fieldname: "price_list", fieldtype: "Link", options: "Price List", label: __("Price List"), reqd: 1 },
+			{ fieldname: "target_price_list", fieldtype: "Link", options: "Price List", label: __("Target Price List"), depends_on: "eval:doc.operation=='Copy'", mandatory_depends_on: "eval:doc.operation=='Copy'" },
+			{ fieldname: "item_group", fieldtype: "Link", options: "Item Group", label: __("Item Group"), description: __("Includes all sub-groups. Leave empty for the whole price list.") },
+			{ fieldtype: "Column Break" },
+			{ fieldname: "mode", fieldtype: "Select", label: __("Change By"), options: "Percent\nAmount", default: "Percent", reqd: 1 },
+			{ fieldname: "value", fieldtype: "Float", label: __("Value"), description: __("Negative values lower prices. For a copy this is the markup.") },
+			{ fieldname: "round_to", fieldtype: "Float", label: __("Round To"), description: __("e.g. 5 or 0.05. Leave 0 for no rounding.") },
+			{ fieldname: "rounding", fieldtype: "Select", label: __("Rounding"), options: "Nearest\nUp\nDown", default: "Nearest" },
+			{ fieldname: "overwrite_existing", fieldtype: "Check", label: __("Overwrite prices already in the target"), depends_on: "eval:doc.operation=='Copy'" },
+			{ fieldtype: "Section Break" },
+			{ fieldname: "result", fieldtype: "HTML", options: '<div class="pip-adjust-result"></div>' },
+		],
+		primary_action_label: __("Apply"),
+		primary_action(values) {
+			dialog.get_primary_btn().prop("disabled", true);
+			frappe.xcall("cecypo_powerpack.price_adjustment.start_price_adjustment", values)
+				.then(r => {
+					job_id = r.job_id;
+					$result.html(`<div style="color:var(--text-muted);">${__("Applying…")}</div>`);
+				})
+				.catch(() => dialog.get_primary_btn().prop("disabled", false));
+		},
+		secondary_action_label: __("Preview"),
+		secondary_action() {
+			const values = dialog.get_values();
+			if (!values) return;
+			frappe.xcall("cecypo_powerpack.price_adjustment.preview_price_adjustment", values)
+				.then(r => render_adjustment_preview($result, r));
+		},
+	});
+
+	const $result = dialog.fields_dict.result.$wrapper.find(".pip-adjust-result");
+	const on_progress = (p) => {
+		if (p.job_id !== job_id) return;
+		if (p.status === "Failed") {
+			$result.html(`<p style="color:#dc2626;">${frappe.utils.escape_html(p.error || __("Price adjustment failed."))}</p>`);
+			dialog.get_primary_btn().prop("disabled", false);
+		} else if (p.status === "Done" && p.snapshot !== undefined) {
+			$result.html(`
+				<div style="padding:8px 0;">
+					${__("Updated {0} prices, created {1}.", [format_int(p.updated), format_int(p.created)])}
+					${p.snapshot ? `<button class="btn btn-xs btn-default pip-adjust-undo" style="margin-left:8px;">${__("Undo")}</button>` : ""}
+				</div>`);
+			$result.find(".pip-adjust-undo").on("click", function () {
+				$(this).prop("disabled", true);
+				frappe.xcall("cecypo_powerpack.price_adjustment.start_price_adjustment_rollback", { snapshot: p.snapshot })
+					.then(r => { job_id = r.job_id; });
+			});
+		} else if (p.status === "Done") {
+			$result.html(`<div style="padding:8px 0;">${__("Restored {0} prices, removed {1}.", [format_int(p.restored), format_int(p.deleted)])}</div>`);
+		}
+	};
+	frappe.realtime.on(ADJUST_EVENT, on_progress);
+	dialog.onhide = () => frappe.realtime.off(ADJUST_EVENT, on_progress);
+
+	dialog.show();
+}
+
+function render_adjustment_preview($result, r) {
+	const rows = (r.sample || []).map(row => `
+		<tr style="border-bottom:1px solid #f3f4f6;">
+			<td style="padding:4px 10px;font-family:monospace;font-size:11px;">${frappe.utils.escape_html(row.item_code)}</td>
+			<td style="padding:4px 10px;text-align:right;font-size:11px;">${row.old_rate != null ? format_num(row.old_rate) : '<span style="color:#9ca3af;">—</span>'}</td>
+			<td style="padding:4px 10px;text-align:right;font-size:11px;font-weight:600;">${format_num(row.new_rate)}</td>
+		</tr>`).join("");
+
+	$result.html(`
+		<div style="display:flex;gap:8px;padding:4px 0 10px;">
+			<span style="background:#f0fdf4;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#166534;">${format_int(r.update)} ${__("to update")}</span>
+			${r.create ? `<span style="background:#e0f2fe;border-radius:4px;padding:3px 10px;font-size:11px;font-weight:600;color:#0369a1;">${format_int(r.create)} ${__("to create")}</span>` : ""}
+		</div>
+		${rows ? `<table style="width:100%;border-collapse:collapse;border:1px solid #e5e7eb;">
+			<thead style="background:#f3f4f6;"><tr>
+				<th style="padding:5px 10px;text-align:left;font-size:11px;color:#6b7280;">${__("item_code")}</th>
+				<th style="padding:5px 10px;text-align:right;font-size:11px;color:#6b7280;">${__("current rate")}</th>
+				<th style="padding:5px 10px;text-align:right;font-size:11px;color:#6b7280;">${__("new rate")}</th>
+			</tr></thead>
+			<tbody>${rows}</tbody>
+		</table>` : ""}`);
 }
 
 })();
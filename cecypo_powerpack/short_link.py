@@ -0,0 +1,269 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Cached render context for public short links (/s/<token>).
+
+Resolving a link means reading the short link row, the company of the linked
+document, that company's name and logo, Global Defaults, Website Settings and the
+PowerPack Settings banner fields. All of that changes rarely, so the resolved
+context is kept in a cache hash keyed by token, and a page view costs one cache
+read. Company branding is cached separately per company, so building a context for
+another link of the same company skips the branding queries.
+
+Entries are dropped when the short link itself changes, and the whole cache when
+PowerPack Settings, Website Settings, Global Defaults or a Company changes (doc
+events in hooks.py). Clearing runs again after commit, so a page view that rebuilt
+an entry from the old rows in the meantime does not outlive the change.
+
+Views are counted in Redis, not on the short link row: an INCR per (day, token),
+a HyperLogLog of hashed visitor (IP + user agent) per (day, token) for the unique
+visitor estimate, and a set of the (day, token) pairs with pending counts.
+flush_clicks (scheduler) takes the pending counts atomically and adds them to
+click_count and to PowerPack Short Link Daily Hits in bulk, so a view neither
+locks the link row nor commits.
+"""
+
+import hashlib
+
+import frappe
+
+from cecypo_powerpack.price_import import iter_chunks
+
+CONTEXT_CACHE_KEY = "cecypo_powerpack:short_link_context"
+BRANDING_CACHE_KEY = "cecypo_powerpack:short_link_branding"
+CACHE_TTL = 24 * 60 * 60
+
+HITS_DOCTYPE = "PowerPack Short Link Daily Hits"
+CLICKS_PREFIX = "cecypo_powerpack:short_link_clicks:"
+VISITORS_PREFIX = "cecypo_powerpack:short_link_visitors:"
+PENDING_CLICKS_KEY = "cecypo_powerpack:short_link_clicks_pending"
+# counters outlive a few missed flushes; visitor sketches outlive their day
+CLICK_KEY_TTL = 7 * 24 * 60 * 60
+FLUSH_CHUNK_SIZE = 500
+
+_LINK_FIELDS = ["target_url", "reference_doctype", "reference_docname", "expires_on"]
+_SETTINGS_FIELDS = {
+	"top_banner": "public_link_top_banner",
+	"top_banner_link": "public_link_top_banner_link",
+	"header_content": "public_link_header_content",
+	"footer_content": "public_link_footer_content",
+}
+
+
+def get_link_context(token):
+	"""Resolved context of a short link, or None if the token does not exist."""
+	cache = frappe.cache()
+	context = cache.hget(CONTEXT_CACHE_KEY, token)
+	if context is None:
+		context = build_link_context(token)
+		if context is None:
+			return None
+		cache.hset(CONTEXT_CACHE_KEY, token, context)
+		cache.expire(cache.make_key(CONTEXT_CACHE_KEY), CACHE_TTL)
+	return frappe._dict(context)
+
+
+def is_expired(context):
+	return bool(context.expires_on) and context.expires_on < frappe.utils.today()
+
+
+def build_link_context(token):
+	short_link = frappe.db.get_value("PowerPack Short Link", token, _LINK_FIELDS, as_dict=True)
+	if not short_link:
+		return None
+
+	settings = frappe.get_cached_doc("PowerPack Settings")
+	context = {
+		"token": token,
+		"target_url": short_link.target_url,
+		"reference_doctype": short_link.reference_doctype,
+		"reference_docname": short_link.reference_docname,
+		"expires_on": str(short_link.expires_on) if short_link.expires_on else None,
+		"public_link_page": (settings.get("public_link_page") or "").rstrip("/"),
+		"hide_header": bool(settings.get("public_link_hide_header")),
+	}
+	for key, fieldname in _SETTINGS_FIELDS.items():
+		context[key] = settings.get(fieldname) or ""
+
+	# External links and Builder-page redirects never render the viewer
+	if short_link.reference_doctype and not context["public_link_page"]:
+		doc_company = frappe.db.get_value(
+			short_link.reference_doctype, short_link.reference_docname, "company"
+		)
+		context.update(get_company_branding(doc_company))
+	return context
+
+
+def get_company_branding(company=None):
+	"""company_name and company_logo for the viewer header.
+
+	Prefers the given company (the linked document's, correct in multi-company
+	setups), then the default company, then the first Company, then Website Settings.
+	"""
+	cache = frappe.cache()
+	branding = cache.hget(BRANDING_CACHE_KEY, company or "")
+	if branding is not None:
+		return branding
+
+	fields = ["company_name", "company_logo"]
+	row = company and frappe.db.get_value("Company", company, fields, as_dict=True)
+	if not row:
+		default_company = frappe.db.get_single_value("Global Defaults", "default_company")
+		row = default_company and frappe.db.get_value("Company", default_company, fields, as_dict=True)
+	if not row:
+		rows = frappe.get_all("Company", fields=fields, limit=1)
+		row = rows[0] if rows else frappe._dict()
+
+	branding = {
+		"company_name": row.get("company_name") or "",
+		"company_logo": row.get("company_logo") or "",
+	}
+	if not branding["company_logo"] or not branding["company_name"]:
+		ws = frappe.get_cached_doc("Website Settings")
+		branding["company_logo"] = branding["company_logo"] or ws.get("banner_image") or ""
+		branding["company_name"] = branding["company_name"] or ws.get("app_name") or "Portal"
+
+	cache.hset(BRANDING_CACHE_KEY, company or "", branding)
+	cache.expire(cache.make_key(BRANDING_CACHE_KEY), CACHE_TTL)
+	return branding
+
+
+# --- Invalidation -----------------------------------------------------------------
+
+
+def _clear_all():
+	frappe.cache().delete_value([CONTEXT_CACHE_KEY, BRANDING_CACHE_KEY])
+
+
+def clear_context_cache(doc=None, method=None, *args, **kwargs):
+	"""PowerPack Settings / Website Settings / Global Defaults / Company doc events"""
+	_clear_all()
+	frappe.db.after_commit.add(_clear_all)
+
+
+def clear_link_context(token):
+	"""Drop one link's entry (PowerPack Short Link update / delete)."""
+	frappe.cache().hdel(CONTEXT_CACHE_KEY, token)
+	frappe.db.after_commit.add(lambda: frappe.cache().hdel(CONTEXT_CACHE_KEY, token))
+
+
+# --- Click counting ---------------------------------------------------------------
+
+
+def _visitor_hash():
+	request = getattr(frappe.local, "request", None)
+	user_agent = request.headers.get("User-Agent", "") if request else ""
+	visitor = f"{getattr(frappe.local, 'request_ip', None) or ''}|{user_agent}"
+	return hashlib.sha1(visitor.encode()).hexdigest()
+
+
+def record_click(token, visitor=None):
+	"""Count one view of token in Redis; flush_clicks writes it to the database."""
+	cache = frappe.cache()
+	pending = f"{frappe.utils.today()}:{token}"
+	pipe = cache.pipeline()
+	pipe.incr(cache.make_key(CLICKS_PREFIX + pending))
+	pipe.expire(cache.make_key(CLICKS_PREFIX + pending), CLICK_KEY_TTL)
+	pipe.pfadd(cache.make_key(VISITORS_PREFIX + pending), visitor or _visitor_hash())
+	pipe.expire(cache.make_key(VISITORS_PREFIX + pending), CLICK_KEY_TTL)
+	pipe.sadd(cache.make_key(PENDING_CLICKS_KEY), pending)
+	pipe.execute()
+
+
+def _take_pending_clicks(cache):
+	"""{(day, token): (hits, unique visitors)}, resetting the taken counters.
+
+	Each counter is read and deleted in one transaction together with its pending
+	marker, so a view recorded meanwhile lands in a fresh counter and marker.
+	"""
+	taken = {}
+	for member in cache.smembers(PENDING_CLICKS_KEY):
+		pending = frappe.safe_decode(member)
+		pipe = cache.pipeline()
+		pipe.get(cache.make_key(CLICKS_PREFIX + pending))
+		pipe.delete(cache.make_key(CLICKS_PREFIX + pending))
+		pipe.srem(cache.make_key(PENDING_CLICKS_KEY), pending)
+		pipe.pfcount(cache.make_key(VISITORS_PREFIX + pending))
+		hits, _deleted, _removed, visitors = pipe.execute()
+		if frappe.utils.cint(hits) > 0:
+			day, token = pending.split(":", 1)
+			taken[(day, token)] = (frappe.utils.cint(hits), frappe.utils.cint(visitors))
+	return taken
+
+
+def _restore_clicks(cache, taken):
+	pipe = cache.pipeline()
+	for (day, token), (hits, _visitors) in taken.items():
+		pipe.incrby(cache.make_key(f"{CLICKS_PREFIX}{day}:{token}"), hits)
+		pipe.sadd(cache.make_key(PENDING_CLICKS_KEY), f"{day}:{token}")
+	pipe.execute()
+
+
+def flush_clicks():
+	"""Scheduler: add pending Redis click counts to click_count and the daily hits."""
+	cache = frappe.cache()
+	taken = _take_pending_clicks(cache)
+	if not taken:
+		return
+
+	try:
+		_store_clicks(taken)
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		_restore_clicks(cache, taken)
+		frappe.log_error(title="PowerPack short link click flush failed")
+
+
+def _store_clicks(taken):
+	tokens = sorted({token for _day, token in taken})
+	existing_links = set()
+	for chunk in iter_chunks(tokens, FLUSH_CHUNK_SIZE):
+		existing_links.update(frappe.get_all("PowerPack Short Link", filters={"name": ["in", chunk]}, pluck="name"))
+	# counts of links deleted since the view are dropped
+	taken = {key: counts for key, counts in taken.items() if key[1] in existing_links}
+
+	totals = {}
+	for (_day, token), (hits, _visitors) in taken.items():
+		totals[token] = totals.get(token, 0) + hits
+	for chunk in iter_chunks(sorted(totals), FLUSH_CHUNK_SIZE):
+		frappe.db.sql(
+			"""update `tabPowerPack Short Link`
+			set click_count = coalesce(click_count, 0) + case name {cases} end
+			where name in ({names})""".format(
+				cases=" ".join(["when %s then %s"] * len(chunk)),
+				names=", ".join(["%s"] * len(chunk)),
+			),
+			[v for token in chunk for v in (token, totals[token])] + chunk,
+		)
+
+	now = frappe.utils.now()
+	user = frappe.session.user
+	for chunk in iter_chunks(sorted(taken), FLUSH_CHUNK_SIZE):
+		placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+		rows = frappe.db.sql(
+			f"""select name, short_link, date from `tabPowerPack Short Link Daily Hits`
+			where (short_link, date) in ({placeholders})""",
+			[v for day, token in chunk for v in (token, day)],
+			as_dict=True,
+		)
+		existing = {(str(r.date), r.short_link): r.name for r in rows}
+		for key in chunk:
+			if key in existing:
+				hits, visitors = taken[key]
+				# the sketch covers the whole day, so its count replaces rather than adds
+				frappe.db.sql(
+					"""update `tabPowerPack Short Link Daily Hits`
+					set hits = hits + %s, unique_visitors = greatest(unique_visitors, %s), modified = %s
+					where name = %s""",
+					(hits, visitors, now, existing[key]),
+				)
+		frappe.db.bulk_insert(
+			HITS_DOCTYPE,
+			["name", "owner", "creation", "modified", "modified_by", "short_link", "date", "hits", "unique_visitors"],
+			[
+				(frappe.generate_hash(length=10), user, now, now, user, token, day, *taken[(day, token)])
+				for day, token in chunk
+				if (day, token) not in existing
+			],
+		)
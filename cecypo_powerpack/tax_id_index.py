@@ -0,0 +1,196 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+"""Normalized tax ID index across Customer and Supplier (PowerPack feature).
+
+PowerPack Tax ID Index keeps one row per party with a tax ID, holding the tax ID
+upper-cased with everything but letters and digits stripped, so "p051-234 567x" and
+"P051234567X" collide. The rows are maintained from Customer / Supplier doc events,
+which lets the duplicate check on save be a single indexed lookup spanning both
+doctypes instead of an exact-match scan over the unindexed tax_id column.
+
+start_tax_id_duplicate_report runs a background job that lists every existing
+duplicate cluster in one GROUP BY pass over the index.
+"""
+
+import re
+
+import frappe
+from frappe import _
+
+from cecypo_powerpack.price_import import iter_chunks
+
+INDEX_DOCTYPE = "PowerPack Tax ID Index"
+PARTY_NAME_FIELDS = {"Customer": "customer_name", "Supplier": "supplier_name"}
+REPORT_CACHE_PREFIX = "cecypo_powerpack:tax_id_report:"
+REPORT_CACHE_TTL = 6 * 60 * 60
+REPORT_EVENT = "powerpack_tax_id_report"
+
+_STRIP = re.compile(r"[^0-9A-Z]")
+
+
+def normalize_tax_id(tax_id):
+	return _STRIP.sub("", str(tax_id or "").upper())
+
+
+# --- Maintenance (doc events) ---------------------------------------------------
+
+
+def sync_party(doc, method=None):
+	"""on_update: (re)index the party when its tax ID or name changed.
+
+	on_update also runs after insert, where every value counts as changed.
+	"""
+	if not (doc.has_value_changed("tax_id") or doc.has_value_changed(PARTY_NAME_FIELDS[doc.doctype])):
+		return
+	_write_party(doc.doctype, doc.name, doc.get("tax_id"), doc.get(PARTY_NAME_FIELDS[doc.doctype]))
+
+
+def remove_party(doc, method=None):
+	"""on_trash"""
+	frappe.db.delete(INDEX_DOCTYPE, {"party_type": doc.doctype, "party": doc.name})
+
+
+def rename_party(doc, method=None, old=None, new=None, merge=False):
+	"""after_rename: repoint the index row; on merge the surviving party is reindexed."""
+	if merge:
+		frappe.db.delete(INDEX_DOCTYPE, {"party_type": doc.doctype, "party": old})
+		party = frappe.db.get_value(
+			doc.doctype, new, ["tax_id", PARTY_NAME_FIELDS[doc.doctype]], as_dict=True
+		)
+		if party:
+			_write_party(doc.doctype, new, party.tax_id, party.get(PARTY_NAME_FIELDS[doc.doctype]))
+		return
+
+	frappe.db.sql(
+		"""update `tabPowerPack Tax ID Index` set party = %s
+		where party_type = %s and party = %s""",
+		(new, doc.doctype, old),
+	)
+
+
+def _write_party(party_type, party, tax_id, party_name):
+	frappe.db.delete(INDEX_DOCTYPE, {"party_type": party_type, "party": party})
+	normalized = normalize_tax_id(tax_id)
+	if normalized:
+		_insert_rows([(party_type, party, tax_id, party_name, normalized)])
+
+
+def _insert_rows(rows):
+	"""rows: (party_type, party, tax_id, party_name, normalized_tax_id) tuples."""
+	now = frappe.utils.now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		INDEX_DOCTYPE,
+		[
+			"name", "owner", "creation", "modified", "modified_by",
+			"party_type", "party", "tax_id", "party_name", "normalized_tax_id",
+		],
+		[(frappe.generate_hash(length=10), user, now, now, user, *row) for row in rows],
+	)
+
+
+def rebuild_index():
+	"""Rebuild the whole index from Customer and Supplier (after_install / patch)."""
+	frappe.db.delete(INDEX_DOCTYPE)
+	for party_type, name_field in PARTY_NAME_FIELDS.items():
+		parties = frappe.get_all(
+			party_type,
+			filters=[["tax_id", "is", "set"]],
+			fields=["name", "tax_id", name_field],
+		)
+		rows = (
+			(party_type, p.name, p.tax_id, p.get(name_field), normalize_tax_id(p.tax_id))
+			for p in parties
+		)
+		for chunk in iter_chunks(r for r in rows if r[-1]):
+			_insert_rows(chunk)
+
+
+# --- Lookup ---------------------------------------------------------------------
+
+
+def find_matches(tax_id, exclude_party_type=None, exclude_party=None):
+	"""Every Customer / Supplier whose tax ID normalizes to the same value."""
+	normalized = normalize_tax_id(tax_id)
+	if not normalized:
+		return []
+
+	matches = frappe.db.sql(
+		"""select party_type, party, party_name, tax_id, creation
+		from `tabPowerPack Tax ID Index`
+		where normalized_tax_id = %s
+		order by creation desc""",
+		normalized,
+		as_dict=True,
+	)
+	return [
+		m for m in matches
+		if not (m.party_type == exclude_party_type and m.party == exclude_party)
+	]
+
+
+# --- Duplicate cluster report ---------------------------------------------------
+
+
+@frappe.whitelist()
+def start_tax_id_duplicate_report() -> dict:
+	frappe.only_for("System Manager")
+
+	report_id = frappe.generate_hash(length=12)
+	frappe.enqueue(
+		"cecypo_powerpack.tax_id_index.run_tax_id_duplicate_report",
+		queue="long",
+		timeout=3600,
+		report_id=report_id,
+		user=frappe.session.user,
+	)
+	return {"report_id": report_id}
+
+
+def run_tax_id_duplicate_report(report_id, user):
+	try:
+		rows = frappe.db.sql(
+			"""select idx.normalized_tax_id, idx.party_type, idx.party, idx.party_name, idx.tax_id
+			from `tabPowerPack Tax ID Index` idx
+			inner join (
+				select normalized_tax_id
+				from `tabPowerPack Tax ID Index`
+				group by normalized_tax_id
+				having count(*) > 1
+			) dup on dup.normalized_tax_id = idx.normalized_tax_id
+			order by idx.normalized_tax_id, idx.party_type, idx.party""",
+			as_dict=True,
+		)
+		clusters = {}
+		for row in rows:
+			clusters.setdefault(row.pop("normalized_tax_id"), []).append(row)
+
+		report = {
+			"status": "Completed",
+			"clusters": [
+				{
+					"normalized_tax_id": key,
+					"cross_doctype": len({m.party_type for m in members}) > 1,
+					"members": members,
+				}
+				for key, members in clusters.items()
+			],
+		}
+	except Exception:
+		frappe.log_error(title=_("PowerPack tax ID duplicate report failed"))
+		report = {"status": "Failed", "clusters": []}
+
+	report["report_id"] = report_id
+	frappe.cache().set_value(REPORT_CACHE_PREFIX + report_id, report, expires_in_sec=REPORT_CACHE_TTL)
+	frappe.publish_realtime(REPORT_EVENT, {"report_id": report_id, "status": report["status"]}, user=user)
+
+
+@frappe.whitelist()
+def get_tax_id_duplicate_report(report_id: str) -> dict:
+	frappe.only_for("System Manager")
+
+	report = frappe.cache().get_value(REPORT_CACHE_PREFIX + report_id)
+	if not report:
+		return {"report_id": report_id, "status": "Queued", "clusters": []}
+	return report
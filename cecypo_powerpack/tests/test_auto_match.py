@@ -0,0 +1,81 @@
+# Copyright (c) 2026, Cecypo.Tech and Contributors
+# See license.txt
+
+import random
+import time
+
+from frappe.tests.utils import FrappeTestCase
+
+from cecypo_powerpack.auto_match import _keys, match_entries
+
+
+class TestAutoMatch(FrappeTestCase):
+	def test_reference_match_allocates_quoted_invoices(self):
+		payment_refs = [_keys("Payment for INV/0042 and inv-43")]
+		invoice_keys = [{"INV-41"}, {"INV-42"}, {"INV-43"}]
+
+		rows = match_entries([150], [80, 100, 50], payment_refs, invoice_keys)
+
+		self.assertEqual([(r["invoice"], r["allocated_amount"], r["rule"]) for r in rows], [
+			(1, 100, "Reference"),
+			(2, 50, "Reference"),
+		])
+
+	def test_exact_amount_then_combinations(self):
+		rows = match_entries([100, 300, 250, 75], [100, 120, 180, 60, 15, 250, 40])
+		by_payment = {}
+		for r in rows:
+			by_payment.setdefault(r["payment"], []).append((r["invoice"], r["rule"]))
+
+		self.assertEqual(by_payment[0], [(0, "Amount")])
+		self.assertEqual(by_payment[2], [(5, "Amount")])
+		self.assertEqual(sorted(by_payment[1]), [(1, "Combination"), (2, "Combination")])
+		self.assertEqual(sorted(by_payment[3]), [(3, "Combination"), (4, "Combination")])
+
+	def test_invoice_paid_by_two_payments(self):
+		rows = match_entries([70, 30], [100])
+
+		self.assertEqual({r["payment"] for r in rows}, {0, 1})
+		self.assertEqual(sum(r["allocated_amount"] for r in rows), 100)
+		self.assertEqual(len({r["group"] for r in rows}), 1)
+
+	def test_ambiguous_combination_is_not_proposed(self):
+		# 100 = 40 + 60 = 30 + 70: neither pair is more likely than the other
+		rows = match_entries([100], [40, 60, 30, 70])
+
+		self.assertEqual(rows, [])
+
+	def test_unrelated_amounts_yield_no_combinations(self):
+		random.seed(3)
+		payments = [round(random.uniform(10, 5000), 2) for _ in range(2000)]
+		invoices = [round(random.uniform(10, 5000), 2) for _ in range(2000)]
+
+		rows = match_entries(payments, invoices)
+
+		combinations = [r for r in rows if r["rule"] == "Combination"]
+		self.assertLessEqual(len(combinations), len(payments) // 200)
+
+	def test_never_over_allocates(self):
+		random.seed(7)
+		payments = [round(random.uniform(10, 500), 2) for _ in range(300)]
+		invoices = [round(random.uniform(10, 500), 2) for _ in range(300)]
+
+		rows = match_entries(payments, invoices)
+
+		for index, amounts in ((0, payments), (1, invoices)):
+			key = ("payment", "invoice")[index]
+			used = {}
+			for r in rows:
+				used[r[key]] = used.get(r[key], 0) + r["allocated_amount"]
+			self.assertTrue(all(total <= amounts[k] + 0.01 for k, total in used.items()))
+
+	def test_two_thousand_by_two_thousand_runs_in_seconds(self):
+		random.seed(11)
+		invoices = [round(random.uniform(10, 5000), 2) for _ in range(2000)]
+		payments = [round(random.uniform(10, 5000), 2) for _ in range(1850)] + invoices[:150]
+
+		started = time.monotonic()
+		rows = match_entries(payments, invoices)
+
+		self.assertLess(time.monotonic() - started, 10)
+		self.assertTrue(rows)
@@ -0,0 +1,97 @@
+# Copyright (c) 2026, Cecypo.Tech and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from cecypo_powerpack.batch_reconciliation import (
+	_results_key,
+	_state_key,
+	count_left_open,
+	get_batch_report,
+	reconcile_party,
+	run_batch_reconciliation,
+)
+from cecypo_powerpack.custom_payment_reconciliation import _throw_party_busy
+
+
+class TestBatchReconciliation(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_party_without_entries_is_skipped(self):
+		options = frappe._dict({
+			"company": frappe.db.get_value("Company", {"is_group": 0}, "name"),
+			"party_type": "Supplier",
+			"method": "Allocate",
+		})
+		supplier = frappe.get_doc({
+			"doctype": "Supplier",
+			"supplier_name": "_Test Batch Reconcile Supplier",
+			"supplier_group": frappe.db.get_value("Supplier Group", {"is_group": 0}) or "All Supplier Groups",
+		}).insert(ignore_permissions=True, ignore_if_duplicate=True)
+
+		result = reconcile_party(options, supplier.name)
+
+		self.assertEqual(result["status"], "Skipped")
+
+	def test_partly_allocated_entries_are_left_open(self):
+		doc = frappe._dict(
+			invoices=[
+				frappe._dict(invoice_type="Purchase Invoice", invoice_number="PINV-1", outstanding_amount=100),
+				frappe._dict(invoice_type="Purchase Invoice", invoice_number="PINV-2", outstanding_amount=50),
+				frappe._dict(invoice_type="Purchase Invoice", invoice_number="PINV-3", outstanding_amount=30),
+			],
+			payments=[
+				frappe._dict(reference_type="Payment Entry", reference_name="PE-1", reference_row=None, amount=120),
+				frappe._dict(reference_type="Journal Entry", reference_name="JV-1", reference_row="r1", amount=30),
+			],
+			allocation=[
+				frappe._dict(invoice_type="Purchase Invoice", invoice_number="PINV-1", reference_type="Payment Entry",
+					reference_name="PE-1", reference_row=None, allocated_amount=100),
+				frappe._dict(invoice_type="Purchase Invoice", invoice_number="PINV-2", reference_type="Payment Entry",
+					reference_name="PE-1", reference_row=None, allocated_amount=20),
+			],
+		)
+
+		# PINV-2 and PINV-3 are not settled, JV-1 is not used; PE-1 is fully allocated
+		self.assertEqual(count_left_open(doc), 3)
+
+	def test_party_locked_meanwhile_is_skipped(self):
+		batch_id = frappe.generate_hash(length=12)
+		frappe.cache().set_value(_state_key(batch_id), {"batch_id": batch_id, "owner": frappe.session.user, "total": 1})
+		busy = frappe._dict(party_type="Supplier", party="_Test Supplier")
+		try:
+			with patch(
+				"cecypo_powerpack.batch_reconciliation.reconcile_party",
+				side_effect=lambda options, party: _throw_party_busy(busy),
+			):
+				run_batch_reconciliation(batch_id, ["_Test Supplier"], {})
+
+			self.assertEqual(frappe.cache().hget(_results_key(batch_id), "_Test Supplier")["status"], "Skipped")
+		finally:
+			frappe.cache().delete_value([_state_key(batch_id), _results_key(batch_id)])
+
+	def test_report_sums_party_results(self):
+		batch_id = frappe.generate_hash(length=12)
+		frappe.cache().set_value(_state_key(batch_id), {"batch_id": batch_id, "owner": frappe.session.user, "total": 3})
+		try:
+			frappe.cache().hset(
+				_results_key(batch_id), "A", {"status": "Reconciled", "reconciled": 2, "allocated_amount": 150, "left_open": 4}
+			)
+			frappe.cache().hset(_results_key(batch_id), "B", {"status": "Failed", "error": "boom"})
+
+			report = get_batch_report(batch_id)
+			self.assertEqual(report["status"], "Running")
+			self.assertEqual(report["counts"], {"Reconciled": 1, "Skipped": 0, "Failed": 1})
+			self.assertEqual(report["allocated_amount"], 150)
+			self.assertEqual(report["left_open"], 4)
+
+			frappe.cache().hset(_results_key(batch_id), "C", {"status": "Skipped", "reason": "Nothing allocated"})
+			report = get_batch_report(batch_id)
+			self.assertEqual(report["status"], "Completed")
+			self.assertEqual([p["party"] for p in report["parties"]], ["A", "B", "C"])
+		finally:
+			frappe.cache().delete_value([_state_key(batch_id), _results_key(batch_id)])
@@ -0,0 +1,403 @@
+# Copyright (c) 2026, Cecypo.Tech and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+
+class TestBatchedJournalEntryUpdates(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def _journal_entry(self, amount):
+		je = frappe.new_doc("Journal Entry")
+		je.append(
+			"accounts",
+			{"account": "Creditors", "party_type": "Supplier", "party": "_Test Supplier",
+			"debit_in_account_currency": amount, "debit": amount, "exchange_rate": 1},
+		)
+		je.accounts[0].name = "JEA-BATCH-1"
+		return je
+
+	def _allocation(self, invoice, amount, total):
+		return frappe._dict({
+			"voucher_detail_no": "JEA-BATCH-1",
+			"dr_or_cr": "debit_in_account_currency",
+			"against_voucher_type": "Purchase Invoice",
+			"against_voucher": invoice,
+			"allocated_amount": amount,
+			"unadjusted_amount": total,
+		})
+
+	def test_split_rows_applied_in_memory_without_saving(self):
+		from cecypo_powerpack.custom_payment_reconciliation import (
+			_fixed_update_reference_in_journal_entry,
+			_reconcile_with_batched_journal_entries,
+		)
+
+		je = self._journal_entry(300)
+
+		def apply_all():
+			for i in range(3):
+				_fixed_update_reference_in_journal_entry(self._allocation(f"PINV-{i}", 100, 300), je)
+
+		with patch.object(type(je), "save") as save:
+			_reconcile_with_batched_journal_entries(apply_all)
+
+		save.assert_not_called()
+		self.assertFalse(frappe.flags.pp_batch_journal_entry_updates)
+		self.assertFalse(frappe.flags.pp_journal_entry_account_fields)
+		# the source row is consumed exactly; one named split row per invoice
+		self.assertEqual([r.reference_name for r in je.accounts], ["PINV-0", "PINV-1", "PINV-2"])
+		self.assertTrue(all(r.name and r.debit_in_account_currency == 100 for r in je.accounts))
+
+	def test_split_row_fields_follow_the_current_meta(self):
+		from cecypo_powerpack.custom_payment_reconciliation import _get_journal_entry_account_fields
+
+		meta = frappe.get_meta("Journal Entry Account")
+		# e.g. an accounting dimension added as a Custom Field while workers are running
+		with patch.object(type(meta), "get_fieldnames_with_value", return_value=["account", "pp_new_dimension"]):
+			self.assertIn("pp_new_dimension", _get_journal_entry_account_fields())
+
+
+class TestZeroReconcileJob(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def _reconciliation(self, party="_Test Supplier"):
+		return frappe._dict({
+			"company": "_Test Company",
+			"party_type": "Supplier",
+			"party": party,
+			"receivable_payable_account": "Creditors - _TC",
+		})
+
+	def test_voucher_chunks_keep_each_voucher_together(self):
+		from cecypo_powerpack.custom_payment_reconciliation import _voucher_chunks
+
+		entries = [
+			frappe._dict({"voucher_type": "Journal Entry", "voucher_no": f"JV-{i // 3}"})
+			for i in range(9)
+		]
+		chunks = list(_voucher_chunks(entries, 4))
+
+		# 3 + 3 would exceed 4, so every voucher ends up in its own chunk rather than split
+		self.assertEqual([{e.voucher_no for e in c} for c in chunks], [{"JV-0"}, {"JV-1"}, {"JV-2"}])
+		self.assertEqual([len(c) for c in chunks], [3, 3, 3])
+
+	def test_queued_job_blocks_same_party_only(self):
+		from cecypo_powerpack.custom_payment_reconciliation import (
+			JOB_CACHE_PREFIX,
+			_check_not_queued,
+			_party_lock_name,
+		)
+
+		doc = self._reconciliation()
+		marker = JOB_CACHE_PREFIX + _party_lock_name(doc)
+		frappe.cache().set_value(marker, "queued-job")
+		try:
+			self.assertRaises(frappe.ValidationError, _check_not_queued, doc)
+			_check_not_queued(doc, "queued-job")
+			_check_not_queued(self._reconciliation("_Test Supplier 1"))
+		finally:
+			frappe.cache().delete_value(marker)
+
+	def test_lock_held_until_transaction_end(self):
+		from frappe.utils import cint
+
+		from cecypo_powerpack.custom_payment_reconciliation import (
+			_party_lock_name,
+			party_reconciliation_lock,
+		)
+
+		doc = self._reconciliation()
+		lock = _party_lock_name(doc)
+		is_free = lambda: cint(frappe.db.sql("select is_free_lock(%s)", lock)[0][0])  # noqa: E731
+
+		with party_reconciliation_lock(doc, until_transaction_end=True):
+			pass
+		self.assertFalse(is_free())
+
+		frappe.db.rollback()
+		self.assertTrue(is_free())
+
+		with party_reconciliation_lock(doc):
+			pass
+		self.assertTrue(is_free())
+
+
+class TestReconciliationOverrides(FrappeTestCase):
+	def test_overrides_are_scoped_to_the_current_context(self):
+		import threading
+
+		import erpnext.accounts.utils as erpnext_utils
+
+		from cecypo_powerpack.custom_payment_reconciliation import (
+			_fixed_update_reference_in_journal_entry,
+			_journal_entry_update,
+			reconciliation_overrides,
+		)
+
+		seen = {}
+		check = lambda entry: seen.setdefault("checked", entry)  # noqa: E731
+
+		self.assertTrue(erpnext_utils.update_reference_in_journal_entry._pp_dispatch)
+		self.assertTrue(erpnext_utils.check_if_advance_entry_modified._pp_dispatch)
+
+		with reconciliation_overrides(check_if_advance_entry_modified=check):
+			erpnext_utils.check_if_advance_entry_modified("entry")
+			self.assertIs(_journal_entry_update.get(), _fixed_update_reference_in_journal_entry)
+
+			other = threading.Thread(target=lambda: seen.setdefault("other", _journal_entry_update.get()))
+			other.start()
+			other.join()
+
+		self.assertEqual(seen["checked"], "entry")
+		self.assertIsNone(seen["other"])
+		self.assertIsNone(_journal_entry_update.get())
+
+
+class TestVerifyAdvanceEntriesUnchanged(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def _entry(self, voucher_type, voucher_no, amount, detail=None, account="Creditors - _TC"):
+		return frappe._dict({
+			"voucher_type": voucher_type,
+			"voucher_no": voucher_no,
+			"voucher_detail_no": detail,
+			"account": account,
+			"party_type": "Supplier",
+			"party": "_Test Supplier",
+			"allocated_amount": amount,
+		})
+
+	def test_nothing_to_verify(self):
+		from cecypo_powerpack.custom_payment_reconciliation import verify_advance_entries_unchanged
+
+		verify_advance_entries_unchanged([])
+
+	def test_missing_vouchers_are_reported_together_in_two_queries(self):
+		from cecypo_powerpack.custom_payment_reconciliation import verify_advance_entries_unchanged
+
+		entries = [
+			self._entry("Payment Entry", "PE-PP-MISSING", 50),
+			self._entry("Payment Entry", "PE-PP-MISSING", 25),
+			self._entry("Journal Entry", "JV-PP-MISSING", 10, detail="JEA-PP-MISSING"),
+		]
+		with self.assertQueryCount(2):
+			with self.assertRaises(frappe.ValidationError) as ctx:
+				verify_advance_entries_unchanged(entries)
+
+		message = str(ctx.exception)
+		self.assertIn("PE-PP-MISSING", message)
+		self.assertIn("JV-PP-MISSING", message)
+		self.assertIn("75", message)
+
+	def test_allocation_beyond_the_unallocated_amount_is_reported(self):
+		from erpnext.accounts.doctype.payment_entry.test_payment_entry import create_payment_entry
+
+		from cecypo_powerpack.custom_payment_reconciliation import verify_advance_entries_unchanged
+
+		advance = create_payment_entry(
+			company="_Test Company",
+			payment_type="Pay",
+			party_type="Supplier",
+			party="_Test Supplier",
+			paid_from="Cash - _TC",
+			paid_to="Creditors - _TC",
+			paid_amount=100,
+			save=1,
+			submit=1,
+		)
+
+		verify_advance_entries_unchanged([
+			self._entry("Payment Entry", advance.name, 60),
+			self._entry("Payment Entry", advance.name, 40),
+		])
+
+		with self.assertRaises(frappe.ValidationError) as ctx:
+			verify_advance_entries_unchanged([self._entry("Payment Entry", advance.name, 150)])
+		self.assertIn(advance.name, str(ctx.exception))
+		self.assertIn("100", str(ctx.exception))
+
+		# the payment does not touch the account the allocation was pulled for
+		with self.assertRaises(frappe.ValidationError):
+			verify_advance_entries_unchanged([self._entry("Payment Entry", advance.name, 50, account="Debtors - _TC")])
+
+
+class TestConsolidatedNoteReconciliation(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def _invoice(self, rate, is_return=0):
+		from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+
+		return create_sales_invoice(qty=-1 if is_return else 1, rate=rate, is_return=is_return)
+
+	def _note_allocation(self, note, invoice, amount, posting_date=None, difference_amount=0):
+		"""A credit note row as PaymentReconciliation.get_payment_details builds it."""
+		return frappe._dict({
+			"voucher_type": "Sales Invoice",
+			"voucher_no": note.name,
+			"voucher_detail_no": None,
+			"against_voucher_type": "Sales Invoice",
+			"against_voucher": invoice.name,
+			"account": invoice.debit_to,
+			"exchange_rate": 1,
+			"party_type": "Customer",
+			"party": invoice.customer,
+			"dr_or_cr": "credit_in_account_currency",
+			"unreconciled_amount": abs(note.outstanding_amount),
+			"unadjusted_amount": abs(note.outstanding_amount),
+			"allocated_amount": amount,
+			"difference_amount": difference_amount,
+			"currency": invoice.currency,
+			"debit_or_credit_note_posting_date": posting_date or frappe.utils.today(),
+		})
+
+	def test_one_balanced_journal_per_posting_date(self):
+		from unittest.mock import patch
+
+		from cecypo_powerpack.custom_payment_reconciliation import reconcile_dr_cr_notes_consolidated
+
+		inv_a, inv_b = self._invoice(100), self._invoice(100)
+		note_a, note_b, note_c, note_d = (self._invoice(rate, is_return=1) for rate in (40, 30, 10, 5))
+		yesterday = frappe.utils.add_days(frappe.utils.today(), -1)
+		exchange_row = self._note_allocation(note_d, inv_b, 5, difference_amount=1)
+
+		with patch(
+			"erpnext.accounts.doctype.payment_reconciliation.payment_reconciliation.reconcile_dr_cr_note"
+		) as per_allocation:
+			journals = reconcile_dr_cr_notes_consolidated(
+				[
+					self._note_allocation(note_a, inv_a, 40),
+					self._note_allocation(note_b, inv_b, 30),
+					self._note_allocation(note_c, inv_a, 10, posting_date=yesterday),
+					exchange_row,
+				],
+				inv_a.company,
+			)
+
+		# the row with an exchange difference keeps the per-allocation path (gain/loss booking)
+		per_allocation.assert_called_once_with([exchange_row], inv_a.company, None)
+
+		self.assertEqual(len(journals), 2)
+		by_date = {str(frappe.db.get_value("Journal Entry", name, "posting_date")): name for name in journals}
+		today_jv = frappe.get_doc("Journal Entry", by_date[frappe.utils.today()])
+		self.assertEqual((today_jv.docstatus, today_jv.voucher_type), (1, "Credit Note"))
+		self.assertEqual(len(today_jv.accounts), 4)
+		self.assertEqual(
+			{(r.reference_name, r.debit, r.credit) for r in today_jv.accounts},
+			{(inv_a.name, 0, 40), (note_a.name, 40, 0), (inv_b.name, 0, 30), (note_b.name, 30, 0)},
+		)
+		self.assertEqual(len(frappe.get_doc("Journal Entry", by_date[yesterday]).accounts), 2)
+
+		gl = frappe.get_all(
+			"GL Entry",
+			filters={"voucher_no": ["in", journals], "is_cancelled": 0},
+			fields=["sum(debit) as debit", "sum(credit) as credit", "count(*) as entries"],
+		)[0]
+		self.assertEqual((gl.debit, gl.credit, gl.entries), (50, 50, 6))
+
+		ple = {
+			row.against_voucher_no: row.amount
+			for row in frappe.get_all(
+				"Payment Ledger Entry",
+				filters={"voucher_no": ["in", journals], "delinked": 0},
+				fields=["against_voucher_no", "sum(amount) as amount"],
+				group_by="against_voucher_no",
+			)
+		}
+		self.assertEqual(ple, {inv_a.name: -50, inv_b.name: -30, note_a.name: 40, note_b.name: 30, note_c.name: 10})
+
+		outstanding = lambda doc: frappe.db.get_value("Sales Invoice", doc.name, "outstanding_amount")  # noqa: E731
+		self.assertEqual([outstanding(d) for d in (inv_a, inv_b)], [50, 70])
+		self.assertEqual([outstanding(d) for d in (note_a, note_b, note_c)], [0, 0, 0])
+
+	def test_outstanding_updates_run_once_per_voucher_after_submit(self):
+		import erpnext.accounts.utils as erpnext_utils
+
+		from cecypo_powerpack.custom_payment_reconciliation import (
+			_deferred_outstanding_updates,
+			_voucher_outstanding_update,
+		)
+
+		calls = []
+		token = _voucher_outstanding_update.set(lambda *args, **kwargs: calls.append(kwargs["voucher_no"]))
+		try:
+			with _deferred_outstanding_updates():
+				for voucher_no in ("SINV-1", "SINV-1", "SINV-2", "SINV-1"):
+					erpnext_utils.update_voucher_outstanding(
+						voucher_type="Sales Invoice", voucher_no=voucher_no, account="Debtors - _TC",
+						party_type="Customer", party="_Test Customer",
+					)
+				self.assertEqual(calls, [])
+		finally:
+			_voucher_outstanding_update.reset(token)
+
+		self.assertEqual(calls, ["SINV-1", "SINV-2"])
+
+	def test_note_outstanding_must_cover_all_its_allocations(self):
+		from cecypo_powerpack.custom_payment_reconciliation import _verify_note_outstanding
+
+		note = frappe._dict({"voucher_type": "Sales Invoice", "voucher_no": "SINV-PP-MISSING", "allocated_amount": 10})
+		self.assertRaises(frappe.ValidationError, _verify_note_outstanding, [note])
+
+
+class TestUnreconciledWindow(FrappeTestCase):
+	def _invoices(self, count):
+		return [
+			{"invoice_number": f"PINV-{i:03d}", "invoice_date": f"2026-01-{i % 28 + 1:02d}", "outstanding_amount": i}
+			for i in sorted(range(count), key=lambda i: (i % 28, i))
+		]
+
+	def _pages(self, rows, table, page_size, **ranges):
+		from cecypo_powerpack.custom_payment_reconciliation import _window_index, _window_page
+
+		index = _window_index(rows, table)
+		seen, after = [], None
+		while True:
+			page = _window_page(
+				index, lambda positions: [rows[i] for i in positions], after=after, page_size=page_size, **ranges
+			)
+			seen += page["rows"]
+			if not page["has_more"]:
+				return seen, page["total"]
+			after = page["cursor"]
+
+	def test_keyset_pages_cover_the_set_once(self):
+		rows = self._invoices(95)
+
+		seen, total = self._pages(rows, "invoices", page_size=20)
+
+		self.assertEqual(total, 95)
+		self.assertEqual(seen, rows)
+
+	def test_rows_of_one_voucher_on_one_date_are_not_skipped(self):
+		from cecypo_powerpack.custom_payment_reconciliation import _window_key
+
+		# a Journal Entry pays in several rows; a Payment Entry shares its number and date
+		rows = [
+			{"reference_type": "Journal Entry", "reference_name": "ACC-JV-001", "reference_row": f"row-{i}",
+			 "posting_date": "2026-01-05", "amount": 10}
+			for i in range(5)
+		] + [{"reference_type": "Payment Entry", "reference_name": "ACC-JV-001", "reference_row": None,
+			  "posting_date": "2026-01-05", "amount": 10}]
+		rows.sort(key=lambda row: _window_key(row, "payments"))
+
+		seen, _total = self._pages(rows, "payments", page_size=2)
+
+		self.assertEqual(seen, rows)
+
+	def test_ranges_filter_before_paging(self):
+		seen, total = self._pages(self._invoices(95), "invoices", page_size=5, min_amount=50, to_date="2026-01-10")
+
+		self.assertTrue(all(row["outstanding_amount"] >= 50 for row in seen))
+		self.assertTrue(all(row["invoice_date"] <= "2026-01-10" for row in seen))
+		self.assertEqual(total, len(seen))
+		self.assertEqual(total, len([
+			i for i in range(50, 95) if i % 28 + 1 <= 10
+		]))
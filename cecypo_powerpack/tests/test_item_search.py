@@ -0,0 +1,57 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from cecypo_powerpack.api import _item_search_condition, _pop_item_search_context
+from cecypo_powerpack.utils import is_search_superseded
+
+
+class TestItemSearchCondition(FrappeTestCase):
+	def test_multi_word_tokens_are_anded(self):
+		values = {}
+		cond = _item_search_condition("red  shirt", ["item_code", "item_name"], values)
+		self.assertEqual(values, {"tok0": "%red%", "tok1": "%shirt%"})
+		self.assertIn(") and (", cond)
+		self.assertIn("tabItem.item_name LIKE %(tok1)s", cond)
+		self.assertIn("`tabItem Barcode`", cond)
+
+	def test_wildcard_is_single_padded_token(self):
+		values = {}
+		_item_search_condition("ridge%grey", ["item_code"], values)
+		self.assertEqual(values, {"tok0": "%ridge%grey%"})
+
+	def test_empty_text_matches_everything(self):
+		values = {}
+		_item_search_condition("", ["item_code"], values)
+		self.assertEqual(values, {"tok0": "%"})
+
+
+class TestItemSearchContext(FrappeTestCase):
+	def test_context_keys_are_removed_from_filters(self):
+		filters, context = _pop_item_search_context(
+			json.dumps({"is_sales_item": 1, "pp_warehouse": "Stores - X", "pp_price_list": ""})
+		)
+		self.assertEqual(filters, {"is_sales_item": 1})
+		self.assertEqual(context, {"pp_warehouse": "Stores - X"})
+
+	def test_non_dict_filters_pass_through(self):
+		filters, context = _pop_item_search_context([["Item", "disabled", "=", 0]])
+		self.assertEqual(filters, [["Item", "disabled", "=", 0]])
+		self.assertEqual(context, {})
+
+
+class TestSearchSequencing(FrappeTestCase):
+	def test_older_seq_is_superseded(self):
+		scope = "test-scope:" + frappe.generate_hash(length=8)
+		self.assertFalse(is_search_superseded(scope, 1))
+		self.assertFalse(is_search_superseded(scope, 3))
+		self.assertTrue(is_search_superseded(scope, 2))
+		self.assertFalse(is_search_superseded(scope, 3))
+
+	def test_untagged_requests_are_never_superseded(self):
+		self.assertFalse(is_search_superseded(None, 5))
+		self.assertFalse(is_search_superseded("test-scope", None))
@@ -0,0 +1,82 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from cecypo_powerpack import overdue_summary
+
+CUSTOMER = "_Test Overdue Summary Customer"
+COMPANY = "_Test Overdue Summary Company"
+
+
+def _invoice(days_overdue, outstanding, docstatus=1):
+	"""Bare Sales Invoice row (db_insert skips validation) for the summary queries."""
+	doc = frappe.get_doc({
+		"doctype": "Sales Invoice",
+		"customer": CUSTOMER,
+		"customer_name": CUSTOMER,
+		"company": COMPANY,
+		"currency": "KES",
+		"docstatus": docstatus,
+		"posting_date": add_days(today(), -days_overdue - 30),
+		"due_date": add_days(today(), -days_overdue),
+		"grand_total": outstanding,
+		"outstanding_amount": outstanding,
+	})
+	doc.name = "_T-OD-" + frappe.generate_hash(length=8)
+	doc.db_insert()
+	return doc
+
+
+class TestOverdueSummary(FrappeTestCase):
+	def tearDown(self):
+		frappe.flags.pp_overdue_dirty = None
+		frappe.db.rollback()
+
+	def test_aggregates_and_ageing(self):
+		oldest = _invoice(100, 50)
+		_invoice(45, 20)
+		_invoice(10, 5)
+		_invoice(5, 0)  # settled
+		_invoice(-3, 70)  # not yet due
+		_invoice(20, 999, docstatus=2)  # cancelled
+
+		summary = overdue_summary.compute_summaries([(CUSTOMER, COMPANY)])[(CUSTOMER, COMPANY)]
+
+		self.assertEqual(summary.overdue_count, 3)
+		self.assertEqual(summary.total_outstanding, 75)
+		self.assertEqual(str(summary.oldest_due_date), str(oldest.due_date))
+		self.assertEqual(
+			[summary.ageing_0_30, summary.ageing_31_60, summary.ageing_61_90, summary.ageing_90_plus],
+			[5, 20, 0, 50],
+		)
+		self.assertEqual(summary.top_invoices[0].name, oldest.name)
+
+	def test_top_invoices_are_capped(self):
+		for days in range(1, overdue_summary.TOP_N + 3):
+			_invoice(days, 1)
+
+		summary = overdue_summary.compute_summaries([(CUSTOMER, COMPANY)])[(CUSTOMER, COMPANY)]
+
+		self.assertEqual(summary.overdue_count, overdue_summary.TOP_N + 2)
+		self.assertEqual(len(summary.top_invoices), overdue_summary.TOP_N)
+
+	def test_dirty_pairs_refresh_on_flush(self):
+		_invoice(15, 40)
+		overdue_summary.mark_dirty(CUSTOMER, COMPANY)
+		overdue_summary._flush_dirty()
+
+		rows = frappe.get_all(
+			overdue_summary.SUMMARY_DOCTYPE,
+			filters={"customer": CUSTOMER, "company": COMPANY},
+			fields=["overdue_count", "total_outstanding"],
+		)
+		self.assertEqual(len(rows), 1)
+		self.assertEqual(rows[0].total_outstanding, 40)
+
+		# once nothing is overdue the row goes away
+		frappe.db.sql("update `tabSales Invoice` set outstanding_amount = 0 where customer = %s", CUSTOMER)
+		overdue_summary.refresh_pairs([(CUSTOMER, COMPANY)])
+		self.assertFalse(frappe.db.exists(overdue_summary.SUMMARY_DOCTYPE, {"customer": CUSTOMER}))
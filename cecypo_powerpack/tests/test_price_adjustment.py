@@ -0,0 +1,149 @@
+# Copyright (c) 2026, Cecypo.Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+TEST_GROUP = "_Test PIP Adjust Group"
+TEST_ITEM = "_Test PIP Adjust Item"
+TEST_PRICE_LIST = "Standard Selling"
+TEST_TARGET_PRICE_LIST = "_Test PIP Adjust Target"
+
+
+class TestPriceAdjustment(IntegrationTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        if not frappe.db.exists("Item Group", TEST_GROUP):
+            frappe.get_doc({
+                "doctype": "Item Group",
+                "item_group_name": TEST_GROUP,
+                "parent_item_group": "All Item Groups",
+            }).insert(ignore_permissions=True)
+        if not frappe.db.exists("Item", TEST_ITEM):
+            frappe.get_doc({
+                "doctype": "Item",
+                "item_code": TEST_ITEM,
+                "item_name": TEST_ITEM,
+                "item_group": TEST_GROUP,
+                "stock_uom": "Nos",
+                "is_stock_item": 0,
+            }).insert(ignore_permissions=True)
+        if not frappe.db.exists("Price List", TEST_TARGET_PRICE_LIST):
+            frappe.get_doc({
+                "doctype": "Price List",
+                "price_list_name": TEST_TARGET_PRICE_LIST,
+                "currency": frappe.db.get_value("Price List", TEST_PRICE_LIST, "currency"),
+                "selling": 1,
+            }).insert(ignore_permissions=True)
+        frappe.db.commit()  # persist class-level fixtures before per-test rollbacks
+
+    def setUp(self):
+        frappe.db.delete("Item Price", {"item_code": TEST_ITEM})
+        self.ip_name = frappe.get_doc({
+            "doctype": "Item Price",
+            "item_code": TEST_ITEM,
+            "price_list": TEST_PRICE_LIST,
+            "price_list_rate": 100.0,
+        }).insert(ignore_permissions=True).name
+        frappe.db.commit()
+
+    def tearDown(self):
+        frappe.db.rollback()
+        frappe.db.delete("Item Price", {"item_code": TEST_ITEM})
+        frappe.db.commit()
+
+    def _options(self, **kwargs):
+        return {
+            "operation": "Adjust",
+            "price_list": TEST_PRICE_LIST,
+            "item_group": TEST_GROUP,
+            "mode": "Percent",
+            "value": 7,
+            "round_to": 5,
+            "rounding": "Nearest",
+            **kwargs,
+        }
+
+    def test_preview_counts_scoped_prices(self):
+        from cecypo_powerpack.price_adjustment import preview_price_adjustment
+
+        result = preview_price_adjustment(**self._options())
+        self.assertEqual(result["update"], 1)
+        self.assertEqual(float(result["sample"][0]["new_rate"]), 105.0)
+
+    def test_adjust_and_rollback(self):
+        from cecypo_powerpack import price_adjustment
+
+        job_id = frappe.generate_hash(length=12)
+        price_adjustment.run_price_adjustment(job_id, self._options(rounding="Up"))
+
+        self.assertEqual(float(frappe.db.get_value("Item Price", self.ip_name, "price_list_rate")), 110.0)
+
+        file_name = frappe.db.get_value(
+            "File", {"attached_to_doctype": "Price List", "file_name": ["like", f"%{job_id}%"]}
+        )
+        price_adjustment.run_price_adjustment_rollback("t-rollback", file_name)
+        self.assertEqual(float(frappe.db.get_value("Item Price", self.ip_name, "price_list_rate")), 100.0)
+        self.assertFalse(frappe.db.exists("File", file_name))
+
+    def test_adjust_leaves_party_specific_prices_alone(self):
+        from cecypo_powerpack import price_adjustment
+
+        customer_price = frappe.get_doc({
+            "doctype": "Item Price",
+            "item_code": TEST_ITEM,
+            "price_list": TEST_PRICE_LIST,
+            "customer": "_Test Customer",
+            "price_list_rate": 80.0,
+        }).insert(ignore_permissions=True).name
+
+        self.assertEqual(price_adjustment.preview_price_adjustment(**self._options())["update"], 1)
+        price_adjustment.run_price_adjustment("t-generic", self._options())
+
+        self.assertEqual(float(frappe.db.get_value("Item Price", self.ip_name, "price_list_rate")), 105.0)
+        self.assertEqual(float(frappe.db.get_value("Item Price", customer_price, "price_list_rate")), 80.0)
+
+    def test_copy_matches_prices_per_uom(self):
+        from cecypo_powerpack import price_adjustment
+
+        frappe.db.set_value("Item Price", self.ip_name, "uom", "Nos")
+        frappe.get_doc({
+            "doctype": "Item Price",
+            "item_code": TEST_ITEM,
+            "price_list": TEST_PRICE_LIST,
+            "uom": "Box",
+            "price_list_rate": 1000.0,
+        }).insert(ignore_permissions=True)
+        target_nos = frappe.get_doc({
+            "doctype": "Item Price",
+            "item_code": TEST_ITEM,
+            "price_list": TEST_TARGET_PRICE_LIST,
+            "uom": "Nos",
+            "price_list_rate": 50.0,
+        }).insert(ignore_permissions=True).name
+        frappe.db.commit()
+
+        options = self._options(
+            operation="Copy", target_price_list=TEST_TARGET_PRICE_LIST, value=0, round_to=0, overwrite_existing=1
+        )
+        preview = price_adjustment.preview_price_adjustment(**options)
+        self.assertEqual((preview["update"], preview["create"]), (1, 1))
+
+        price_adjustment.run_price_adjustment("t-copy-uom", options)
+
+        target = frappe.get_all(
+            "Item Price",
+            filters={"item_code": TEST_ITEM, "price_list": TEST_TARGET_PRICE_LIST},
+            fields=["uom", "price_list_rate"],
+        )
+        self.assertEqual({(r.uom, float(r.price_list_rate)) for r in target}, {("Nos", 100.0), ("Box", 1000.0)})
+        self.assertEqual(float(frappe.db.get_value("Item Price", target_nos, "price_list_rate")), 100.0)
+
+    def test_unknown_item_group_is_rejected(self):
+        from cecypo_powerpack.price_adjustment import preview_price_adjustment
+
+        self.assertRaises(
+            frappe.ValidationError, preview_price_adjustment, **self._options(item_group="_Test No Such Group")
+        )
@@ -77,6 +77,17 @@ class TestPreviewPriceImport(IntegrationTestCase):
         self.assertEqual(float(result[0]["existing_rate"]), 100.0)
         self.assertIsNotNone(result[0]["item_price_name"])
 
+    def test_same_rate_returns_unchanged_status(self):
+        from cecypo_powerpack.api import preview_price_import
+
+        content = _make_csv_b64([
+            {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST, "rate": "100.0000001"}
+        ])
+        result = preview_price_import(content, "test.csv")
+
+        self.assertEqual(result[0]["status"], "unchanged")
+        self.assertIsNotNone(result[0]["item_price_name"])
+
     def test_missing_item_returns_missing_status(self):
         from cecypo_powerpack.api import preview_price_import
 
@@ -208,6 +219,19 @@ class TestApplyPriceImport(IntegrationTestCase):
         )
         self.assertEqual(float(new_rate), 200.0)
 
+    def test_apply_leaves_unchanged_rows_untouched(self):
+        from cecypo_powerpack.api import apply_price_import
+
+        ip_name = self._get_ip_name()
+        modified = frappe.db.get_value("Item Price", ip_name, "modified")
+        rows = [{"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST,
+                 "rate": 100.0, "status": "unchanged", "item_price_name": ip_name}]
+        result = apply_price_import(json.dumps(rows))
+
+        self.assertEqual(result["unchanged"], 1)
+        self.assertEqual(result["updated"], 0)
+        self.assertEqual(frappe.db.get_value("Item Price", ip_name, "modified"), modified)
+
     def test_apply_mixed_rows_counts_correctly(self):
         from cecypo_powerpack.api import apply_price_import
 
@@ -225,3 +249,217 @@ class TestApplyPriceImport(IntegrationTestCase):
         self.assertEqual(result["updated"], 1)
         self.assertEqual(result["created"], 1)
         self.assertEqual(result["skipped"], 1)
+
+
+class TestBackgroundPriceImport(IntegrationTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        _make_item(TEST_ITEM_EXISTS, {"is_stock_item": 0})
+        _make_item(TEST_ITEM_NO_PRICE, {"is_stock_item": 0})
+        if not frappe.db.exists(
+            "Item Price",
+            {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST},
+        ):
+            frappe.get_doc({
+                "doctype": "Item Price",
+                "item_code": TEST_ITEM_EXISTS,
+                "price_list": TEST_PRICE_LIST,
+                "price_list_rate": 100.0,
+            }).insert(ignore_permissions=True)
+        frappe.db.commit()  # persist class-level fixtures before per-test rollbacks
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def _upload(self, rows):
+        return frappe.get_doc({
+            "doctype": "File",
+            "file_name": f"pip-{frappe.generate_hash(length=6)}.csv",
+            "is_private": 1,
+            "content": base64.b64decode(_make_csv_b64(rows)),
+        }).insert(ignore_permissions=True)
+
+    def test_job_stores_paginated_preview(self):
+        from cecypo_powerpack import price_import
+
+        file_doc = self._upload([
+            {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST, "rate": 120.0},
+            {"item_code": TEST_ITEM_NO_PRICE, "price_list": TEST_PRICE_LIST, "rate": 80.0},
+            {"item_code": "GHOST-ITEM-PIP", "price_list": TEST_PRICE_LIST, "rate": 50.0},
+        ])
+        state = price_import.start_price_import(file_doc.file_url)
+        price_import.run_price_import(state["import_id"])  # run the enqueued job inline
+
+        state = price_import.get_price_import_status(state["import_id"])
+        self.assertEqual(state["status"], "Ready")
+        self.assertEqual(state["processed"], 3)
+        self.assertEqual(state["counts"], {"update": 1, "unchanged": 0, "new": 1, "missing": 1})
+
+        page = price_import.get_price_import_page(state["import_id"], start=1, page_length=1)
+        self.assertEqual([r["item_code"] for r in page["rows"]], [TEST_ITEM_NO_PRICE])
+        self.assertEqual(page["total"], 3)
+
+    def test_unsupported_file_type_is_rejected(self):
+        from cecypo_powerpack import price_import
+
+        file_doc = frappe.get_doc({
+            "doctype": "File",
+            "file_name": "prices.txt",
+            "is_private": 1,
+            "content": b"item_code,price_list,rate\n",
+        }).insert(ignore_permissions=True)
+        self.assertRaises(frappe.ValidationError, price_import.start_price_import, file_doc.file_url)
+
+    def test_new_row_for_existing_price_is_upserted(self):
+        from cecypo_powerpack import price_import
+
+        rows = [{"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST,
+                 "rate": 130.0, "status": "new", "item_price_name": None}]
+        result = price_import.apply_rows(rows)
+
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(result["created"], 0)
+        self.assertEqual(
+            frappe.db.count("Item Price", {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST}), 1
+        )
+
+
+    def test_failed_chunk_retried_row_by_row_is_counted_once(self):
+        from unittest.mock import patch
+
+        from cecypo_powerpack import price_import
+
+        ip_name = frappe.db.get_value(
+            "Item Price", {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST}, "name"
+        )
+        rows = [
+            {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST,
+             "rate": 140.0, "status": "update", "item_price_name": ip_name},
+            {"item_code": TEST_ITEM_NO_PRICE, "price_list": TEST_PRICE_LIST,
+             "rate": 90.0, "status": "new", "item_price_name": None},
+        ]
+        insert = price_import._bulk_insert_prices
+        calls = []
+
+        def fail_first(to_insert):
+            calls.append(len(to_insert))
+            if len(calls) == 1:
+                raise frappe.ValidationError("set-based insert failed")
+            return insert(to_insert)
+
+        with patch.object(price_import, "_bulk_insert_prices", side_effect=fail_first):
+            result = price_import.apply_rows(rows)
+
+        self.assertGreater(len(calls), 1)
+        self.assertEqual(result, {"updated": 1, "created": 1, "skipped": 0, "unchanged": 0})
+        self.assertEqual(float(frappe.db.get_value("Item Price", ip_name, "price_list_rate")), 140.0)
+
+
+class TestPriceExport(IntegrationTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        _make_item(TEST_ITEM_EXISTS, {"is_stock_item": 0})
+        if not frappe.db.exists(
+            "Item Price",
+            {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST},
+        ):
+            frappe.get_doc({
+                "doctype": "Item Price",
+                "item_code": TEST_ITEM_EXISTS,
+                "price_list": TEST_PRICE_LIST,
+                "price_list_rate": 100.0,
+            }).insert(ignore_permissions=True)
+        frappe.db.commit()  # persist class-level fixtures before per-test rollbacks
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_export_round_trips_with_importer(self):
+        from cecypo_powerpack import price_import
+
+        for file_format in ("csv", "xlsx"):
+            export_id = frappe.generate_hash(length=12)
+            price_import.run_price_export(export_id, TEST_PRICE_LIST, file_format)
+
+            file_doc = frappe.get_last_doc(
+                "File", filters={"attached_to_name": TEST_PRICE_LIST, "file_url": ["like", f"%{export_id}%"]}
+            )
+            with open(file_doc.get_full_path(), "rb") as f:
+                rows = list(price_import.iter_price_rows(f, file_doc.file_name))
+
+            exported = {r["item_code"]: r for r in rows}
+            self.assertEqual(exported[TEST_ITEM_EXISTS]["price_list"], TEST_PRICE_LIST)
+            self.assertEqual(exported[TEST_ITEM_EXISTS]["rate"], 100.0)
+            self.assertEqual(
+                len(rows), frappe.db.count("Item Price", price_import._export_filters(TEST_PRICE_LIST))
+            )
+
+
+class TestBulkPriceEditor(IntegrationTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.item_exists = _make_item(TEST_ITEM_EXISTS, {"is_stock_item": 0}).name
+        cls.item_no_price = _make_item(TEST_ITEM_NO_PRICE, {"is_stock_item": 0}).name
+
+        if not frappe.db.exists(
+            "Item Price",
+            {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST},
+        ):
+            frappe.get_doc({
+                "doctype": "Item Price",
+                "item_code": TEST_ITEM_EXISTS,
+                "price_list": TEST_PRICE_LIST,
+                "price_list_rate": 100.0,
+            }).insert(ignore_permissions=True)
+        frappe.db.commit()  # persist class-level fixtures before per-test rollbacks
+
+    def tearDown(self):
+        # save_item_prices commits, so restore the fixtures explicitly
+        frappe.db.set_value(
+            "Item Price",
+            {"item_code": TEST_ITEM_EXISTS, "price_list": TEST_PRICE_LIST},
+            "price_list_rate",
+            100.0,
+        )
+        frappe.db.delete("Item Price", {"item_code": TEST_ITEM_NO_PRICE, "price_list": TEST_PRICE_LIST})
+        frappe.db.commit()
+
+    def test_fetch_pivots_rates_in_requested_order(self):
+        from cecypo_powerpack.api import fetch_item_prices
+
+        result = fetch_item_prices(
+            f"{TEST_ITEM_NO_PRICE}|||GHOST-PIP|||{TEST_ITEM_EXISTS}|||{TEST_ITEM_NO_PRICE}",
+            "Standard Buying",
+            TEST_PRICE_LIST,
+        )
+
+        self.assertEqual([r["item_code"] for r in result], [TEST_ITEM_NO_PRICE, TEST_ITEM_EXISTS])
+        self.assertEqual(result[0]["sell_price"], 0)
+        self.assertEqual(float(result[1]["sell_price"]), 100.0)
+
+    def test_save_upserts_and_counts_rows(self):
+        from cecypo_powerpack.api import save_item_prices
+
+        result = save_item_prices(
+            f"{TEST_ITEM_EXISTS}::125.5|||{TEST_ITEM_NO_PRICE}::60|||GHOST-PIP::10|||bad-row",
+            TEST_PRICE_LIST,
+        )
+
+        self.assertEqual(result["updated_count"], 2)
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["skipped"], 1)
+        rates = dict(frappe.get_all(
+            "Item Price",
+            filters={"price_list": TEST_PRICE_LIST, "item_code": ["in", [TEST_ITEM_EXISTS, TEST_ITEM_NO_PRICE]]},
+            fields=["item_code", "price_list_rate"],
+            as_list=True,
+        ))
+        self.assertEqual(float(rates[TEST_ITEM_EXISTS]), 125.5)
+        self.assertEqual(float(rates[TEST_ITEM_NO_PRICE]), 60.0)
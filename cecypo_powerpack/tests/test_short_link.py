@@ -0,0 +1,99 @@
+# Copyright (c) 2026, Cecypo.Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from cecypo_powerpack.short_link import (
+	CONTEXT_CACHE_KEY,
+	HITS_DOCTYPE,
+	VISITORS_PREFIX,
+	_store_clicks,
+	_take_pending_clicks,
+	clear_context_cache,
+	get_link_context,
+	is_expired,
+	record_click,
+)
+
+TOKEN = "_T-SHORT-LINK-x7kQ"
+
+
+class TestShortLinkContext(FrappeTestCase):
+	def setUp(self):
+		frappe.get_doc({
+			"doctype": "PowerPack Short Link",
+			"token": TOKEN,
+			"target_url": "https://example.com/a",
+		}).insert(ignore_permissions=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+		clear_context_cache()
+
+	def test_cached_context_is_one_cache_read(self):
+		self.assertEqual(get_link_context(TOKEN).target_url, "https://example.com/a")
+
+		with self.assertQueryCount(0):
+			context = get_link_context(TOKEN)
+
+		self.assertEqual(context.target_url, "https://example.com/a")
+		self.assertIsNone(get_link_context("_T-SHORT-LINK-missing"))
+
+	def test_changes_invalidate_the_cached_context(self):
+		get_link_context(TOKEN)
+
+		link = frappe.get_doc("PowerPack Short Link", TOKEN)
+		link.expires_on = frappe.utils.add_days(frappe.utils.today(), -1)
+		link.save(ignore_permissions=True)
+
+		self.assertIsNone(frappe.cache().hget(CONTEXT_CACHE_KEY, TOKEN))
+		self.assertTrue(is_expired(get_link_context(TOKEN)))
+
+		clear_context_cache()
+		self.assertIsNone(frappe.cache().hget(CONTEXT_CACHE_KEY, TOKEN))
+
+
+class TestShortLinkClicks(FrappeTestCase):
+	def setUp(self):
+		frappe.get_doc({
+			"doctype": "PowerPack Short Link",
+			"token": TOKEN,
+			"target_url": "https://example.com/a",
+		}).insert(ignore_permissions=True)
+		_take_pending_clicks(frappe.cache())
+		frappe.cache().delete_value([
+			f"{VISITORS_PREFIX}{frappe.utils.today()}:{token}" for token in (TOKEN, "_T-SHORT-LINK-missing")
+		])
+
+	def tearDown(self):
+		frappe.db.rollback()
+		_take_pending_clicks(frappe.cache())
+
+	def _flush(self):
+		_store_clicks(_take_pending_clicks(frappe.cache()))
+
+	def test_buffered_clicks_flush_to_count_and_daily_hits(self):
+		for visitor in ("a", "b", "a"):
+			record_click(TOKEN, visitor=visitor)
+		self.assertEqual(frappe.db.get_value("PowerPack Short Link", TOKEN, "click_count"), 0)
+
+		self._flush()
+		record_click(TOKEN, visitor="c")
+		self._flush()
+		self._flush()
+
+		self.assertEqual(frappe.db.get_value("PowerPack Short Link", TOKEN, "click_count"), 4)
+		hits = frappe.get_all(
+			HITS_DOCTYPE, filters={"short_link": TOKEN}, fields=["date", "hits", "unique_visitors"]
+		)
+		self.assertEqual(len(hits), 1)
+		self.assertEqual(str(hits[0].date), frappe.utils.today())
+		self.assertEqual((hits[0].hits, hits[0].unique_visitors), (4, 3))
+
+	def test_clicks_of_deleted_links_are_dropped(self):
+		record_click("_T-SHORT-LINK-missing", visitor="a")
+
+		self._flush()
+
+		self.assertFalse(frappe.db.exists(HITS_DOCTYPE, {"short_link": "_T-SHORT-LINK-missing"}))
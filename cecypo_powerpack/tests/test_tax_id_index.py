@@ -0,0 +1,71 @@
+# Copyright (c) 2026, Cecypo.Tech and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from cecypo_powerpack.api import check_duplicate_tax_id
+from cecypo_powerpack.tax_id_index import (
+	REPORT_CACHE_PREFIX,
+	normalize_tax_id,
+	run_tax_id_duplicate_report,
+)
+
+
+def _make_party(doctype, name, tax_id):
+	name_field = "customer_name" if doctype == "Customer" else "supplier_name"
+	doc = frappe.get_doc({"doctype": doctype, name_field: name, "tax_id": tax_id})
+	if doctype == "Supplier":
+		doc.supplier_group = frappe.db.get_value("Supplier Group", {"is_group": 0}) or "All Supplier Groups"
+	doc.insert(ignore_permissions=True, ignore_mandatory=True)
+	return doc
+
+
+class TestTaxIDIndex(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_normalization_ignores_case_spaces_and_dashes(self):
+		self.assertEqual(normalize_tax_id(" p051-234 567x "), "P051234567X")
+		self.assertEqual(normalize_tax_id(None), "")
+
+	def test_formatting_variants_are_duplicates(self):
+		first = _make_party("Customer", "_Test TIN Customer A", "P051-234567X")
+		result = check_duplicate_tax_id("Customer", "p051 234567x", "new-customer-1")
+
+		self.assertTrue(result["has_duplicates"])
+		self.assertEqual([d["name"] for d in result["duplicates"]], [first.name])
+
+		# the document itself is not its own duplicate
+		self.assertFalse(check_duplicate_tax_id("Customer", first.tax_id, first.name)["has_duplicates"])
+
+	def test_existing_supplier_is_flagged(self):
+		supplier = _make_party("Supplier", "_Test TIN Supplier", "P099887766Z")
+		result = check_duplicate_tax_id("Customer", "p099887766z", "new-customer-1")
+
+		self.assertFalse(result["has_duplicates"])
+		self.assertEqual(result["other_doctype_matches"][0]["name"], supplier.name)
+		self.assertEqual(result["other_doctype_matches"][0]["doctype"], "Supplier")
+
+	def test_index_follows_tax_id_change_and_delete(self):
+		customer = _make_party("Customer", "_Test TIN Customer B", "A111")
+		customer.tax_id = "B222"
+		customer.save(ignore_permissions=True)
+
+		self.assertFalse(check_duplicate_tax_id("Customer", "A111")["has_duplicates"])
+		self.assertTrue(check_duplicate_tax_id("Customer", "b-222")["has_duplicates"])
+
+		customer.delete(ignore_permissions=True)
+		self.assertFalse(check_duplicate_tax_id("Customer", "B222")["has_duplicates"])
+
+	def test_report_groups_clusters(self):
+		_make_party("Customer", "_Test TIN Customer C", "C-333")
+		_make_party("Supplier", "_Test TIN Supplier C", "c333")
+
+		report_id = frappe.generate_hash(length=12)
+		run_tax_id_duplicate_report(report_id, frappe.session.user)
+		report = frappe.cache().get_value(REPORT_CACHE_PREFIX + report_id)
+
+		cluster = next(c for c in report["clusters"] if c["normalized_tax_id"] == "C333")
+		self.assertTrue(cluster["cross_doctype"])
+		self.assertEqual({m["party_type"] for m in cluster["members"]}, {"Customer", "Supplier"})
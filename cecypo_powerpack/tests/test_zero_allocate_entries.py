@@ -0,0 +1,157 @@
+# Copyright (c) 2026, Cecypo.Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from cecypo_powerpack.tests.test_zero_allocate_paste import (
+	TEST_ITEM,
+	TEST_SUPPLIER,
+	_ensure_supplier,
+	_make_pi,
+)
+
+
+class TestZeroAllocateEntries(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		from erpnext.stock.doctype.item.test_item import make_item
+		cls.company = frappe.db.get_value("Company", {"is_group": 0}, "name")
+		cls.supplier = _ensure_supplier(TEST_SUPPLIER)
+		cls.item_code = make_item(TEST_ITEM, {"is_stock_item": 0}).name
+
+	def setUp(self):
+		settings = frappe.get_single("PowerPack Settings")
+		settings.enable_payment_reconciliation_powerup = 1
+		settings.save()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def _invoices(self, count):
+		return [
+			{
+				"invoice_type": "Purchase Invoice",
+				"invoice_number": _make_pi(self.company, self.supplier, self.item_code, f"BILL/ZAE/{i}", 100).name,
+				"outstanding_amount": 100,
+			}
+			for i in range(count)
+		]
+
+	def _payments(self, count):
+		return [
+			{"reference_type": "Payment Entry", "reference_name": f"PE-ZAE-{i}", "amount": 50}
+			for i in range(count)
+		]
+
+	def test_one_row_per_pair_with_exchange_rate(self):
+		from cecypo_powerpack.api import zero_allocate_entries
+
+		invoices = self._invoices(2)
+		rows = zero_allocate_entries({"company": self.company}, self._payments(3), invoices)
+
+		self.assertEqual(len(rows), 6)
+		self.assertTrue(all(r["allocated_amount"] == 0 for r in rows))
+		self.assertTrue(all(r["exchange_rate"] == 1 for r in rows))
+		self.assertEqual({r["invoice_number"] for r in rows}, {i["invoice_number"] for i in invoices})
+
+	def test_query_count_independent_of_selection(self):
+		from cecypo_powerpack.api import zero_allocate_entries
+
+		doc = {"company": self.company}
+		small = (self._payments(1), self._invoices(1))
+		large = (self._payments(10), self._invoices(8))
+
+		zero_allocate_entries(doc, *small)  # warm caches
+		with self.assertQueryCount(5):
+			zero_allocate_entries(doc, *large)
+
+
+PAIR_PAYMENTS = [
+	{"reference_name": "P1", "amount": 100, "posting_date": "2026-01-05"},
+	{"reference_name": "P2", "amount": 50, "posting_date": "2026-01-01"},
+]
+PAIR_INVOICES = [
+	{"invoice_number": "A", "outstanding_amount": 60, "invoice_date": "2026-01-03"},
+	{"invoice_number": "B", "outstanding_amount": 50, "invoice_date": "2026-01-01"},
+	{"invoice_number": "C", "outstanding_amount": 100, "invoice_date": "2026-01-02"},
+]
+
+
+class TestPairZeroAllocations(FrappeTestCase):
+	def _pairs(self, pairing, invoices=None):
+		from cecypo_powerpack.api import pair_zero_allocations
+
+		return [
+			(p["reference_name"], i["invoice_number"])
+			for p, i in pair_zero_allocations(PAIR_PAYMENTS, invoices or PAIR_INVOICES, pairing)
+		]
+
+	def test_all_is_cartesian(self):
+		self.assertEqual(len(self._pairs("All")), 6)
+
+	def test_fifo_covers_oldest_invoices_first(self):
+		# P2 (oldest) covers B; P1 covers C and is used up before A
+		self.assertEqual(self._pairs("FIFO"), [("P2", "B"), ("P1", "C")])
+
+	def test_order_spans_payments_where_needed(self):
+		self.assertEqual(self._pairs("Order"), [("P1", "A"), ("P1", "B"), ("P2", "B"), ("P2", "C")])
+
+	def test_amount_prefers_exact_matches(self):
+		invoices = [dict(PAIR_INVOICES[0], outstanding_amount=100), PAIR_INVOICES[1]]
+		self.assertEqual(self._pairs("Amount", invoices), [("P2", "B"), ("P1", "A")])
+
+	def test_pasted_amount_overrides_outstanding(self):
+		invoices = [dict(i, pasted_amount=10) for i in PAIR_INVOICES]
+		self.assertEqual(self._pairs("Order", invoices), [("P1", "A"), ("P1", "B"), ("P1", "C")])
+
+
+class TestVatWithholdingAllocations(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		from erpnext.stock.doctype.item.test_item import make_item
+		cls.company = frappe.db.get_value("Company", {"is_group": 0}, "name")
+		cls.supplier = _ensure_supplier(TEST_SUPPLIER)
+		cls.item_code = make_item(TEST_ITEM, {"is_stock_item": 0}).name
+
+	def setUp(self):
+		settings = frappe.get_single("PowerPack Settings")
+		settings.enable_payment_reconciliation_powerup = 1
+		settings.save()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_supplier_rows_get_two_percent_of_net_rounded_up(self):
+		from cecypo_powerpack.api import get_vat_withholding_allocations
+
+		pi_a = _make_pi(self.company, self.supplier, self.item_code, "BILL/VAT/1", 1010)
+		pi_b = _make_pi(self.company, self.supplier, self.item_code, "BILL/VAT/2", 500)
+		doc = {
+			"party_type": "Supplier",
+			"allocation": [
+				{"name": "row-1", "invoice_type": "Purchase Invoice", "invoice_number": pi_a.name,
+				 "reference_name": "PE-VAT-1", "unreconciled_amount": 100},
+				{"name": "row-2", "invoice_type": "Purchase Invoice", "invoice_number": pi_b.name,
+				 "reference_name": "PE-VAT-1", "unreconciled_amount": 100},
+				{"name": "row-3", "invoice_type": "Purchase Invoice", "invoice_number": "GHOST-PI",
+				 "reference_name": "PE-VAT-1", "unreconciled_amount": 100},
+			],
+		}
+
+		result = get_vat_withholding_allocations(doc)
+
+		amounts = {a["name"]: a["allocated_amount"] for a in result["allocations"]}
+		self.assertEqual(amounts, {"row-1": 21, "row-2": 10})  # ceil(20.2), 10
+		self.assertEqual(result["skipped"], ["row-3"])
+		self.assertEqual(result["summary"], [
+			{"reference_name": "PE-VAT-1", "unreconciled_amount": 100, "allocated_amount": 31},
+		])
+
+	def test_other_party_types_are_rejected(self):
+		from cecypo_powerpack.api import get_vat_withholding_allocations
+
+		with self.assertRaises(frappe.ValidationError):
+			get_vat_withholding_allocations({"party_type": "Employee", "allocation": []})
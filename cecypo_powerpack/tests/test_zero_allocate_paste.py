@@ -141,11 +141,29 @@ class TestResolveBillNumbersForCredit(FrappeTestCase):
 		)
 		self.assertEqual(result["not_found"], ["BILL/PAID/1"])
 
-	# ── >200 bill numbers → throws ────────────────────────────────────────
-	def test_too_many_bill_numbers_throws(self):
+	# ── Full statements resolve in chunks; only absurd pastes throw ────────
+	def test_large_paste_resolves_across_chunks(self):
 		from cecypo_powerpack.api import resolve_bill_numbers_for_credit
+		from cecypo_powerpack.bill_no_index import RESOLVE_CHUNK_SIZE
+
+		pi = _make_pi(self.company, self.supplier, self.item_code, "BILL/BULK/1499", 100)
+
+		bills = [f"BILL/BULK/{i}" for i in range(1500)]
+		result = resolve_bill_numbers_for_credit(
+			company=self.company,
+			supplier=self.supplier,
+			bill_numbers=json.dumps(bills),
+		)
+
+		self.assertGreater(len(bills), RESOLVE_CHUNK_SIZE)
+		self.assertEqual([m["pi_name"] for m in result["matched"]], [pi.name])
+		self.assertEqual(len(result["not_found"]), 1499)
+		self.assertEqual(result["not_found"][:2], ["BILL/BULK/0", "BILL/BULK/1"])
+
+	def test_too_many_bill_numbers_throws(self):
+		from cecypo_powerpack.api import MAX_PASTED_BILL_NUMBERS, resolve_bill_numbers_for_credit
 
-		bills = [f"BILL/BULK/{i}" for i in range(201)]
+		bills = [f"BILL/BULK/{i}" for i in range(MAX_PASTED_BILL_NUMBERS + 1)]
 		with self.assertRaises(frappe.ValidationError):
 			resolve_bill_numbers_for_credit(
 				company=self.company,
@@ -153,6 +171,28 @@ class TestResolveBillNumbersForCredit(FrappeTestCase):
 				bill_numbers=json.dumps(bills),
 			)
 
+	# ── Formatting variants match the same bill, once ─────────────────────
+	def test_formatting_variants_match(self):
+		from cecypo_powerpack.api import resolve_bill_numbers_for_credit
+
+		pi = _make_pi(self.company, self.supplier, self.item_code, "INV/0042", 100)
+
+		result = resolve_bill_numbers_for_credit(
+			company=self.company,
+			supplier=self.supplier,
+			bill_numbers=json.dumps(["inv 42", "INV-00042", "INV/43", "inv 42"]),
+		)
+
+		# one allocation row per invoice: later spellings of the same bill are duplicates
+		self.assertEqual([m["bill_no"] for m in result["matched"]], ["inv 42"])
+		self.assertEqual(result["matched"][0]["pi_name"], pi.name)
+		self.assertEqual(result["matched"][0]["pi_bill_no"], "INV/0042")
+		self.assertEqual(result["not_found"], ["INV/43"])
+		self.assertEqual(result["duplicates"], [
+			{"bill_no": "INV-00042", "duplicate_of": "inv 42"},
+			{"bill_no": "inv 42", "duplicate_of": "inv 42"},
+		])
+
 	# ── Blank / whitespace inputs dropped silently ────────────────────────
 	def test_blank_inputs_dropped(self):
 		from cecypo_powerpack.api import resolve_bill_numbers_for_credit
@@ -162,7 +202,7 @@ class TestResolveBillNumbersForCredit(FrappeTestCase):
 			supplier=self.supplier,
 			bill_numbers=json.dumps(["", "   ", "\t"]),
 		)
-		self.assertEqual(result, {"matched": [], "ambiguous": [], "not_found": []})
+		self.assertEqual(result, {"matched": [], "ambiguous": [], "not_found": [], "duplicates": []})
 
 	# ── Input order preserved across partitions ───────────────────────────
 	def test_input_order_preserved(self):
@@ -95,3 +95,35 @@ def is_feature_enabled(feature_name: str) -> bool:
     except Exception as e:
         frappe.log_error(f"Error checking feature {feature_name}: {str(e)}")
         return False
+
+
+SEARCH_SEQ_PREFIX = "cecypo_powerpack:search_seq:"
+
+
+def is_search_superseded(scope: str, seq, ttl_seconds: int = 600) -> bool:
+    """
+    Record a client search sequence number and report whether it is already stale.
+
+    Search-as-you-type clients (CecypoPowerPack.RequestSequencer) tag each request with
+    a scope unique to the page instance and an increasing seq. If a newer seq for the
+    same user and scope has reached a worker first, this request has been superseded
+    and the caller can return without querying.
+
+    Args:
+        scope: Client-generated sequencer scope
+        seq: Sequence number of this request
+        ttl_seconds: How long the latest seq is remembered
+
+    Returns:
+        bool: True if a newer request from the same scope has been seen
+    """
+    if not scope or seq in (None, ""):
+        return False
+
+    seq = frappe.utils.cint(seq)
+    cache = frappe.cache()
+    key = SEARCH_SEQ_PREFIX + frappe.session.user + ":" + scope
+    if frappe.utils.cint(cache.get_value(key)) > seq:
+        return True
+    cache.set_value(key, seq, expires_in_sec=ttl_seconds)
+    return False